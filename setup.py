@@ -63,7 +63,11 @@ if __name__ == "__main__":
         entry_points='''
             [console_scripts]
             make_artifacts=vivarium_gates_lsff.tools.cli:make_artifacts
+            compare_benchmarks=vivarium_gates_lsff.tools.cli:compare_benchmarks
             make_results=vivarium_gates_lsff.tools.cli:make_results
             make_specs=vivarium_gates_lsff.tools.cli:make_specs
+            run_benchmarks=vivarium_gates_lsff.tools.cli:run_benchmarks
+            run_results_benchmark=vivarium_gates_lsff.tools.cli:run_results_benchmark
+            make_synthetic_artifacts=vivarium_gates_lsff.tools.cli:make_synthetic_artifacts
         '''
     )
@@ -1,5 +1,9 @@
+from .diagnostics import MemoryProfiler
+from .diagnostics import TimeStepProfiler
 from .disease import IronDeficiency
 from .disease import NeonatalSWC_without_incidence
+from .observers import AgeGroup
 from .observers import AnemiaObserver
+from .observers import ResultsStratifier
 from .observers import StateObserver
 
@@ -0,0 +1,334 @@
+import functools
+import json
+import sys
+import time
+import typing
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+import vivarium
+from vivarium.framework.lookup import InterpolatedTable, LookupTable
+
+from vivarium_gates_lsff.components.disease.iron_deficiency import StepMemo
+
+if typing.TYPE_CHECKING:
+    from vivarium.framework.engine import Builder
+    from vivarium.framework.event import Event
+    from vivarium.framework.values import Pipeline
+
+# The profilers reach into private vivarium interfaces, which are only known
+# to hold for this release line.  All such access goes through VivariumInternals.
+SUPPORTED_VIVARIUM_VERSION = '0.10.'
+
+
+class VivariumInternals:
+    """Access to the private vivarium interfaces the profilers rely on.
+
+    Event listeners, value pipeline calls, the full state table and lookup
+    table data have no public interface in vivarium, so they are reached
+    through its private attributes.  Those are only known for vivarium
+    0.10.x, and building an instance on any other version raises a
+    ``RuntimeError`` rather than profiling the wrong thing.
+
+    """
+
+    def __init__(self, builder: 'Builder'):
+        if not vivarium.__version__.startswith(SUPPORTED_VIVARIUM_VERSION):
+            raise RuntimeError(f'The diagnostic profilers support vivarium {SUPPORTED_VIVARIUM_VERSION}x, '
+                               f'but vivarium {vivarium.__version__} is installed.')
+        self._event_manager = builder.event._manager
+        self._population_manager = builder.population._manager
+
+    def wrap_listeners(self, event_name: str, wrap: Callable[[Callable], Callable]):
+        """Replaces every listener registered to the event with its wrapped version."""
+        for listeners in self._event_manager.get_listeners(event_name).values():
+            for i, listener in enumerate(listeners):
+                listeners[i] = wrap(listener)
+
+    @staticmethod
+    def wrap_pipeline(pipeline: 'Pipeline', wrap: Callable[[Callable], Callable]):
+        """Replaces the pipeline's call with its wrapped version.
+
+        Pipelines delegate every call to ``_call``, so the wrapped call spans
+        the source, the mutators and the post-processor together.
+
+        """
+        pipeline._call = wrap(pipeline._call)
+
+    def get_state_table(self) -> pd.DataFrame:
+        """Gets the state table itself, untracked simulants included.
+
+        Population views are filtered to tracked simulants, so this is the
+        only way to see every row.  The table is not copied and must not be
+        modified.
+
+        """
+        return self._population_manager._population
+
+    @staticmethod
+    def get_lookup_table_data(table: LookupTable) -> Any:
+        """Gets the table a lookup table delegates to."""
+        return table._table
+
+
+def get_output_directory(builder: 'Builder') -> Path:
+    """Gets the directory the simulation writes its ``output.hdf`` to.
+
+    Falls back to the current working directory when the simulation is not
+    run from the command line (e.g. interactively).
+
+    """
+    if 'output_data' in builder.configuration:
+        return Path(builder.configuration.output_data.results_directory)
+    return Path.cwd()
+
+
+class TimeStepProfiler:
+    """Records wall time and call counts of event listeners and value producers.
+
+    This is an opt-in diagnostic.  Add ``TimeStepProfiler()`` to the
+    ``vivarium_gates_lsff.components`` section of a model specification to
+    enable it, and choose what is profiled with the ``time_step_profiler``
+    configuration block.  Every listener registered to the configured
+    events and every configured value pipeline is timed, inclusive of any
+    pipelines they call in turn.  Per-step and cumulative totals are written
+    to ``time_step_profile.csv`` and ``time_step_profile.json`` next to
+    ``output.hdf`` at simulation end, and the hit and miss counts of every
+    component's step memo are added to the json.  Profiling relies on private vivarium
+    interfaces and is tied to vivarium 0.10.x (see :class:`VivariumInternals`).
+
+    """
+
+    configuration_defaults = {
+        'time_step_profiler': {
+            'events': ['time_step__prepare', 'collect_metrics'],
+            'values': ['iron_deficiency.exposure', 'anemia_severity', 'zinc_deficiency.exposure'],
+        }
+    }
+
+    @property
+    def name(self) -> str:
+        return 'time_step_profiler'
+
+    def setup(self, builder: 'Builder'):
+        self.config = builder.configuration.time_step_profiler.to_dict()
+        self.clock = builder.time.clock()
+        self.output_directory = get_output_directory(builder)
+        self.list_components = builder.components.list_components
+        # Listeners are wrapped after setup, once every component has registered them.
+        self.internals = VivariumInternals(builder)
+        self.pipelines = {value_name: builder.value.get_value(value_name) for value_name in self.config['values']}
+
+        # (step, kind, name): [calls, seconds]
+        self.records = defaultdict(lambda: [0, 0.])
+
+        builder.event.register_listener('post_setup', self.on_post_setup)
+        builder.event.register_listener('simulation_end', self.on_simulation_end, priority=9)
+
+    def on_post_setup(self, event: 'Event'):
+        for event_name in self.config['events']:
+            self.internals.wrap_listeners(
+                event_name, lambda listener: self.timed('listener', f'{event_name}.{get_listener_name(listener)}',
+                                                        listener))
+        for value_name, pipeline in self.pipelines.items():
+            self.internals.wrap_pipeline(pipeline, lambda call: self.timed('value', value_name, call))
+
+    def timed(self, kind: str, name: str, function: Callable) -> Callable:
+        # Wrapped so listeners keep the name and owner vivarium may order and label them by.
+        @functools.wraps(function)
+        def _timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record = self.records[(self.clock(), kind, name)]
+                record[0] += 1
+                record[1] += time.perf_counter() - start
+        return _timed
+
+    def on_simulation_end(self, event: 'Event'):
+        per_step = self.get_per_step_profile()
+        cumulative = self.get_cumulative_profile(per_step)
+        step_memos = self.get_step_memo_profile()
+
+        self.output_directory.mkdir(parents=True, exist_ok=True)
+        per_step.to_csv(self.output_directory / 'time_step_profile.csv', index=False)
+        with (self.output_directory / 'time_step_profile.json').open('w') as f:
+            json.dump({
+                'cumulative': json.loads(cumulative.to_json(orient='records')),
+                'per_step': json.loads(per_step.assign(step=per_step['step'].astype(str)).to_json(orient='records')),
+                'step_memos': json.loads(step_memos.to_json(orient='records')),
+            }, f, indent=2)
+
+        for row in cumulative.itertuples():
+            logger.info(f'{row.kind} {row.name}: {row.calls} calls, {row.seconds:.2f}s.')
+        for row in step_memos.itertuples():
+            logger.info(f'{row.component} step memo {row.name}: {row.hits} hits, {row.misses} misses.')
+
+    def get_per_step_profile(self) -> pd.DataFrame:
+        return pd.DataFrame([{'step': step, 'kind': kind, 'name': name, 'calls': calls, 'seconds': seconds}
+                             for (step, kind, name), (calls, seconds) in self.records.items()],
+                            columns=['step', 'kind', 'name', 'calls', 'seconds'])
+
+    def get_step_memo_profile(self) -> pd.DataFrame:
+        """Collects the hit and miss counts of every source memoized by a component's step memo."""
+        rows = []
+        for component_name, component in self.list_components().items():
+            for memo in vars(component).values():
+                if isinstance(memo, StepMemo):
+                    for name in sorted(set(memo.hits) | set(memo.misses)):
+                        rows.append({'component': component_name, 'name': name,
+                                     'hits': memo.hits[name], 'misses': memo.misses[name]})
+        return pd.DataFrame(rows, columns=['component', 'name', 'hits', 'misses'])
+
+    @staticmethod
+    def get_cumulative_profile(per_step: pd.DataFrame) -> pd.DataFrame:
+        cumulative = per_step.groupby(['kind', 'name'])[['calls', 'seconds']].sum().reset_index()
+        return cumulative.sort_values('seconds', ascending=False)
+
+    def __repr__(self) -> str:
+        return 'TimeStepProfiler()'
+
+
+def get_listener_name(listener: Callable) -> str:
+    """Labels a listener by its owning component and method name."""
+    component = getattr(listener, '__self__', None)
+    if component is None:
+        return getattr(listener, '__name__', repr(listener))
+    component_name = getattr(component, 'name', type(component).__name__)
+    return f'{component_name}.{listener.__name__}'
+
+
+class MemoryProfiler:
+    """Samples the memory footprint of the state table and of component data.
+
+    This is an opt-in diagnostic.  Add ``MemoryProfiler()`` to the
+    ``vivarium_gates_lsff.components`` section of a model specification to
+    enable it.  The memory of every state table column over all simulants,
+    tracked or not (including the strings held by object columns), and of
+    the array-backed data held by every component (observer accumulators,
+    lookup tables, caches) is sampled at the end of setup, after each of
+    the time steps listed in the ``memory_profiler.steps`` configuration
+    and at simulation end.  The
+    samples are written to ``memory_profile.csv`` and ``memory_profile.json``
+    next to ``output.hdf``.
+
+    """
+
+    configuration_defaults = {
+        'memory_profiler': {
+            'steps': [1],
+        }
+    }
+
+    @property
+    def name(self) -> str:
+        return 'memory_profiler'
+
+    def setup(self, builder: 'Builder'):
+        self.config = builder.configuration.memory_profiler.to_dict()
+        self.output_directory = get_output_directory(builder)
+        self.list_components = builder.components.list_components
+        # Untracked simulants still hold memory, so the whole state table is measured.
+        self.internals = VivariumInternals(builder)
+
+        self.step = 0
+        self.samples = []
+
+        builder.event.register_listener('post_setup', self.on_post_setup, priority=9)
+        builder.event.register_listener('collect_metrics', self.on_collect_metrics, priority=9)
+        builder.event.register_listener('simulation_end', self.on_simulation_end, priority=9)
+
+    def on_post_setup(self, event: 'Event'):
+        # No simulants exist yet, so only component data is sampled.
+        self.sample('setup', include_state_table=False)
+
+    def on_collect_metrics(self, event: 'Event'):
+        self.step += 1
+        if self.step in self.config['steps']:
+            self.sample(f'step_{self.step}')
+
+    def on_simulation_end(self, event: 'Event'):
+        self.sample('simulation_end')
+        report = pd.DataFrame(self.samples, columns=['sample', 'category', 'owner', 'item', 'bytes'])
+
+        self.output_directory.mkdir(parents=True, exist_ok=True)
+        report.to_csv(self.output_directory / 'memory_profile.csv', index=False)
+        totals = report.groupby(['sample', 'category'], sort=False)['bytes'].sum()
+        with (self.output_directory / 'memory_profile.json').open('w') as f:
+            json.dump({
+                'totals': {sample: json.loads(totals.loc[sample].to_json())
+                           for sample in totals.index.unique(level='sample')},
+                'samples': json.loads(report.to_json(orient='records')),
+            }, f, indent=2)
+
+        for (sample, category), nbytes in totals.items():
+            logger.info(f'{sample} {category}: {nbytes / 2**20:.1f} MiB.')
+
+    def sample(self, sample: str, include_state_table: bool = True):
+        """Records the memory of each state table column and each component attribute."""
+        if include_state_table:
+            population = self.internals.get_state_table()
+            for column, nbytes in population.memory_usage(deep=True, index=False).items():
+                self.samples.append((sample, 'state_table', 'population', column, int(nbytes)))
+
+        for component_name, component in self.list_components().items():
+            if component is self:
+                continue
+            for attribute, value in vars(component).items():
+                # Strings are only worth counting in bulk, e.g. as keys of a container.
+                nbytes = get_nbytes(value) if not isinstance(value, str) else 0
+                if nbytes:
+                    self.samples.append((sample, 'component', component_name, attribute, nbytes))
+
+    def __repr__(self) -> str:
+        return 'MemoryProfiler()'
+
+
+# Limits how far into containers and helper objects memory is attributed,
+# so references back into the simulation are never followed far.
+_MAX_NBYTES_DEPTH = 3
+
+
+def get_nbytes(obj: Any, depth: int = 0) -> int:
+    """Estimates the bytes held by array-backed data in an object.
+
+    Arrays, pandas objects and lookup tables are measured directly.
+    Containers and objects defined in this package are searched for them
+    up to a fixed depth.  Anything else counts as zero.
+
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, LookupTable):
+        return get_lookup_table_nbytes(obj)
+    if isinstance(obj, str):
+        return sys.getsizeof(obj)
+    if depth >= _MAX_NBYTES_DEPTH:
+        return 0
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(get_nbytes(key, depth + 1) + get_nbytes(value, depth + 1)
+                                        for key, value in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sum(get_nbytes(value, depth + 1) for value in obj)
+    if type(obj).__module__.startswith('vivarium_gates_lsff') and hasattr(obj, '__dict__'):
+        return sum(get_nbytes(value, depth + 1) for value in vars(obj).values())
+    return 0
+
+
+def get_lookup_table_nbytes(table: LookupTable) -> int:
+    """Measures a lookup table's data, including the copies held by its interpolation."""
+    table = VivariumInternals.get_lookup_table_data(table)
+    if isinstance(table, InterpolatedTable):
+        interpolation = table.interpolation
+        return (get_nbytes(table.data) + get_nbytes(interpolation.data)
+                + sum(get_nbytes(order_0.data) for order_0 in interpolation.interpolations.values()))
+    return get_nbytes(table.values, depth=1)
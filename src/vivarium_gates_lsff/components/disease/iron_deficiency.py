@@ -1,8 +1,10 @@
 import typing
+from collections import Counter
+from typing import Callable
 
 import numpy as np
 import pandas as pd
-import scipy.stats
+import scipy.special
 
 from vivarium_public_health.utilities import to_years
 from vivarium_public_health.disease import DiseaseState as DiseaseState_
@@ -14,6 +16,7 @@ from vivarium_gates_lsff.constants.data_keys import IRON_DEFICIENCY
 
 if typing.TYPE_CHECKING:
     from vivarium.framework.engine import Builder
+    from vivarium.framework.event import Event
     from vivarium.framework.population import SimulantData
 
 
@@ -32,37 +35,38 @@ class IronDeficiency(DiseaseState_):
         return [self._distribution]
 
     def setup(self, builder: 'Builder'):
+        self.clock = builder.time.clock()
+        self._exposure_cache = HemoglobinExposureCache()
+        self.step_memo = StepMemo(self.clock)
         self.ensemble_propensity = builder.randomness.get_stream(f'{self.name}.ensemble.propensity')
         self.randomness = builder.randomness.get_stream(f'{self.name}.propensity')
 
         threshold_data = self.load_iron_responsiveness_threshold(builder)
-        self.thresholds = builder.lookup.build_table(threshold_data,
-                                                     key_columns=['sex'],
-                                                     parameter_columns=['age', 'year'])
+        self.thresholds = AnemiaParameterTensor(threshold_data, self.clock)
         self.iron_responsive = builder.value.register_value_producer(
             f'iron_responsive',
-            source=self.get_iron_responsive,
+            source=self.step_memo.memoize('iron_responsive', self.get_iron_responsive),
             requires_columns=['age', 'sex', 'iron_responsiveness_propensity'],
             requires_values=[f'{self.name}.exposure'])
         disability_weight_data = self.load_disability_weight_data(builder)
-        self.raw_disability_weight = builder.lookup.build_table(disability_weight_data,
-                                                                key_columns=['sex'],
-                                                                parameter_columns=['age', 'year'])
+        self.raw_disability_weight = AnemiaParameterTensor(disability_weight_data, self.clock)
         self.disability_weight = builder.value.register_value_producer(f'{self.name}.disability_weight',
                                                                        source=self.get_disability_weight,
                                                                        requires_columns=['age', 'sex'],
                                                                        requires_values=[f'{self.name}.exposure'])
         builder.value.register_value_modifier('disability_weight', self.disability_weight)
         
+        self._memoized_exposure = self.step_memo.memoize(f'{self.name}.exposure', self.get_exposure)
         self.raw_exposure = builder.value.register_value_producer(f'{self.name}.raw_exposure',
-                                                                  source=self.get_exposure,
+                                                                  source=self._memoized_exposure,
                                                                   requires_values=[f'{self.name}.exposure_parameters'])
 
         self.exposure = builder.value.register_value_producer(f'{self.name}.exposure',
                                                               source=self.raw_exposure)
 
         self.severity = builder.value.register_value_producer('anemia_severity',
-                                                              source=self.get_severity)
+                                                              source=self.step_memo.memoize('anemia_severity',
+                                                                                            self.get_severity))
 
         columns_created = [f'{self.name}_propensity', 'iron_responsiveness_propensity', f'{self.name}_ensemble_propensity']
         columns_required = ['age', 'sex']
@@ -72,6 +76,10 @@ class IronDeficiency(DiseaseState_):
                                                  creates_columns=columns_created,
                                                  requires_columns=columns_required,
                                                  requires_streams=[f'{self.name}.propensity'])
+        # Clear before any other listener evaluates the pipelines this step, and again
+        # once the base population has aged simulants during the time step with priority 8.
+        builder.event.register_listener('time_step__prepare', self.step_memo.clear, priority=0)
+        builder.event.register_listener('time_step', self.step_memo.clear, priority=9)
 
     def on_initialize_simulants(self, pop_data: 'SimulantData'):
         ensemble_propensity = self.ensemble_propensity.get_draw(pop_data.index)
@@ -85,30 +93,38 @@ class IronDeficiency(DiseaseState_):
         self.population_view.update(pop_update)
 
     def get_exposure(self, index):
-        propensity = self.population_view.subview([f'{self.name}_propensity']).get(index).iron_deficiency_propensity
-        ensemble_propensity = self.population_view.subview([f'{self.name}_propensity']).get(index).iron_deficiency_propensity
-        return self._compute_exposure(propensity, ensemble_propensity)
+        exposure_data = self._distribution.exposure_parameters(index)
+        index = exposure_data.index
+        stale = self._exposure_cache.is_stale(index, exposure_data['mean'], exposure_data['sd'])
+        if stale.any():
+            pop = self.population_view.subview([f'{self.name}_propensity',
+                                                f'{self.name}_ensemble_propensity']).get(index[stale])
+            propensity = pop[f'{self.name}_propensity']
+            ensemble_propensity = pop[f'{self.name}_ensemble_propensity']
+            stale_data = exposure_data.loc[pop.index]
+            exposure = self._distribution.compute_exposure(propensity, ensemble_propensity,
+                                                           stale_data['mean'], stale_data['sd'])
+            self._exposure_cache.update(exposure, stale_data['mean'], stale_data['sd'])
+        return self._exposure_cache.get(index)
 
     def get_disability_weight(self, index):
-        disability_data = self.raw_disability_weight(index)
         severity = self.severity(index)
-        weights = disability_data.melt().drop_duplicates().set_index('variable').loc[severity.values].value.values
-        disability_weight = pd.Series(weights, index=index)
+        pop = self.population_view.subview(['age', 'sex']).get(severity.index)
+        severity_codes = severity.loc[pop.index].cat.codes.values
+        weights = self.raw_disability_weight(pop, severity_codes)
+        disability_weight = pd.Series(weights, index=pop.index)
         return disability_weight
 
     def get_iron_responsive(self, index):
-        propensity = (self.population_view
-                      .subview(['iron_responsiveness_propensity'])
-                      .get(index)
-                      .iron_responsiveness_propensity)
-        severity = self._private_severity(index)
-        threshold = pd.Series(self.thresholds(index).lookup(index, severity), index=index)
-        iron_responsive = propensity < threshold
-        iron_responsive.name = 'iron_responsive'
+        pop = self.population_view.subview(['age', 'sex', 'iron_responsiveness_propensity']).get(index)
+        severity_codes = self._private_severity(pop.index).cat.codes.values
+        threshold = self.thresholds(pop, severity_codes)
+        iron_responsive = pd.Series(pop.iron_responsiveness_propensity.values < threshold,
+                                    index=pop.index, name='iron_responsive')
         return iron_responsive
 
     def _private_severity(self, index):
-        exposure = self.get_exposure(index)
+        exposure = self._memoized_exposure(index)
         severity = self._get_severity(exposure)
         return severity
 
@@ -118,24 +134,24 @@ class IronDeficiency(DiseaseState_):
         severity.name = 'anemia_severity'
         return severity
 
-    def _compute_exposure(self, propensity, ensemble_propensity):
-        return self._distribution.ppf(propensity, ensemble_propensity)
-
     def _get_severity(self, exposure):
+        """Classifies exposure into categorical anemia severity groups.
+
+        Each simulant's exposure is compared against its age-appropriate
+        thresholds in one vectorized pass.  The count of upper bounds the
+        exposure falls under is directly the code of the severity group in
+        :obj:`models.ANEMIA_SEVERITY_GROUPS`.  Missing exposures compare
+        false everywhere and fall in the ``'none'`` group.
+
+        """
         age = self.population_view.subview(['age']).get(exposure.index).age
-        severity = pd.Series('none', index=exposure.index, name='anemia_severity')
-
-        neonatal = age < to_years(pd.Timedelta(days=28))
-        mild = ((neonatal & (130 <= exposure) & (exposure < 150))
-                | (~neonatal & (100 <= exposure) & (exposure < 110)))
-        moderate = ((neonatal & (90 <= exposure) & (exposure < 130))
-                    | (~neonatal & (70 <= exposure) & (exposure < 100)))
-        severe = ((neonatal & (exposure < 90))
-                  | (~neonatal & (exposure < 70)))
-        severity.loc[mild] = 'mild'
-        severity.loc[moderate] = 'moderate'
-        severity.loc[severe] = 'severe'
-        return severity
+        neonatal_age_end = to_years(pd.Timedelta(days=data_values.ANEMIA_THRESHOLDS.NEONATAL_AGE_END_DAYS))
+        neonatal = (age.values < neonatal_age_end).astype(np.int8)
+        thresholds = np.array([data_values.ANEMIA_THRESHOLDS.NON_NEONATAL,
+                               data_values.ANEMIA_THRESHOLDS.NEONATAL])[neonatal]
+        severity_codes = (exposure.values[:, np.newaxis] < thresholds).sum(axis=1).astype(np.int8)
+        severity = pd.Categorical.from_codes(severity_codes, categories=models.ANEMIA_SEVERITY_GROUPS)
+        return pd.Series(severity, index=age.index, name='anemia_severity')
 
     def load_iron_responsiveness_threshold(self, builder):
         data = []
@@ -172,6 +188,160 @@ class IronDeficiency(DiseaseState_):
         return data
 
 
+class AnemiaParameterTensor:
+    """Dense lookup of an anemia severity-specific parameter.
+
+    Replaces an order 0 interpolated lookup table over sex, age and year for
+    data with one value column per anemia severity group.  The data is laid
+    out once at setup as an array indexed by [sex, age bin, year bin,
+    severity code], so a lookup is a bin search on the parameter columns
+    followed by a single integer gather.  Bin semantics match the
+    interpolation (left-closed bins, extrapolating off both ends).  A sex
+    missing from the data is an error rather than a gather from another
+    sex's values.
+
+    """
+
+    def __init__(self, data: pd.DataFrame, clock: Callable):
+        self.clock = clock
+        self.sexes = pd.Index(sorted(data['sex'].dropna().unique()))
+        self.age_starts = np.sort(data['age_start'].unique())
+        self.year_starts = np.sort(data['year_start'].unique())
+
+        self.values = np.full((len(self.sexes), len(self.age_starts), len(self.year_starts),
+                               len(models.ANEMIA_SEVERITY_GROUPS)), np.nan)
+        self.values[self.get_sex_bin(data['sex']),
+                    np.searchsorted(self.age_starts, data['age_start']),
+                    np.searchsorted(self.year_starts, data['year_start'])] = data[models.ANEMIA_SEVERITY_GROUPS].values
+
+    def __call__(self, pop: pd.DataFrame, severity_codes: np.ndarray) -> np.ndarray:
+        """Gathers the parameter for each simulant's bin and severity.
+
+        Parameters
+        ----------
+        pop
+            Table with the ``age`` and ``sex`` of the simulants to look up.
+        severity_codes
+            Codes into :obj:`models.ANEMIA_SEVERITY_GROUPS` aligned with ``pop``.
+
+        Returns
+        -------
+            The parameter values aligned with ``pop``.
+
+        """
+        sex_bin, age_bin, year_bin = self.get_bins(pop)
+        return self.values[sex_bin, age_bin, year_bin, severity_codes]
+
+    def get_bins(self, pop: pd.DataFrame) -> typing.Tuple[np.ndarray, np.ndarray, int]:
+        current_time = self.clock()
+        fractional_year = current_time.year + current_time.timetuple().tm_yday / 365.25
+        sex_bin = self.get_sex_bin(pop['sex'])
+        age_bin = self._find_bin(self.age_starts, pop['age'].values)
+        year_bin = self._find_bin(self.year_starts, fractional_year)
+        return sex_bin, age_bin, year_bin
+
+    def get_sex_bin(self, sex: pd.Series) -> np.ndarray:
+        sex_bin = self.sexes.get_indexer(sex)
+        unknown = sex_bin < 0
+        if unknown.any():
+            raise ValueError(f'Sexes {list(pd.unique(sex[unknown]))} are not one of the sexes '
+                             f'{list(self.sexes)} anemia parameters are defined for.')
+        return sex_bin
+
+    @staticmethod
+    def _find_bin(bin_starts: np.ndarray, values):
+        return np.maximum(np.searchsorted(bin_starts, values, side='right') - 1, 0)
+
+
+class StepMemo:
+    """Memoizes value producer sources within a single time step.
+
+    Several consumers evaluate the anemia pipelines for the same population
+    during a time step.  Results are keyed on the clock time and the
+    requested index, so repeated evaluations are served from memory until
+    the time or index changes or the memo is cleared.  The memo must be
+    cleared whenever the state the sources read changes within a step,
+    e.g. once simulants have aged.  Hits and misses are counted per source
+    and reported by the :class:`~vivarium_gates_lsff.components.diagnostics.TimeStepProfiler`.
+
+    """
+
+    def __init__(self, clock: Callable):
+        self.clock = clock
+        self.hits = Counter()
+        self.misses = Counter()
+        self._values = {}
+
+    def memoize(self, name: str, source: Callable[[pd.Index], pd.Series]) -> Callable[[pd.Index], pd.Series]:
+        def memoized_source(index: pd.Index) -> pd.Series:
+            time = self.clock()
+            if name in self._values:
+                cached_time, cached_index, value = self._values[name]
+                if cached_time == time and (cached_index is index or cached_index.equals(index)):
+                    self.hits[name] += 1
+                    return value.copy()
+            self.misses[name] += 1
+            value = source(index)
+            self._values[name] = (time, index, value)
+            # Pipeline modifiers may update in place, so never hand out the cached object.
+            return value.copy()
+        return memoized_source
+
+    def clear(self, event: 'Event' = None):
+        self._values.clear()
+
+
+class HemoglobinExposureCache:
+    """Per-simulant hemoglobin exposure storage.
+
+    Propensities are fixed at initialization, so a simulant's exposure only
+    changes when the exposure parameters looked up for it change (i.e. the
+    simulant crossed an age or year bin, or a modifier of the exposure
+    parameters changed its value).  Each cached exposure is stored along
+    with the parameters it was computed from so only new simulants and
+    simulants with changed parameters need their quantiles re-evaluated.
+
+    Arrays are indexed directly by the simulant index and grow along with
+    the state table.
+
+    """
+
+    def __init__(self):
+        self.exposure = np.empty(0)
+        self.mean = np.empty(0)
+        self.sd = np.empty(0)
+
+    def is_stale(self, index: pd.Index, mean: pd.Series, sd: pd.Series) -> np.ndarray:
+        """Flags simulants whose exposure is missing or was computed from other parameters."""
+        self._reserve(index)
+        positions = index.values
+        return ~((self.mean[positions] == mean.values) & (self.sd[positions] == sd.values))
+
+    def update(self, exposure: pd.Series, mean: pd.Series, sd: pd.Series):
+        self._reserve(exposure.index)
+        positions = exposure.index.values
+        self.exposure[positions] = exposure.values
+        self.mean[positions] = mean.values
+        self.sd[positions] = sd.values
+
+    def get(self, index: pd.Index) -> pd.Series:
+        return pd.Series(self.exposure[index.values], index=index, name='value')
+
+    def _reserve(self, index: pd.Index):
+        required = int(index.max()) + 1 if len(index) else 0
+        if required > len(self.exposure):
+            size = max(required, 2 * len(self.exposure))
+            self.exposure = self._extend(self.exposure, size)
+            self.mean = self._extend(self.mean, size)
+            self.sd = self._extend(self.sd, size)
+
+    @staticmethod
+    def _extend(values: np.ndarray, size: int) -> np.ndarray:
+        extended = np.full(size, np.nan)
+        extended[:len(values)] = values
+        return extended
+
+
 class IronDeficiencyDistribution:
     @property
     def name(self):
@@ -189,33 +359,62 @@ class IronDeficiencyDistribution:
         )
 
     def ppf(self, propensity: pd.Series, ensemble_propensity: pd.Series) -> pd.Series:
-        propensity = clip(propensity)
         exposure_data = self.exposure_parameters(propensity.index)
-        mean = exposure_data['mean']
-        sd = exposure_data['sd']
-
-        gamma = ensemble_propensity < data_values.HEMOGLOBIN_DISTRIBUTION.WEIGHT_GAMMA
+        return self.compute_exposure(propensity, ensemble_propensity, exposure_data['mean'], exposure_data['sd'])
+
+    def compute_exposure(self, propensity: pd.Series, ensemble_propensity: pd.Series,
+                         mean: pd.Series, sd: pd.Series) -> pd.Series:
+        """Evaluates the hemoglobin ensemble quantile function.
+
+        Distribution parameters only vary across a handful of (sex, age, year)
+        bins, so simulants are grouped by their (mean, sd) pair, the
+        distribution parameters are derived once per group, and the
+        per-simulant quantiles are evaluated with vectorized kernels over
+        parameters gathered back out by group code.
+
+        """
+        q = clip(propensity.copy()).values
+        group_codes, group_mean, group_sd = self._group_parameters(mean.values, sd.values)
+        gamma = ensemble_propensity.values < data_values.HEMOGLOBIN_DISTRIBUTION.WEIGHT_GAMMA
         gumbel = ~gamma
 
-        exposure = pd.Series(index=propensity.index, name='value')
-        exposure.loc[gamma] = self._gamma_ppf(propensity.loc[gamma], mean.loc[gamma], sd.loc[gamma])
-        exposure.loc[gumbel] = self._mirrored_gumbel_ppf(propensity.loc[gumbel], mean.loc[gumbel], sd.loc[gumbel])
-        return exposure
+        exposure = np.empty(len(q))
+        exposure[gamma] = self._gamma_ppf(q[gamma], group_codes[gamma], group_mean, group_sd)
+        exposure[gumbel] = self._mirrored_gumbel_ppf(q[gumbel], group_codes[gumbel], group_mean, group_sd)
+        return pd.Series(exposure, index=propensity.index, name='value')
+
+    @staticmethod
+    def _group_parameters(mean: np.ndarray, sd: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Codes each simulant by its distinct (mean, sd) parameter pair.
+
+        Returns the per-simulant group codes along with the mean and sd of
+        each group.  Missing parameters get their own groups and propagate
+        as NaN exposures.
+
+        """
+        mean_codes, _ = pd.factorize(mean)
+        sd_codes, sd_values = pd.factorize(sd)
+        # Shift codes so the -1 missing value sentinel stays distinct.
+        pair_codes = (mean_codes + 1) * (len(sd_values) + 1) + (sd_codes + 1)
+        group_codes, groups = pd.factorize(pair_codes)
+        representative = np.empty(len(groups), dtype=np.int64)
+        representative[group_codes] = np.arange(len(group_codes))
+        return group_codes, mean[representative], sd[representative]
 
     @staticmethod
-    def _gamma_ppf(propensity, mean, sd):
+    def _gamma_ppf(q, group_codes, mean, sd):
         shape = (mean / sd)**2
         scale = sd**2 / mean
-        return scipy.stats.gamma(a=shape, scale=scale).ppf(propensity)
+        return scipy.special.gammaincinv(shape[group_codes], q) * scale[group_codes]
 
     @staticmethod
-    def _mirrored_gumbel_ppf(propensity, mean, sd):
+    def _mirrored_gumbel_ppf(q, group_codes, mean, sd):
         x_max = data_values.HEMOGLOBIN_DISTRIBUTION.EXPOSURE_MAX
         _alpha = x_max - mean - (sd * np.euler_gamma * np.sqrt(6) / np.pi)
         scale = sd * np.sqrt(6) / np.pi
         tmp = _alpha + (scale*np.euler_gamma)
         alpha = _alpha + x_max - (2*tmp)
-        return scipy.stats.gumbel_r(alpha, scale=scale).ppf(propensity)
+        return alpha[group_codes] - scale[group_codes] * np.log(-np.log(q))
 
     @staticmethod
     def load_exposure_parameters(builder):
@@ -1,13 +1,11 @@
 import itertools
 import typing
-from collections import Counter
-from typing import Dict, List, Tuple, Iterable
+from typing import Dict, List, Tuple, Sequence
 
+import numpy as np
 import pandas as pd
 
-from vivarium_public_health.metrics.utilities import (get_output_template, get_group_counts,
-                                                      get_state_person_time, get_transition_count,
-                                                      QueryString, to_years, get_age_bins)
+from vivarium_public_health.metrics.utilities import get_output_template, to_years, get_age_bins
 from vivarium_gates_lsff.constants import models
 
 if typing.TYPE_CHECKING:
@@ -16,106 +14,165 @@ if typing.TYPE_CHECKING:
     from vivarium.framework.population import SimulantData
 
 
-class VitaminAZincStratifier:
-    """Centralized component for handling results stratification.
+class MeasureAccumulator:
+    """Dense accumulator for stratified observer measures.
 
-    This should be used as a sub-component for observers.  The observers
-    can then ask this component for population subgroups and labels during
-    results production and have this component manage adjustments to the
-    final column labels for the subgroups.
+    Values are accumulated in an array with axes [measure, year, sex,
+    age group, *strata] from integer codes for each simulant, so observers
+    never build output keys while the simulation runs.  The output keys
+    are rendered once, when the metrics are requested, and are identical
+    to those produced by the standard output template with the strata
+    labels appended as ``_{STRATUM}_{category}`` suffixes.
 
     """
 
-    def __init__(self, observer_name: str):
-        self.name = f'{observer_name}_results_stratifier'
-
-    def setup(self, builder: 'Builder'):
-        """Perform this component's setup."""
-        # The only thing you should request here are resources necessary for
-        # results stratification.
-        self.population_view = builder.population.get_view([
-            models.VITAMIN_A_MODEL_NAME,
-            'age',
-            'tracked',  # Ensure we get the full population.
-        ])
-        pipeline_keys = ['zinc_deficiency.exposure']
-        self.pipelines = {key: builder.value.get_value(key) for key in pipeline_keys}
-
-    def group(self, population: pd.DataFrame) -> Iterable[Tuple[Tuple[str, ...], pd.DataFrame]]:
-        """Takes the full population and yields stratified subgroups.
+    def __init__(self, measures: Sequence[str], config: Dict[str, bool], age_bins: pd.DataFrame,
+                 strata: Sequence[Tuple[str, Sequence[str]]] = ()):
+        self.measures = list(measures)
+        self.template = get_output_template(**config)
+        self.by_year = config['by_year']
+        self.sexes = SEXES if config['by_sex'] else ('Both',)
+        self.age_groups = tuple(age_bins.age_group_name) if config['by_age'] else ('all_ages',)
+        self.strata = list(strata)
+        self.years = []
+        self.values = np.zeros((len(self.measures), 0, len(self.sexes), len(self.age_groups))
+                               + tuple(len(categories) for _, categories in self.strata))
+
+    def update(self, year: int, measure_codes: np.ndarray, stratification_codes: Sequence[np.ndarray],
+               weight: float = 1.):
+        """Tallies simulants into their cells for the given year.
 
         Parameters
         ----------
-        population
-            The population to stratify.
-
-        Yields
-        ------
-            A tuple of stratification labels and the population subgroup
-            corresponding to those labels.
+        year
+            The year to accrue the values to.
+        measure_codes
+            The measure code of each simulant.
+        stratification_codes
+            The sex, age group and strata codes of each simulant, as
+            produced by :meth:`ResultsStratifier.stratify`.
+        weight
+            The value each simulant contributes to its cell.
+
+        Simulants with a negative code on any axis are not counted.
 
         """
-        vit_a_pop = self.vitamin_a_population(population)
-        zinc_pop = self.zinc_population(population)
-
-        groups = itertools.product(models.VITAMIN_A_MODEL_STATES,
-                                   models.ZINC_DEFICIENCY_RISK_STATES)
-        for vit_a_group, zinc_group in groups:
-            if population.empty:
-                pop_in_group = population
-            else:
-                pop_in_group = population.loc[(vit_a_pop == vit_a_group)
-                                              & (zinc_pop == zinc_group)]
-            yield (vit_a_group, zinc_group), pop_in_group
+        year_index = self._get_year_index(year)
+        cell_shape = (self.values.shape[0],) + self.values.shape[2:]
+        codes = [measure_codes, *stratification_codes]
+        in_cell = np.logical_and.reduce([c >= 0 for c in codes])
+        cells = np.ravel_multi_index([c[in_cell] for c in codes], cell_shape)
+        counts = np.bincount(cells, minlength=int(np.prod(cell_shape))).reshape(cell_shape)
+        self.values[:, year_index] += weight * counts
+
+    def to_dict(self) -> Dict[str, float]:
+        output = {}
+        for cell in itertools.product(*[range(n) for n in self.values.shape]):
+            measure, year, sex, age_group, *strata = cell
+            key = self.template.substitute(measure=self.measures[measure], year=self.years[year],
+                                           sex=self.sexes[sex], age_group=self.age_groups[age_group])
+            key += ''.join(f'_{stratum}_{categories[code]}'
+                           for (stratum, categories), code in zip(self.strata, strata))
+            output[key] = self.values[cell]
+        return output
+
+    def _get_year_index(self, year: int) -> int:
+        year = year if self.by_year else None
+        if year not in self.years:
+            self.years.append(year)
+            year_shape = (self.values.shape[0], 1) + self.values.shape[2:]
+            self.values = np.concatenate([self.values, np.zeros(year_shape)], axis=1)
+        return self.years.index(year)
+
+
+SEXES = ('Male', 'Female')
+
+
+class AgeGroup:
+    """Maintains an integer-coded age group column for results stratification.
+
+    Simulants only change age group when they age across a bin edge, so
+    the elapsed simulation time at which each simulant next reaches an edge
+    is predicted from its age and only simulants due to cross an edge are
+    re-binned each time step.  Simulants outside of every age group are
+    coded -1.
 
-    @staticmethod
-    def update_labels(measure_data: Dict[str, float], labels: Tuple[str, ...]) -> Dict[str, float]:
-        """Updates a dict of measure data with stratification labels.
-
-        Parameters
-        ----------
-        measure_data
-            The measure data with unstratified column names.
-        labels
-            The stratification labels. Yielded along with the population
-            subgroup the measure data was produced from by a call to
-            :obj:`ResultsStratifier.group`.
-
-        Returns
-        -------
-            The measure data with column names updated with the stratification
-            labels.
+    """
 
-        """
-        vit_a_group, zinc_group = labels
-        measure_data = {f'{k}_VA_{vit_a_group}_ZINC_{zinc_group}': v
-                        for k, v in measure_data.items()}
-        return measure_data
+    # Slack (in years) on predicted crossings to absorb floating point error
+    # in the accumulated ages. Simulants checked early are just re-predicted.
+    CROSSING_TOLERANCE = 1e-6
 
-    def vitamin_a_population(self, population: pd.DataFrame) -> pd.Series:
-        pop = self.population_view.get(population.index)
-        temp =  pop[models.VITAMIN_A_MODEL_NAME]
-        return temp
+    @property
+    def name(self) -> str:
+        return 'age_group'
 
-    def zinc_population(self, population: pd.DataFrame) -> pd.Series:
-        pop = self.population_view.get(population.index)
-        return self.pipelines['zinc_deficiency.exposure'](pop.index).transform(
-            lambda x: models.ZINC_DEFICIENCY_SUSCEPTIBLE_STATE_NAME if x=='cat2'
-            else models.ZINC_DEFICIENCY_WITH_CONDITION_STATE_NAME)
+    def setup(self, builder: 'Builder'):
+        self.age_bins = get_age_bins(builder)
+        self.edges = np.union1d(self.age_bins.age_start.values, self.age_bins.age_end.values)
+        self.elapsed = 0.
+        self.next_crossing = np.zeros(0)
 
+        builder.population.initializes_simulants(self.on_initialize_simulants,
+                                                 creates_columns=['age_group'],
+                                                 requires_columns=['age'])
+        self.population_view = builder.population.get_view(['age', 'age_group', 'tracked'])
+        # Simulants are aged by the base population during the time step with priority 8.
+        builder.event.register_listener('time_step', self.on_time_step, priority=9)
 
-class VitaminAStratifier:
+    def on_initialize_simulants(self, pop_data: 'SimulantData'):
+        age = self.population_view.subview(['age']).get(pop_data.index)['age']
+        self.update_age_groups(age)
+
+    def on_time_step(self, event: 'Event'):
+        self.elapsed += to_years(event.step_size)
+        due = np.flatnonzero(self.next_crossing <= self.elapsed + self.CROSSING_TOLERANCE)
+        if len(due):
+            self.update_age_groups(self.population_view.get(pd.Index(due))['age'])
+
+    def update_age_groups(self, age: pd.Series):
+        """Re-bins simulants and predicts when they will next cross a bin edge."""
+        age_values = age.values
+        age_start, age_end = self.age_bins.age_start.values, self.age_bins.age_end.values
+        codes = np.searchsorted(age_start, age_values, side='right') - 1
+        in_bin = (codes >= 0) & (age_values < age_end[codes])
+        codes = np.where(in_bin, codes, -1).astype(np.int8)
+        self.population_view.update(pd.Series(codes, index=age.index, name='age_group'))
+
+        next_edge = np.append(self.edges, np.inf)[np.searchsorted(self.edges, age_values, side='right')]
+        if len(self.next_crossing) <= age.index.max():
+            self.next_crossing = np.append(self.next_crossing,
+                                           np.full(age.index.max() + 1 - len(self.next_crossing), np.inf))
+        self.next_crossing[age.index.values] = self.elapsed + next_edge - age_values
+
+
+class ResultsStratifier:
     """Centralized component for handling results stratification.
 
-    This should be used as a sub-component for observers.  The observers
-    can then ask this component for population subgroups and labels during
-    results production and have this component manage adjustments to the
-    final column labels for the subgroups.
+    A single instance of this component is shared by all observers.  It
+    codes every simulant by sex, age group and each available
+    stratification at most once per observation phase
+    (``time_step__prepare`` and ``collect_metrics``) and serves those codes
+    to every observer from cached integer arrays.  Observers choose the
+    stratifications they report with the ``strata`` key of their
+    configuration.  Simulants that were not in the population when an
+    observation phase began (e.g. simulants added during the time step) are
+    coded when they are first requested.
 
     """
 
-    def __init__(self, observer_name: str):
-        self.name = f'{observer_name}_results_stratifier'
+    # Code marking simulants that have not been coded in this observation phase.
+    UNCODED = -2
+
+    # Stratification name: (output column label, categories)
+    STRATIFICATIONS = {
+        'vitamin_a': ('VA', models.VITAMIN_A_MODEL_STATES),
+        'zinc': ('ZINC', models.ZINC_DEFICIENCY_RISK_STATES),
+    }
+
+    @property
+    def name(self) -> str:
+        return 'results_stratifier'
 
     def setup(self, builder: 'Builder'):
         """Perform this component's setup."""
@@ -123,115 +180,170 @@ class VitaminAStratifier:
         # results stratification.
         self.population_view = builder.population.get_view([
             models.VITAMIN_A_MODEL_NAME,
-            'age',
+            'age_group',
+            'sex',
             'tracked',  # Ensure we get the full population.
         ])
+        self.zinc_exposure = builder.value.get_value('zinc_deficiency.exposure')
+        self.code_functions = {
+            'sex': self.get_sex_codes,
+            'age_group': self.get_age_group_codes,
+            'vitamin_a': self.get_vitamin_a_codes,
+            'zinc': self.get_zinc_codes,
+        }
 
-    def group(self, population: pd.DataFrame) -> Iterable[Tuple[Tuple[str, ...], pd.DataFrame]]:
-        """Takes the full population and yields stratified subgroups.
+        self._index = pd.Index([])
+        self._population = None
+        self._codes = {}
+        # Observers stratify on prepare and on collect. State changes in between,
+        # so the cache is invalidated before any observer listens to either event.
+        builder.event.register_listener('time_step__prepare', self.on_observation, priority=0)
+        builder.event.register_listener('collect_metrics', self.on_observation, priority=0)
+
+    def on_observation(self, event: 'Event'):
+        self._index = event.index
+        self._population = None
+        self._codes = {}
+
+    def get_strata(self, stratifications: Sequence[str]) -> List[Tuple[str, Sequence[str]]]:
+        """Gets the output labels and categories of the requested stratifications."""
+        unknown = set(stratifications).difference(self.STRATIFICATIONS)
+        if unknown:
+            raise ValueError(f'Unknown stratifications {sorted(unknown)}. '
+                             f'Stratifications must be in {list(self.STRATIFICATIONS)}.')
+        return [self.STRATIFICATIONS[stratification] for stratification in stratifications]
+
+    def stratify(self, index: pd.Index, config: Dict) -> Tuple[np.ndarray, ...]:
+        """Gets the sex, age group and strata codes of simulants for an observer.
 
         Parameters
         ----------
-        population
-            The population to stratify.
+        index
+            The simulants to stratify.
+        config
+            The observer configuration, with ``by_sex``, ``by_age`` and
+            ``strata`` keys.
 
-        Yields
-        ------
-            A tuple of stratification labels and the population subgroup
-            corresponding to those labels.
+        Returns
+        -------
+            Code arrays aligned with the index for sex, age group and each
+            of the configured strata, in that order.  Simulants outside of
+            every group on an axis get a code of -1.
 
         """
-        vit_a_pop = self.vitamin_a_population(population)
+        no_stratification = np.zeros(len(index), dtype=np.int8)
+        sex = self.get_codes('sex', index) if config['by_sex'] else no_stratification
+        age_group = self.get_codes('age_group', index) if config['by_age'] else no_stratification
+        return (sex, age_group) + tuple(self.get_codes(stratification, index)
+                                        for stratification in config['strata'])
+
+    def get_codes(self, stratification: str, index: pd.Index) -> np.ndarray:
+        if stratification not in self._codes:
+            if self._population is None:
+                self._population = self.population_view.get(self._index)
+            pop = self._population
+            # Indexed by simulant so lookups for any subset are a single gather.
+            codes = np.full(pop.index.max() + 1 if len(pop) else 0, self.UNCODED, dtype=np.int8)
+            codes[pop.index.values] = self.code_functions[stratification](pop)
+            self._codes[stratification] = codes
+        codes = self._codes[stratification]
+        positions = index.values
+        if len(positions) and positions.max() >= len(codes):
+            codes = np.concatenate([codes, np.full(positions.max() + 1 - len(codes), self.UNCODED, dtype=np.int8)])
+            self._codes[stratification] = codes
+        uncoded = index[codes[positions] == self.UNCODED]
+        if len(uncoded):
+            codes[uncoded.values] = self.code_functions[stratification](self.population_view.get(uncoded))
+        return codes[positions]
 
-        groups = models.VITAMIN_A_MODEL_STATES
-        for vit_a_group in groups:
-            if population.empty:
-                pop_in_group = population
-            else:
-                pop_in_group = population.loc[(vit_a_pop == vit_a_group)]
-            yield vit_a_group, pop_in_group
+    @staticmethod
+    def get_sex_codes(pop: pd.DataFrame) -> np.ndarray:
+        return pd.Index(SEXES).get_indexer(pop['sex'])
 
     @staticmethod
-    def update_labels(measure_data: Dict[str, float], labels: Tuple[str, ...]) -> Dict[str, float]:
-        """Updates a dict of measure data with stratification labels.
+    def get_age_group_codes(pop: pd.DataFrame) -> np.ndarray:
+        return pop['age_group'].values
 
-        Parameters
-        ----------
-        measure_data
-            The measure data with unstratified column names.
-        labels
-            The stratification labels. Yielded along with the population
-            subgroup the measure data was produced from by a call to
-            :obj:`ResultsStratifier.group`.
+    @staticmethod
+    def get_vitamin_a_codes(pop: pd.DataFrame) -> np.ndarray:
+        return pd.Index(models.VITAMIN_A_MODEL_STATES).get_indexer(pop[models.VITAMIN_A_MODEL_NAME])
 
-        Returns
-        -------
-            The measure data with column names updated with the stratification
-            labels.
+    def get_zinc_codes(self, pop: pd.DataFrame) -> np.ndarray:
+        exposure = self.zinc_exposure(pop.index)
+        susceptible = models.ZINC_DEFICIENCY_RISK_STATES.index(models.ZINC_DEFICIENCY_SUSCEPTIBLE_STATE_NAME)
+        with_condition = models.ZINC_DEFICIENCY_RISK_STATES.index(models.ZINC_DEFICIENCY_WITH_CONDITION_STATE_NAME)
+        return np.where(exposure.values == 'cat2', susceptible, with_condition)
 
-        """
-        vit_a_group = labels
-        measure_data = {f'{k}_VA_{vit_a_group}': v
-                        for k, v in measure_data.items()}
-        return measure_data
 
-    def vitamin_a_population(self, population: pd.DataFrame) -> pd.Series:
-        pop = self.population_view.get(population.index)
-        temp =  pop[models.VITAMIN_A_MODEL_NAME]
-        return temp
+class StateObserver:
+    """Observes transition counts and person time for a cause.
 
+    Causes are stratified by default by the risks that affect them, and by
+    nothing else unless configured with ``strata``.
 
-class StateObserver:
-    """Observes transition counts and person time for a cause."""
+    """
     configuration_defaults = {
         'metrics': {
             'disease_observer': {
                 'by_age': False,
                 'by_year': False,
                 'by_sex': False,
+                'strata': [],
             }
         }
     }
 
-    stratifier_map = {
-        models.DIARRHEA_MODEL_NAME: VitaminAZincStratifier,
-        models.MEASLES_MODEL_NAME: VitaminAStratifier
+    # Cause: default strata
+    strata_map = {
+        models.DIARRHEA_MODEL_NAME: ['vitamin_a', 'zinc'],
+        models.MEASLES_MODEL_NAME: ['vitamin_a'],
     }
 
     def __init__(self, disease: str):
         self.disease = disease
         self.configuration_defaults = {
-            'metrics': {f'{disease}_observer': StateObserver.configuration_defaults['metrics']['disease_observer']}
+            'metrics': {f'{disease}_observer': {
+                **StateObserver.configuration_defaults['metrics']['disease_observer'],
+                'strata': StateObserver.strata_map.get(disease, []),
+            }}
         }
-        self.stratifier = StateObserver.stratifier_map[disease](disease)
 
     @property
     def name(self) -> str:
         return f'disease_observer.{self.disease}'
 
-    @property
-    def sub_components(self) -> List[VitaminAZincStratifier]:
-        return [self.stratifier]
-
     def setup(self, builder: 'Builder'):
         self.config = builder.configuration['metrics'][f'{self.disease}_observer'].to_dict()
         self.clock = builder.time.clock()
         self.age_bins = get_age_bins(builder)
-        self.counts = Counter()
-        self.person_time = Counter()
+        self.stratifier = builder.components.get_component('results_stratifier')
+        strata = self.stratifier.get_strata(self.config['strata'])
 
         self.states = models.STATE_MACHINE_MAP[self.disease]['states']
         self.transitions = models.STATE_MACHINE_MAP[self.disease]['transitions']
+        self.counts = MeasureAccumulator([f'{transition}_event_count' for transition in self.transitions],
+                                         self.config, self.age_bins, strata)
+        self.person_time = MeasureAccumulator([f'{state}_person_time' for state in self.states],
+                                              self.config, self.age_bins, strata)
+        # States are coded in this order.  Transitions may reach states with no person time
+        # observed (e.g. recovered states), which are coded after the observed states.
+        self.coded_states = pd.Index(list(self.states))
+        for transition in self.transitions:
+            for state in [transition.from_state, transition.to_state]:
+                if state not in self.coded_states:
+                    self.coded_states = self.coded_states.append(pd.Index([state]))
+        # Maps a (previous state code, current state code) pair code to a transition code.
+        self.transition_map = np.full(len(self.coded_states) ** 2, -1)
+        for code, transition in enumerate(self.transitions):
+            pair_code = (self.coded_states.get_loc(transition.from_state) * len(self.coded_states)
+                         + self.coded_states.get_loc(transition.to_state))
+            self.transition_map[pair_code] = code
 
         self.previous_state_column = f'previous_{self.disease}'
         builder.population.initializes_simulants(self.on_initialize_simulants,
                                                  creates_columns=[self.previous_state_column])
 
         columns_required = ['alive', f'{self.disease}', self.previous_state_column]
-        if self.config['by_age']:
-            columns_required += ['age']
-        if self.config['by_sex']:
-            columns_required += ['sex']
         self.population_view = builder.population.get_view(columns_required)
 
         builder.value.register_value_modifier('metrics', self.metrics)
@@ -242,45 +354,45 @@ class StateObserver:
         builder.event.register_listener('collect_metrics', self.on_collect_metrics)
 
     def on_initialize_simulants(self, pop_data: 'SimulantData'):
-        self.population_view.update(pd.Series('', index=pop_data.index, name=self.previous_state_column))
+        # The previous state is stored as an int8 state code, with -1 for no state.
+        self.population_view.update(pd.Series(-1, index=pop_data.index, name=self.previous_state_column,
+                                              dtype=np.int8))
 
     def on_time_step_prepare(self, event: 'Event'):
         pop = self.population_view.get(event.index)
+        state_codes = self.get_state_codes(pop)
         # Ignoring the edge case where the step spans a new year.
         # Accrue all counts and time to the current year.
-        for labels, pop_in_group in self.stratifier.group(pop):
-            for state in self.states:
-                # noinspection PyTypeChecker
-                state_person_time_this_step = get_state_person_time(pop_in_group, self.config, self.disease, state,
-                                                                    self.clock().year, event.step_size, self.age_bins)
-                state_person_time_this_step = self.stratifier.update_labels(state_person_time_this_step, labels)
-                self.person_time.update(state_person_time_this_step)
+        alive = (pop['alive'] == 'alive').values
+        person_time_codes = np.where(state_codes < len(self.states), state_codes, -1)
+        self.person_time.update(self.clock().year, person_time_codes[alive],
+                                self.stratifier.stratify(pop.index[alive], self.config),
+                                weight=to_years(event.step_size))
 
         # This enables tracking of transitions between states
-        prior_state_pop = self.population_view.get(event.index)
-        prior_state_pop[self.previous_state_column] = prior_state_pop[self.disease]
-        self.population_view.update(prior_state_pop)
+        self.population_view.update(pd.Series(state_codes, index=pop.index, name=self.previous_state_column))
 
     def on_collect_metrics(self, event: 'Event'):
         pop = self.population_view.get(event.index)
-        for labels, pop_in_group in self.stratifier.group(pop):
-            for transition in self.transitions:
-                # noinspection PyTypeChecker
-                transition_counts_this_step = get_transition_count(pop_in_group, self.config, self.disease, transition,
-                                                                   event.time, self.age_bins)
-                transition_counts_this_step = self.stratifier.update_labels(transition_counts_this_step, labels)
-                self.counts.update(transition_counts_this_step)
+        previous_codes = pop[self.previous_state_column].values.astype(np.int64)
+        state_codes = self.get_state_codes(pop)
+        observed = (previous_codes >= 0) & (state_codes >= 0)
+        pair_codes = np.where(observed, previous_codes * len(self.coded_states) + state_codes, 0)
+        transition_codes = np.where(observed, self.transition_map[pair_codes], -1)
+        self.counts.update(event.time.year, transition_codes, self.stratifier.stratify(pop.index, self.config))
+
+    def get_state_codes(self, pop: pd.DataFrame) -> np.ndarray:
+        return self.coded_states.get_indexer(pop[self.disease]).astype(np.int8)
 
     def metrics(self, index: pd.Index, metrics: Dict[str, float]):
-        metrics.update(self.counts)
-        metrics.update(self.person_time)
+        metrics.update(self.counts.to_dict())
+        metrics.update(self.person_time.to_dict())
         return metrics
 
     def __repr__(self) -> str:
         return f"StateObserver({self.disease})"
 
 
-
 class AnemiaObserver:
     """Observes person time in the various anemia states"""
     configuration_defaults = {
@@ -289,6 +401,7 @@ class AnemiaObserver:
                 'by_age': True,
                 'by_year': True,
                 'by_sex': True,
+                'strata': [],
             }
         }
     }
@@ -307,16 +420,14 @@ class AnemiaObserver:
         self.config = builder.configuration['metrics'][models.ANEMIA_OBSERVER].to_dict()
         self.clock = builder.time.clock()
         self.age_bins = get_age_bins(builder)
-        self.person_time = Counter()
+        self.stratifier = builder.components.get_component('results_stratifier')
         self.anemia_severity = builder.value.get_value('anemia_severity')
         self.states = models.ANEMIA_SEVERITY_GROUPS
+        self.person_time = MeasureAccumulator([f'anemia_{state}_person_time' for state in self.states],
+                                              self.config, self.age_bins,
+                                              self.stratifier.get_strata(self.config['strata']))
 
-        columns_required = ['alive']
-        if self.config['by_age']:
-            columns_required += ['age']
-        if self.config['by_sex']:
-            columns_required += ['sex']
-        self.population_view = builder.population.get_view(columns_required)
+        self.population_view = builder.population.get_view(['alive'])
 
         builder.value.register_value_modifier('metrics', self.metrics)
         # FIXME: The state table is modified before the clock advances.
@@ -326,18 +437,13 @@ class AnemiaObserver:
 
     def on_time_step_prepare(self, event: 'Event'):
         pop = self.population_view.get(event.index)
-        pop['anemia'] = self.anemia_severity(pop.index)
+        pop = pop.loc[pop['alive'] == 'alive']
+        severity_codes = self.anemia_severity(pop.index).cat.codes.values
         # Ignoring the edge case where the step spans a new year.
         # Accrue all counts and time to the current year.
-        for state in self.states:
-            base_key = get_output_template(**self.config).substitute(measure=f'anemia_{state}_person_time',
-                                                                     year=self.clock().year)
-            base_filter = QueryString(f'alive == "alive" and anemia == "{state}"')
-            # noinspection PyTypeChecker
-            person_time = get_group_counts(pop, base_filter, base_key, self.config, self.age_bins,
-                                           aggregate=lambda x: len(x) * to_years(event.step_size))
-            self.person_time.update(person_time)
+        self.person_time.update(self.clock().year, severity_codes, self.stratifier.stratify(pop.index, self.config),
+                                weight=to_years(event.step_size))
 
     def metrics(self, index: pd.Index, metrics: Dict[str, float]):
-        metrics.update(self.person_time)
+        metrics.update(self.person_time.to_dict())
         return metrics
@@ -8,6 +8,7 @@ from vivarium_public_health.utilities import TargetString
 #############
 
 METADATA_LOCATIONS = 'metadata.locations'
+METADATA_PROVENANCE = 'metadata.provenance'
 
 
 class __Population(NamedTuple):
@@ -217,3 +218,20 @@ MAKE_ARTIFACT_KEY_GROUPS = [
     CSMR_AFFECTEDBY_LBWSG,
     ZINC,
 ]
+
+
+# Keys that must be written before a key is loaded.  The anemia iron responsive
+# proportions pull the prevalence of overlapping sets of anemia sequelae.  They
+# are loaded after the no anemia proportion, which pulls all of them, so they find
+# every sequela already pulled for the build rather than waiting on each other's pulls.
+MAKE_ARTIFACT_KEY_DEPENDENCIES = {
+    IRON_DEFICIENCY.IRON_DEFICIENCY_MILD_ANEMIA_IRON_RESPONSIVE_PROPORTION: [
+        IRON_DEFICIENCY.IRON_DEFICIENCY_NO_ANEMIA_IRON_RESPONSIVE_PROPORTION,
+    ],
+    IRON_DEFICIENCY.IRON_DEFICIENCY_MODERATE_ANEMIA_IRON_RESPONSIVE_PROPORTION: [
+        IRON_DEFICIENCY.IRON_DEFICIENCY_NO_ANEMIA_IRON_RESPONSIVE_PROPORTION,
+    ],
+    IRON_DEFICIENCY.IRON_DEFICIENCY_SEVERE_ANEMIA_IRON_RESPONSIVE_PROPORTION: [
+        IRON_DEFICIENCY.IRON_DEFICIENCY_NO_ANEMIA_IRON_RESPONSIVE_PROPORTION,
+    ],
+}
@@ -1,4 +1,4 @@
-from typing import NamedTuple
+from typing import NamedTuple, Tuple
 
 
 class __HEMOGLOBIN_DISTRIBUTION(NamedTuple):
@@ -10,6 +10,17 @@ class __HEMOGLOBIN_DISTRIBUTION(NamedTuple):
 HEMOGLOBIN_DISTRIBUTION = __HEMOGLOBIN_DISTRIBUTION()
 
 
+# Exclusive upper hemoglobin bounds (g/L) of the severe, moderate and mild
+# anemia severity groups, i.e. ordered from most to least severe.
+class __ANEMIA_THRESHOLDS(NamedTuple):
+    NEONATAL_AGE_END_DAYS: int = 28
+    NEONATAL: Tuple[float, float, float] = (90., 130., 150.)
+    NON_NEONATAL: Tuple[float, float, float] = (70., 100., 110.)
+
+
+ANEMIA_THRESHOLDS = __ANEMIA_THRESHOLDS()
+
+
 ANEMIA_SEQUELAE_ID_MAP = {
     'mild': (
         # responsive
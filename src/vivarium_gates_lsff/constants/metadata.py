@@ -13,6 +13,12 @@ MAKE_ARTIFACT_MEM = '10G'
 MAKE_ARTIFACT_CPU = '1'
 MAKE_ARTIFACT_RUNTIME = '3:00:00'
 MAKE_ARTIFACT_SLEEP = 10
+# Keys are loaded serially by default.  Loading them in threads (make_artifacts -k)
+# saves time spent waiting on GBD but assumes the GBD access stack is thread safe.
+MAKE_ARTIFACT_KEY_WORKERS = 1
+# Raw GBD pulls are only cached if a directory is given (make_artifacts --gbd-cache-dir).
+GBD_CACHE_DIR_ENVIRONMENT_VARIABLE = 'VIVARIUM_GATES_LSFF_GBD_CACHE_DIR'
+GBD_CACHE_MAX_BYTES = 20 * 2**30
 
 
 class __Locations(NamedTuple):
@@ -55,6 +55,19 @@ ZINC_DEFICIENCY_RISK_NAME = 'zinc_deficiency'
 ZINC_DEFICIENCY_WITH_CONDITION_STATE_NAME = ZINC_DEFICIENCY_RISK_NAME
 ZINC_DEFICIENCY_SUSCEPTIBLE_STATE_NAME = f'susceptible_to_{ZINC_DEFICIENCY_RISK_NAME}'
 ZINC_DEFICIENCY_RISK_STATES = (ZINC_DEFICIENCY_SUSCEPTIBLE_STATE_NAME, ZINC_DEFICIENCY_WITH_CONDITION_STATE_NAME)
+ZINC_DEFICIENCY_RISK_CATEGORIES = ['cat1', 'cat2']
+
+
+LBWSG_RISK_NAME = 'low_birth_weight_and_short_gestation'
+# GBD exposure categories, one per (gestational age, birth weight) bin. The ids are not contiguous.
+LBWSG_RISK_CATEGORIES = [
+    'cat2', 'cat8', 'cat10', 'cat11', 'cat14', 'cat15', 'cat17', 'cat19', 'cat20', 'cat21', 'cat22',
+    'cat23', 'cat24', 'cat25', 'cat26', 'cat27', 'cat28', 'cat29', 'cat30', 'cat31', 'cat32',
+    'cat33', 'cat34', 'cat35', 'cat36', 'cat37', 'cat38', 'cat39', 'cat40', 'cat41', 'cat42',
+    'cat43', 'cat44', 'cat45', 'cat46', 'cat47', 'cat48', 'cat49', 'cat50', 'cat51', 'cat52',
+    'cat53', 'cat54', 'cat55', 'cat56', 'cat80', 'cat81', 'cat82', 'cat88', 'cat89', 'cat90',
+    'cat95', 'cat96', 'cat106', 'cat116', 'cat117', 'cat123', 'cat124'
+]
 
 
 STATE_MACHINE_MAP = {
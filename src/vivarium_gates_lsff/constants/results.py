@@ -100,7 +100,7 @@ def RESULT_COLUMNS(field_map, kind='all'):
     columns = []
     if kind == 'all':
         for k in COLUMN_TEMPLATES:
-            columns += RESULT_COLUMNS(k)
+            columns += RESULT_COLUMNS(field_map, k)
         columns = list(STANDARD_COLUMNS.values()) + columns
     else:
         template = COLUMN_TEMPLATES[kind]
@@ -9,14 +9,22 @@ Some degree of verbosity/boilerplate is fine in the interest of transparancy.
    Logging in this module should be done at the ``debug`` level.
 
 """
+from concurrent import futures
+import hashlib
+import inspect
+import json
 from pathlib import Path
+import sys
+import time
+import types
+from typing import Callable, Dict, List, Set, Tuple
 
 from loguru import logger
 import pandas as pd
 from vivarium.framework.artifact import Artifact, EntityKey
 
-from vivarium_gates_lsff.constants import data_keys
-from vivarium_gates_lsff.data import loader
+from vivarium_gates_lsff.constants import data_keys, data_values
+from vivarium_gates_lsff.data import cache
 
 
 def open_artifact(output_path: Path, location: str) -> Artifact:
@@ -48,28 +56,163 @@ def open_artifact(output_path: Path, location: str) -> Artifact:
     return artifact
 
 
-def load_and_write_data(artifact: Artifact, key: str, location: str):
-    """Loads data and writes it to the artifact if not already present.
+def load_and_write_all_data(artifact: Artifact, keys: List[str], location: str,
+                            dependencies: Dict[str, List[str]], workers: int,
+                            incremental: bool = False) -> pd.DataFrame:
+    """Loads data for many keys concurrently and writes it to the artifact.
+
+    Keys are loaded in a pool of threads as soon as the keys they depend on
+    have been written.  All writes happen in the calling thread, so the
+    artifact only ever has a single writer.  Keys already in the artifact
+    are skipped unless the build is incremental and they are stale.
+
+    Loading keys in threads relies on the GBD access stack (``vivarium_inputs``
+    and the database clients under it) being safe to call concurrently.
+    That has not been verified for every pull, so with a single worker
+    keys are loaded one at a time in the pool thread and nothing else
+    reaches GBD concurrently.
+
+    The provenance of each key written is recorded in the artifact (see
+    :func:`get_provenance`).  A key is stale if its recorded provenance
+    differs from its current provenance or it has none recorded.
 
     Parameters
     ----------
     artifact
         The artifact to write to.
-    key
-        The entity key associated with the data to write.
+    keys
+        The entity keys associated with the data to write.
     location
         The location associated with the data to load and the artifact to
         write to.
+    dependencies
+        The keys that must be written before each key is loaded.
+        Dependencies that are not in ``keys`` are ignored.
+    workers
+        The number of keys to load at once.  One loads keys serially.
+    incremental
+        Whether to reload and replace the stale keys in the artifact.
+
+    Returns
+    -------
+        The seconds spent loading and writing each key that was written,
+        in the order the keys were written.
 
     """
+    # Local import so artifacts can be written without GBD data dependencies.
+    from vivarium_gates_lsff.data import loader
+
+    def load(key: str) -> Tuple[pd.DataFrame, float]:
+        start = time.perf_counter()
+        logger.debug(f'Loading data for {key} for location {location}.')
+        return loader.get_data(key, location), time.perf_counter() - start
+
+    with cache.HDF_LOCK:
+        if data_keys.METADATA_PROVENANCE in artifact:
+            provenance = artifact.load(data_keys.METADATA_PROVENANCE)
+        else:
+            provenance = {}
+    current_provenance = {key: get_provenance(key, location) for key in keys}
+
+    waiting = []
+    for key in keys:
+        if key not in artifact:
+            waiting.append(key)
+        elif incremental and provenance.get(key) != current_provenance[key]:
+            logger.debug(f'Data for {key} in artifact is stale.  Reloading...')
+            waiting.append(key)
+        else:
+            logger.debug(f'Data for {key} already in artifact.  Skipping...')
+    written = set(keys).difference(waiting)
+    timings = []
+    try:
+        with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            loading = {}
+            while waiting or loading:
+                ready = [k for k in waiting if all(d in written or d not in keys for d in dependencies.get(k, []))]
+                for key in ready:
+                    waiting.remove(key)
+                    loading[executor.submit(load, key)] = key
+                if not loading:
+                    raise ValueError(f'Keys {waiting} have circular dependencies.')
+
+                done, _ = futures.wait(loading, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    key = loading.pop(future)
+                    data, load_seconds = future.result()
+                    start = time.perf_counter()
+                    logger.debug(f'Writing data for {key} to artifact.')
+                    provenance[key] = current_provenance[key]
+                    # Loading threads may be reading or writing cached pulls meanwhile.
+                    with cache.HDF_LOCK:
+                        write_or_replace(artifact, key, data)
+                        write_or_replace(artifact, data_keys.METADATA_PROVENANCE, provenance)
+                    write_seconds = time.perf_counter() - start
+                    logger.debug(f'Loaded {key} in {load_seconds:.1f}s and wrote it in {write_seconds:.1f}s.')
+                    written.add(key)
+                    timings.append((key, load_seconds, write_seconds))
+    finally:
+        # Data shared between the keys of this build is not needed by the next one.
+        loader.clear_sequela_prevalence()
+    return pd.DataFrame(timings, columns=['key', 'load_seconds', 'write_seconds'])
+
+
+def write_or_replace(artifact: Artifact, key: str, data):
     if key in artifact:
-        logger.debug(f'Data for {key} already in artifact.  Skipping...')
+        artifact.replace(key, data)
     else:
-        logger.debug(f'Loading data for {key} for location {location}.')
-        data = loader.get_data(key, location)
-        logger.debug(f'Writing data for {key} to artifact.')
         artifact.write(key, data)
-    return artifact.load(key)
+
+
+def get_provenance(key: str, location: str) -> str:
+    """Hashes everything the data for a key is loaded from.
+
+    This is the source of the key's loader function and of every loader
+    module function it calls in turn, the ``data_values`` constants any of
+    them read, the key and location, and the versions of the packages that
+    pull GBD data.
+
+    """
+    from vivarium_gates_lsff.data import loader
+
+    sources, constants = {}, {}
+    collect_loader_sources(loader.get_loader(key), sources, constants)
+    contents = json.dumps({
+        'key': key,
+        'location': location,
+        'sources': sources,
+        'constants': constants,
+        'gbd_release': cache.get_gbd_release(),
+        'package_versions': cache.get_package_versions(),
+    }, sort_keys=True)
+    return hashlib.sha256(contents.encode()).hexdigest()
+
+
+def collect_loader_sources(function: Callable, sources: Dict[str, str], constants: Dict[str, str]):
+    """Collects the source of a function, the module functions it calls and the constants it reads."""
+    function = inspect.unwrap(function)
+    if function.__qualname__ in sources:
+        return
+    sources[function.__qualname__] = inspect.getsource(function)
+    module = sys.modules[function.__module__]
+    for name in get_code_names(function.__code__):
+        value = getattr(module, name, None)
+        if callable(value):
+            # Memoized functions are wrapped.
+            value = inspect.unwrap(value)
+        if inspect.isfunction(value) and value.__module__ == module.__name__:
+            collect_loader_sources(value, sources, constants)
+        if name.isupper() and hasattr(data_values, name):
+            constants[name] = repr(getattr(data_values, name))
+
+
+def get_code_names(code: types.CodeType) -> Set[str]:
+    """Gets the global and attribute names used by code, including by its comprehensions."""
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            names |= get_code_names(constant)
+    return names
 
 
 def write_data(artifact: Artifact, key: str, data: pd.DataFrame):
@@ -0,0 +1,219 @@
+"""On-disk cache of raw GBD pulls.
+
+Pulls are keyed by what was pulled (entity, measure and location), by the
+GBD round and decomp step (which fixes the model versions pulled) and by
+the versions of the packages that pull and transform GBD data, so a cached
+pull is reused across artifact builds until any of those change.
+
+Nothing is cached unless a cache is set.  :func:`set_cache` swaps the
+cache used by the loader, e.g. for a :class:`DirectoryCache` in a
+directory passed to ``make_artifacts --gbd-cache-dir``, or for one opened
+``read_only`` on a directory of stand-in data so artifacts can be built
+without database access.
+
+"""
+import functools
+import hashlib
+from importlib import metadata as importlib_metadata
+import json
+import os
+from pathlib import Path
+import threading
+from typing import Callable, Dict, Optional, Tuple, Type, Union
+import uuid
+
+import pandas as pd
+
+# Packages whose versions change what a pull returns.
+VERSIONED_PACKAGES = ('gbd_mapping', 'vivarium_gbd_access', 'vivarium_inputs')
+# Settings of vivarium_gbd_access.gbd that select the GBD round and models pulled.
+GBD_RELEASE_SETTINGS = ('GBD_ROUND_ID', 'DECOMP_STEP')
+
+# PyTables is not thread safe and keys are loaded in threads, so every HDF
+# read and write made while building an artifact, artifact writes included,
+# holds this lock.
+HDF_LOCK = threading.Lock()
+
+
+class DataCache:
+    """A cache that never holds anything, so every pull goes to GBD."""
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Gets the data cached under the key, or ``None`` if it is not cached."""
+        return None
+
+    def put(self, key: str, data: pd.DataFrame):
+        """Caches the data under the key."""
+        pass
+
+
+class DirectoryCache(DataCache):
+    """Caches pulls as compressed HDF files in a directory.
+
+    Files are named by their key.  Reading a file marks it as recently
+    used, and the least recently used files are deleted once the directory
+    grows past ``max_bytes``.
+
+    A directory may be shared by processes building artifacts at the same
+    time.  Files are written under a temporary name and renamed into place,
+    so a reader never sees a partial pull, and any process may evict a file
+    another is about to read, which that reader sees as a miss.
+
+    Parameters
+    ----------
+    directory
+        The directory holding the cached pulls.  It is created if it does
+        not exist.
+    max_bytes
+        The size the directory is kept under, or ``None`` for no limit.
+    read_only
+        Whether the directory holds stand-in data.  If so, nothing is
+        written to it and getting a key that is not in it is an error
+        rather than a miss.
+
+    """
+
+    def __init__(self, directory: Path, max_bytes: Optional[int] = None, read_only: bool = False):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.read_only = read_only
+        if not read_only:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        path = self.directory / f'{key}.hdf'
+        with HDF_LOCK:
+            try:
+                data = pd.read_hdf(path, 'data')
+            except FileNotFoundError:
+                if self.read_only:
+                    raise KeyError(f'No stand-in data for {key} in {str(self.directory)}.')
+                return None
+        if not self.read_only:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                # Evicted by another process sharing the directory since it was read.
+                pass
+        return data
+
+    def put(self, key: str, data: pd.DataFrame):
+        if self.read_only:
+            return
+        path = self.directory / f'{key}.hdf'
+        # Written to a temporary file first so a failed write never leaves a partial pull behind.
+        temporary_path = self.directory / f'{key}.{uuid.uuid4().hex}.tmp'
+        with HDF_LOCK:
+            data.to_hdf(temporary_path, key='data', complevel=9, complib='blosc:zstd')
+        os.replace(temporary_path, path)
+        if self.max_bytes is not None:
+            self.evict(self.max_bytes)
+
+    def evict(self, max_bytes: int):
+        """Deletes the least recently used pulls until the cache is under the size."""
+        files = []
+        for path in self.directory.glob('*.hdf'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        size = sum(file_size for _, file_size, _ in files)
+        for _, file_size, path in sorted(files):
+            if size <= max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            size -= file_size
+
+
+_cache = DataCache()
+
+
+def get_cache() -> DataCache:
+    """Gets the cache of raw GBD pulls, by default one that never holds anything."""
+    return _cache
+
+
+def set_cache(cache: DataCache):
+    """Sets the cache of raw GBD pulls."""
+    global _cache
+    _cache = cache
+
+
+def cached_pull(pull: Callable[..., pd.DataFrame], entity: Optional[str], measure: str,
+                location: Optional[str], *args, errors: Tuple[Type[Exception], ...] = ()) -> pd.DataFrame:
+    """Pulls data from GBD unless the same pull is cached.
+
+    Parameters
+    ----------
+    pull
+        The function that pulls the data.  It is called with ``args``.
+    entity
+        The name of the entity the data is for, if any.
+    measure
+        The name of the measure pulled.
+    location
+        The location the data is for, if any.
+    args
+        The arguments to the pull.
+    errors
+        Errors the pull is expected to raise when GBD has no usable data.
+        These are cached like data and raised again on every cached pull.
+
+    Returns
+    -------
+        The pulled data.
+
+    """
+    cache = get_cache()
+    key = get_key(entity, measure, location)
+    data = cache.get(key)
+    error_types = {error_type.__name__: error_type for error_type in errors}
+    if data is None or (is_cached_error(data) and data['type'] not in error_types):
+        try:
+            data = pull(*args)
+        except errors as error:
+            data = pd.Series([type(error).__name__, str(error)], index=['type', 'message'], name=_CACHED_ERROR)
+        cache.put(key, data)
+    if is_cached_error(data):
+        raise error_types[data['type']](data['message'])
+    return data
+
+
+_CACHED_ERROR = 'cached_error'
+
+
+def is_cached_error(data: Union[pd.DataFrame, pd.Series]) -> bool:
+    return isinstance(data, pd.Series) and data.name == _CACHED_ERROR
+
+
+def get_key(entity: Optional[str], measure: str, location: Optional[str]) -> str:
+    """Hashes what was pulled, the GBD release it was pulled from and the versions of the packages that pulled it."""
+    contents = json.dumps([entity, measure, location, get_gbd_release(), get_package_versions()],
+                          sort_keys=True, default=str)
+    return hashlib.sha256(contents.encode()).hexdigest()
+
+
+@functools.lru_cache()
+def get_gbd_release() -> Dict[str, Optional[str]]:
+    """Gets the GBD round and decomp step GBD data is pulled from."""
+    try:
+        from vivarium_gbd_access import gbd
+    except ImportError:
+        gbd = None
+    return {setting: getattr(gbd, setting, None) for setting in GBD_RELEASE_SETTINGS}
+
+
+@functools.lru_cache()
+def get_package_versions() -> Dict[str, Optional[str]]:
+    return {package: get_package_version(package) for package in VERSIONED_PACKAGES}
+
+
+def get_package_version(package: str) -> Optional[str]:
+    try:
+        return importlib_metadata.version(package)
+    except importlib_metadata.PackageNotFoundError:
+        return None
@@ -12,10 +12,15 @@ for an example.
 
    No logging is done here. Logging is done in vivarium inputs itself and forwarded.
 """
-from typing import Dict, NamedTuple, Callable
+from collections import defaultdict
+import functools
+import threading
+from typing import Dict, List, NamedTuple, Callable, Optional, Tuple, Union
+
+import numpy as np
 import pandas as pd
 
-from gbd_mapping import causes, covariates, risk_factors, sequelae
+from gbd_mapping import causes, covariates, risk_factors, sequelae, Sequela
 from vivarium.framework.artifact import EntityKey
 from vivarium_gbd_access import gbd
 from vivarium_inputs import globals as vi_globals, interface, extract, utilities as vi_utils, utility_data
@@ -23,6 +28,7 @@ from vivarium_inputs.mapping_extension import alternative_risk_factors
 
 from vivarium_gates_lsff import paths
 from vivarium_gates_lsff.constants import data_keys, data_values
+from vivarium_gates_lsff.data import cache
 
 
 def map_loader_funcs(keys: NamedTuple) -> Dict[str, Callable]:
@@ -50,6 +56,11 @@ def get_data(lookup_key: str, location: str) -> pd.DataFrame:
         The requested data.
 
     """
+    return get_loader(lookup_key)(lookup_key, location)
+
+
+def get_loader(lookup_key: str) -> Callable:
+    """Gets the function that loads the data for a key."""
     mapping = {
         data_keys.POPULATION.LOCATION: load_population_location,
         data_keys.POPULATION.STRUCTURE: load_population_structure,
@@ -78,7 +89,7 @@ def get_data(lookup_key: str, location: str) -> pd.DataFrame:
         data_keys.IRON_DEFICIENCY.IRON_DEFICIENCY_RESTRICTIONS: load_metadata,
     })
     mapping.update(map_loader_funcs(data_keys.CSMR_AFFECTEDBY_LBWSG))
-    return mapping[lookup_key](lookup_key, location)
+    return mapping[lookup_key]
 
 def load_population_location(key: str, location: str) -> str:
     if key != data_keys.POPULATION.LOCATION:
@@ -87,25 +98,26 @@ def load_population_location(key: str, location: str) -> str:
 
     
 def load_population_structure(key: str, location: str) -> pd.DataFrame:
-    return interface.get_population_structure(location)
+    return cache.cached_pull(interface.get_population_structure, None, 'structure', location, location)
 
 
 def load_age_bins(key: str, location: str) -> pd.DataFrame:
-    return interface.get_age_bins()
+    return cache.cached_pull(interface.get_age_bins, None, 'age_bins', None)
 
 
 def load_demographic_dimensions(key: str, location: str) -> pd.DataFrame:
-    return interface.get_demographic_dimensions(location)
+    return cache.cached_pull(interface.get_demographic_dimensions, None, 'demographic_dimensions', location, location)
 
 
 def load_theoretical_minimum_risk_life_expectancy(key: str, location: str) -> pd.DataFrame:
-    return interface.get_theoretical_minimum_risk_life_expectancy()
+    return cache.cached_pull(interface.get_theoretical_minimum_risk_life_expectancy, None,
+                             'theoretical_minimum_risk_life_expectancy', None)
 
 
 def load_standard_data(key: str, location: str) -> pd.DataFrame:
     key = EntityKey(key)
     entity = get_entity(key)
-    return interface.get_measure(entity, key.measure, location)
+    return get_measure(entity, key.measure, location)
 
 
 def load_metadata(key: str, location: str):
@@ -138,32 +150,13 @@ def load_no_anemia_iron_responsive_proportion(key: str, location: str):
         responsive_ids.extend(responsive)
         non_responsive_ids.extend(non_responsive)
 
-    responsive_sequelae = [s for s in sequelae if s.gbd_id in responsive_ids]
-    non_responsive_sequelae = [s for s in sequelae if s.gbd_id in non_responsive_ids]
-
-    all_prevalence = []
-    iron_responsive_prevalence = []
-    for sequela in responsive_sequelae:
-        try:
-            prevalence = interface.get_measure(sequela, 'prevalence', location)
-        except (extract.DataDoesNotExistError, extract.DataAbnormalError):
-            continue
-        all_prevalence.append(prevalence)
-        iron_responsive_prevalence.append(prevalence)
-    for sequela in non_responsive_sequelae:
-        try:
-            prevalence = interface.get_measure(sequela, 'prevalence', location)
-        except (extract.DataDoesNotExistError, extract.DataAbnormalError):
-            continue
-        all_prevalence.append(prevalence)
-    all_prevalence = sum(all_prevalence)
-    iron_responsive_prevalence = sum(iron_responsive_prevalence)
-    non_responsive_prevalence = all_prevalence - iron_responsive_prevalence
-
-    other_anemias_prevalence = interface.get_measure(causes.hemoglobinopathies_and_hemolytic_anemias,
-                                                     'prevalence', location)
-    hiv_prevalence = interface.get_measure(causes.hiv_aids, 'prevalence', location)
-    malaria_prevalence = interface.get_measure(causes.malaria, 'prevalence', location)
+    iron_responsive_prevalence = get_total_sequela_prevalence(responsive_ids, location)
+    non_responsive_prevalence = get_total_sequela_prevalence(non_responsive_ids, location)
+    all_prevalence = iron_responsive_prevalence + non_responsive_prevalence
+
+    other_anemias_prevalence = get_measure(causes.hemoglobinopathies_and_hemolytic_anemias, 'prevalence', location)
+    hiv_prevalence = get_measure(causes.hiv_aids, 'prevalence', location)
+    malaria_prevalence = get_measure(causes.malaria, 'prevalence', location)
     reverse_causal_prevalence = other_anemias_prevalence + hiv_prevalence + malaria_prevalence
 
     proportion = (1 - all_prevalence
@@ -181,38 +174,81 @@ def load_iron_responsive_proportion(key: str, location: str):
             data_values.ANEMIA_SEQUELAE_ID_MAP['severe'],
     }
     responsive_ids, non_responsive_ids = sequela_map[key]
-
-    responsive_prevalence = []
-    for s_id in responsive_ids:
-        sequela = [s for s in sequelae if s.gbd_id == s_id]
-        if sequela:
-            sequela = sequela.pop()
-        else:
-            continue
-        try:
-            prevalence = interface.get_measure(sequela, 'prevalence', location)
-        except (extract.DataDoesNotExistError, extract.DataAbnormalError):
-            continue
-        responsive_prevalence.append(prevalence)
-    responsive_prevalence = sum(responsive_prevalence)
-
-    non_responsive_prevalence = []
-    for s_id in non_responsive_ids:
-        sequela = [s for s in sequelae if s.gbd_id == s_id]
-        if sequela:
-            sequela = sequela.pop()
-        else:
-            continue
-        try:
-            prevalence = interface.get_measure(sequela, 'prevalence', location)
-        except (extract.DataDoesNotExistError, extract.DataAbnormalError):
-            continue
-        non_responsive_prevalence.append(prevalence)
-    non_responsive_prevalence = sum(non_responsive_prevalence)
+    responsive_prevalence = get_total_sequela_prevalence(responsive_ids, location)
+    non_responsive_prevalence = get_total_sequela_prevalence(non_responsive_ids, location)
 
     return (responsive_prevalence / (responsive_prevalence + non_responsive_prevalence)).fillna(0)
 
 
+def get_total_sequela_prevalence(sequela_ids: List[int], location: str) -> Union[pd.DataFrame, int]:
+    """Sums the prevalence of the sequelae with data, or returns 0 if none have data."""
+    prevalences = [get_sequela_prevalence(sequela_id, location) for sequela_id in dict.fromkeys(sequela_ids)]
+    prevalences = [prevalence for prevalence in prevalences if prevalence is not None]
+    if not prevalences:
+        return 0
+    total = prevalences[0]
+    if all(prevalence.index.equals(total.index) and prevalence.columns.equals(total.columns)
+           for prevalence in prevalences):
+        values = np.sum([prevalence.to_numpy() for prevalence in prevalences], axis=0)
+        return pd.DataFrame(values, index=total.index, columns=total.columns)
+    # Prevalences over different rows are aligned on the union of their rows.
+    return sum(prevalences)
+
+
+# Sequela prevalence pulled during the current artifact build by (sequela id, location).
+_sequela_prevalence: Dict[Tuple[int, str], Optional[pd.DataFrame]] = {}
+_sequela_prevalence_locks: Dict[Tuple[int, str], threading.Lock] = defaultdict(threading.Lock)
+_sequela_prevalence_lock = threading.Lock()
+
+
+def get_sequela_prevalence(sequela_id: int, location: str) -> Optional[pd.DataFrame]:
+    """Pulls the prevalence of a sequela once per artifact build.
+
+    Keys loaded concurrently that need the same sequela wait on a single
+    pull.  Returns ``None`` if the sequela is not in the gbd mapping or has
+    no usable prevalence data.  The pulled data is shared, so it must not be
+    modified, and it is held until :func:`clear_sequela_prevalence` is
+    called at the end of the build.
+
+    """
+    key = (sequela_id, location)
+    with _sequela_prevalence_lock:
+        lock = _sequela_prevalence_locks[key]
+    with lock:
+        if key not in _sequela_prevalence:
+            _sequela_prevalence[key] = pull_sequela_prevalence(sequela_id, location)
+        return _sequela_prevalence[key]
+
+
+def clear_sequela_prevalence():
+    """Drops the sequela prevalence pulled during an artifact build."""
+    with _sequela_prevalence_lock:
+        _sequela_prevalence.clear()
+        _sequela_prevalence_locks.clear()
+
+
+def pull_sequela_prevalence(sequela_id: int, location: str) -> Optional[pd.DataFrame]:
+    sequela = get_sequelae_by_id().get(sequela_id)
+    if sequela is None:
+        return None
+    try:
+        return get_measure(sequela, 'prevalence', location)
+    except (extract.DataDoesNotExistError, extract.DataAbnormalError):
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def get_sequelae_by_id() -> Dict[int, Sequela]:
+    return {sequela.gbd_id: sequela for sequela in sequelae}
+
+
+def get_measure(entity, measure: str, location: str) -> pd.DataFrame:
+    """Pulls a measure of an entity through the cache of raw GBD pulls."""
+    return cache.cached_pull(interface.get_measure, f'{entity.kind}.{entity.name}', measure, location,
+                             entity, measure, location,
+                             errors=(extract.DataDoesNotExistError, extract.DataAbnormalError))
+
+
 def get_entity(key: str):
     # Map of entity types to their gbd mappings.
     type_map = {
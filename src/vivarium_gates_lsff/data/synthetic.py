@@ -0,0 +1,313 @@
+"""Synthetic stand-ins for the project input data.
+
+Builds structurally valid artifacts without access to GBD data, so the model
+can be run and benchmarked away from the cluster.  Every key in
+``data_keys.MAKE_ARTIFACT_KEY_GROUPS`` is written with the same index
+structure, draw columns and category sets the loader produces, filled with
+random but plausible values.  Data for each key is generated from its own
+random stream derived from the seed and the key, so an artifact is
+reproducible and any key can be regenerated on its own.
+
+.. admonition::
+
+   Logging in this module should be done at the ``debug`` level.
+
+"""
+import zlib
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple, Union
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+from vivarium.framework.artifact import Artifact, EntityKey
+
+from vivarium_gates_lsff.constants import data_keys, models
+from vivarium_gates_lsff.data import builder
+
+DEMOGRAPHIC_COLUMNS = ['location', 'sex', 'age_start', 'age_end', 'year_start', 'year_end']
+SEXES = ('Male', 'Female')
+YEARS = tuple(range(1990, 2020))
+
+# GBD age groups as (age_group_name, age_start, age_end).
+AGE_GROUPS = (
+    [('Early Neonatal', 0., 7 / 365), ('Late Neonatal', 7 / 365, 28 / 365),
+     ('Post Neonatal', 28 / 365, 1.), ('1 to 4', 1., 5.)]
+    + [(f'{start} to {start + 4}', float(start), start + 5.) for start in range(5, 95, 5)]
+    + [('95 plus', 95., 125.)]
+)
+
+# Multiplicative spread of draws around each row's central value.
+DRAW_SIGMA = 0.1
+
+# Ranges of the central value of each measure.
+MEASURE_RANGES = {
+    'cause_specific_mortality_rate': (1e-4, 1e-2),
+    'excess_mortality_rate': (1e-2, 1.),
+    'incidence_rate': (0.1, 3.),
+    'remission_rate': (30., 80.),
+    'prevalence': (1e-3, 0.1),
+    'birth_prevalence': (1e-4, 1e-3),
+    'disability_weight': (0.01, 0.3),
+    'population_attributable_fraction': (0.01, 0.3),
+    'exposure_standard_deviation': (10., 15.),
+    'no_anemia_iron_responsive_proportion': (0.5, 0.9),
+    'mild_anemia_iron_responsive_proportion': (0.3, 0.8),
+    'moderate_anemia_iron_responsive_proportion': (0.3, 0.8),
+    'severe_anemia_iron_responsive_proportion': (0.3, 0.8),
+    'mild_anemia_disability_weight': (0.003, 0.006),
+    'moderate_anemia_disability_weight': (0.04, 0.06),
+    'severe_anemia_disability_weight': (0.12, 0.18),
+}
+# Measures that are proportions and so must not exceed one.
+PROPORTION_MEASURES = {
+    'prevalence', 'birth_prevalence', 'disability_weight', 'population_attributable_fraction',
+    'no_anemia_iron_responsive_proportion', 'mild_anemia_iron_responsive_proportion',
+    'moderate_anemia_iron_responsive_proportion', 'severe_anemia_iron_responsive_proportion',
+    'mild_anemia_disability_weight', 'moderate_anemia_disability_weight', 'severe_anemia_disability_weight',
+}
+HEMOGLOBIN_MEAN_RANGE = (100., 130.)
+
+# Exposure categories of each categorical risk.
+RISK_CATEGORIES = {
+    models.VITAMIN_A_MODEL_NAME: models.VITAMIN_A_RISK_CATEGORIES,
+    models.ZINC_DEFICIENCY_RISK_NAME: models.ZINC_DEFICIENCY_RISK_CATEGORIES,
+    models.LBWSG_RISK_NAME: models.LBWSG_RISK_CATEGORIES,
+}
+# Affected entities and measures of each risk's relative risks.
+RISK_EFFECTS = {
+    'vitamin_a_deficiency': ([data_keys.DIARRHEA.name, data_keys.MEASLES.name], 'incidence_rate'),
+    'zinc_deficiency': ([data_keys.DIARRHEA.name], 'incidence_rate'),
+    'low_birth_weight_and_short_gestation': (
+        [data_keys.DIARRHEA.name, data_keys.MEASLES.name]
+        + [EntityKey(key).name for key in data_keys.CSMR_AFFECTEDBY_LBWSG],
+        'excess_mortality_rate'
+    ),
+}
+RELATIVE_RISK_RANGE = (1.1, 3.)
+
+
+def build_synthetic_artifact(output_path: Path, location: str, draws: int = 1000, seed: int = 0) -> Artifact:
+    """Writes a synthetic artifact for every key the project artifact needs.
+
+    Parameters
+    ----------
+    output_path
+        Fully resolved path to the artifact file.
+    location
+        Location name represented by the artifact.
+    draws
+        The number of draws to generate for data with draws.
+    seed
+        Seed for the random streams used to generate the data.
+
+    Returns
+    -------
+        The synthetic artifact.
+
+    """
+    artifact = builder.open_artifact(output_path, location)
+    for key_group in data_keys.MAKE_ARTIFACT_KEY_GROUPS:
+        logger.debug(f'Generating synthetic {key_group.log_name} data.')
+        for key in key_group:
+            if key not in artifact:
+                builder.write_data(artifact, key, get_data(key, location, draws, seed))
+    return artifact
+
+
+def get_data(lookup_key: str, location: str, draws: int, seed: int) -> Union[str, Dict, pd.DataFrame]:
+    """Generates synthetic data shaped like the loader output for a key.
+
+    Parameters
+    ----------
+    lookup_key
+        The key that will eventually get put in the artifact with
+        the requested data.
+    location
+        The location to generate data for.
+    draws
+        The number of draws to generate for data with draws.
+    seed
+        Seed for the random streams used to generate the data.
+
+    Returns
+    -------
+        The requested data.
+
+    """
+    mapping = {
+        data_keys.POPULATION.LOCATION: make_population_location,
+        data_keys.POPULATION.STRUCTURE: make_population_structure,
+        data_keys.POPULATION.AGE_BINS: make_age_bins,
+        data_keys.POPULATION.DEMOGRAPHY: make_demographic_dimensions,
+        data_keys.POPULATION.TMRLE: make_theoretical_minimum_risk_life_expectancy,
+        data_keys.COVARIATES.COVARIATE_LIVE_BIRTHS_BY_SEX: make_live_births_by_sex,
+        data_keys.IRON_DEFICIENCY.IRON_DEFICIENCY_EXPOSURE: make_continuous_exposure,
+    }
+    measure_mapping = {
+        'restrictions': make_restrictions,
+        'categories': make_categories,
+        'distribution': make_distribution,
+        'exposure': make_categorical_exposure,
+        'relative_risk': make_relative_risk,
+        'population_attributable_fraction': make_population_attributable_fraction,
+        'birth_prevalence': make_birth_prevalence,
+    }
+    make_data = mapping.get(lookup_key, measure_mapping.get(EntityKey(lookup_key).measure, make_draw_data))
+    # Each key gets its own stream so data does not depend on which keys are generated.
+    random_state = np.random.RandomState([seed, zlib.crc32(str(lookup_key).encode())])
+    return make_data(lookup_key, location, draws, random_state)
+
+
+def make_population_location(key: str, location: str, draws: int, random_state: np.random.RandomState) -> str:
+    return location
+
+
+def make_population_structure(key: str, location: str, draws: int,
+                              random_state: np.random.RandomState) -> pd.DataFrame:
+    index = get_demographic_index(location)
+    return pd.DataFrame({'value': random_state.uniform(1e4, 1e6, len(index))}, index=index)
+
+
+def make_age_bins(key: str, location: str, draws: int, random_state: np.random.RandomState) -> pd.DataFrame:
+    index = pd.MultiIndex.from_tuples([(start, end, name) for name, start, end in AGE_GROUPS],
+                                      names=['age_start', 'age_end', 'age_group_name'])
+    return pd.DataFrame(index=index)
+
+
+def make_demographic_dimensions(key: str, location: str, draws: int,
+                                random_state: np.random.RandomState) -> pd.DataFrame:
+    return pd.DataFrame(index=get_demographic_index(location))
+
+
+def make_theoretical_minimum_risk_life_expectancy(key: str, location: str, draws: int,
+                                                  random_state: np.random.RandomState) -> pd.DataFrame:
+    age_start = np.arange(0., 111.)
+    index = pd.MultiIndex.from_arrays([age_start, age_start + 1], names=['age_start', 'age_end'])
+    return pd.DataFrame({'value': np.maximum(88. - 0.8 * age_start, 1.5)}, index=index)
+
+
+def make_live_births_by_sex(key: str, location: str, draws: int,
+                            random_state: np.random.RandomState) -> pd.DataFrame:
+    index = pd.MultiIndex.from_product([[location], SEXES, YEARS], names=['location', 'sex', 'year_start'])
+    mean = random_state.uniform(5e5, 1e6, len(index))
+    data = pd.DataFrame({'mean_value': mean, 'lower_value': 0.95 * mean, 'upper_value': 1.05 * mean},
+                        index=index).reset_index()
+    data['year_end'] = data['year_start'] + 1
+    return (data.set_index(['location', 'sex', 'year_start', 'year_end'])
+            .rename_axis(columns='parameter')
+            .stack()
+            .to_frame('value'))
+
+
+def make_restrictions(key: str, location: str, draws: int, random_state: np.random.RandomState) -> Dict:
+    return {
+        'male_only': False,
+        'female_only': False,
+        'yll_only': False,
+        'yld_only': False,
+        'yll_age_group_id_start': 2,
+        'yll_age_group_id_end': 235,
+        'yld_age_group_id_start': 2,
+        'yld_age_group_id_end': 235,
+    }
+
+
+def make_categories(key: str, location: str, draws: int, random_state: np.random.RandomState) -> Dict:
+    return {category: f'Synthetic exposure category {category}' for category in get_categories(key)}
+
+
+def make_distribution(key: str, location: str, draws: int, random_state: np.random.RandomState) -> str:
+    return 'dichotomous' if len(get_categories(key)) == 2 else 'polytomous'
+
+
+def make_continuous_exposure(key: str, location: str, draws: int,
+                             random_state: np.random.RandomState) -> pd.DataFrame:
+    index = expand_index(get_demographic_index(location), 'parameter', ['continuous'])
+    return make_draws(index, HEMOGLOBIN_MEAN_RANGE, draws, random_state)
+
+
+def make_categorical_exposure(key: str, location: str, draws: int,
+                              random_state: np.random.RandomState) -> pd.DataFrame:
+    demographic_index = get_demographic_index(location)
+    categories = get_categories(key)
+    # Dirichlet draws around a random central distribution keep each draw summing to one.
+    central = random_state.dirichlet(np.ones(len(categories)), len(demographic_index))
+    concentration = 1 / DRAW_SIGMA ** 2
+    with np.errstate(under='ignore'):  # Rare categories may round to zero exposure.
+        exposure = random_state.gamma(concentration * central[:, :, np.newaxis] + 1e-3,
+                                      size=(len(demographic_index), len(categories), draws))
+        exposure /= exposure.sum(axis=1, keepdims=True)
+    index = expand_index(demographic_index, 'parameter', categories)
+    return pd.DataFrame(exposure.reshape(-1, draws), index=index, columns=get_draw_columns(draws))
+
+
+def make_relative_risk(key: str, location: str, draws: int, random_state: np.random.RandomState) -> pd.DataFrame:
+    categories = get_categories(key)
+    data = []
+    for affected_index in get_affected_indices(key, location):
+        index = expand_index(affected_index, 'parameter', categories)
+        relative_risk = make_draws(index, RELATIVE_RISK_RANGE, draws, random_state).clip(lower=1.)
+        # The last category is the unexposed reference category.
+        relative_risk.loc[index.get_level_values('parameter') == categories[-1]] = 1.
+        data.append(relative_risk)
+    return pd.concat(data)
+
+
+def make_population_attributable_fraction(key: str, location: str, draws: int,
+                                          random_state: np.random.RandomState) -> pd.DataFrame:
+    return pd.concat([make_draw_data(key, location, draws, random_state, index=affected_index)
+                      for affected_index in get_affected_indices(key, location)])
+
+
+def make_birth_prevalence(key: str, location: str, draws: int,
+                          random_state: np.random.RandomState) -> pd.DataFrame:
+    index = get_demographic_index(location).droplevel(['age_start', 'age_end']).unique()
+    return make_draw_data(key, location, draws, random_state, index=index)
+
+
+def make_draw_data(key: str, location: str, draws: int, random_state: np.random.RandomState,
+                   index: pd.MultiIndex = None) -> pd.DataFrame:
+    measure = EntityKey(key).measure
+    index = get_demographic_index(location) if index is None else index
+    data = make_draws(index, MEASURE_RANGES[measure], draws, random_state)
+    return data.clip(upper=1.) if measure in PROPORTION_MEASURES else data
+
+
+def make_draws(index: pd.MultiIndex, value_range: Tuple[float, float], draws: int,
+               random_state: np.random.RandomState) -> pd.DataFrame:
+    """Generates draws spread around a log-uniform central value for each row."""
+    low, high = np.log(value_range[0]), np.log(value_range[1])
+    central = np.exp(random_state.uniform(low, high, len(index)))
+    values = central[:, np.newaxis] * random_state.lognormal(0., DRAW_SIGMA, (len(index), draws))
+    return pd.DataFrame(values, index=index, columns=get_draw_columns(draws))
+
+
+def get_demographic_index(location: str) -> pd.MultiIndex:
+    rows = [(location, sex, age_start, age_end, year, year + 1)
+            for sex in SEXES for _, age_start, age_end in AGE_GROUPS for year in YEARS]
+    return pd.MultiIndex.from_tuples(rows, names=DEMOGRAPHIC_COLUMNS)
+
+
+def get_affected_indices(key: str, location: str) -> List[pd.MultiIndex]:
+    affected_entities, affected_measure = RISK_EFFECTS[EntityKey(key).name]
+    demographic_index = get_demographic_index(location)
+    return [expand_index(expand_index(demographic_index, 'affected_entity', [entity]),
+                         'affected_measure', [affected_measure])
+            for entity in affected_entities]
+
+
+def get_categories(key: str) -> List[str]:
+    return list(RISK_CATEGORIES[EntityKey(key).name])
+
+
+def get_draw_columns(draws: int) -> List[str]:
+    return [f'draw_{i}' for i in range(draws)]
+
+
+def expand_index(index: pd.MultiIndex, name: str, values: Sequence) -> pd.MultiIndex:
+    """Crosses an index with a new innermost level."""
+    frame = index.to_frame(index=False)
+    frame = frame.loc[np.repeat(np.arange(len(frame)), len(values))].reset_index(drop=True)
+    frame[name] = np.tile(np.asarray(values, dtype=object), len(index))
+    return pd.MultiIndex.from_frame(frame)
@@ -1,7 +1,12 @@
+import functools
+import re
+import string
 from pathlib import Path
-from typing import NamedTuple, List, Tuple
+from typing import Dict, Iterator, NamedTuple, List, Tuple
 
+import numpy as np
 import pandas as pd
+import tables
 import yaml
 
 from vivarium_gates_lsff.constants import models, results
@@ -22,26 +27,54 @@ OUTPUT_COLUMN_SORT_ORDER = [
     'measure',
     'input_draw'
 ]
+# The number of aggregated draws made into measure data at a time when streaming.
+DRAWS_PER_CHUNK = 100
+# Long-format columns holding the values of each result column template field.
+TEMPLATE_FIELD_COLUMNS = {
+    'YEAR': 'year',
+    'SEX': 'sex',
+    'AGE_GROUP': 'age',
+    'CAUSE_OF_DEATH': 'cause',
+    'CAUSE_OF_DISABILITY': 'cause',
+    'DISEASE_STATE': 'cause',
+    'DISEASE_STATE_DIARRHEA': 'cause',
+    'DISEASE_STATE_MEASLES': 'cause',
+    'DISEASE_TRANSITION': 'cause',
+    'DISEASE_TRANSITION_DIARRHEA': 'cause',
+    'DISEASE_TRANSITION_MEASLES': 'cause',
+    'STRATIFICATION_STATE_VITAMIN_A': 'vitamin_a_category',
+    'STRATIFICATION_STATE_ZINC': 'zinc_category',
+}
 
 
 def make_measure_data(data, field_map):
-    measure_data = MeasureData(
-        population=get_population_data(data, field_map),
-        ylls=get_by_cause_measure_data(data, 'ylls', field_map),
-        ylds=get_by_cause_measure_data(data, 'ylds', field_map),
-        deaths=get_by_cause_measure_data(data, 'deaths', field_map),
+    return MeasureData(**{measure: make_measure(data, measure, field_map) for measure in MeasureData._fields})
 
-        # Specific to zinc and vitamin a stratification
-        disease_state_person_time_diarrhea=get_state_person_time_measure_data_special(data, 'disease_state_person_time_diarrhea', field_map),
-        disease_state_person_time_measles=get_state_person_time_measure_data_special(data, 'disease_state_person_time_measles', field_map),
-        disease_transition_count_diarrhea=get_state_person_time_measure_data_special(data, 'disease_transition_count_diarrhea', field_map),
-        disease_transition_count_measles=get_state_person_time_measure_data_special(data, 'disease_transition_count_measles', field_map),
 
-        # disease_state_person_time=get_state_person_time_measure_data(data, 'disease_state_person_time', field_map),
-        # disease_transition_count=get_transition_count_measure_data(data, 'disease_transition_count', field_map),
+def make_measure(data, measure, field_map):
+    """Makes the long-format data of a single entry of ``MeasureData``."""
+    if measure == 'population':
+        return get_population_data(data, field_map)
+    elif measure in ['ylls', 'ylds', 'deaths']:
+        return get_by_cause_measure_data(data, measure, field_map)
+    # Specific to zinc and vitamin a stratification
+    elif measure in ['disease_state_person_time_diarrhea', 'disease_state_person_time_measles']:
+        return get_state_person_time_measure_data_special(data, measure, field_map)
+    elif measure in ['disease_transition_count_diarrhea', 'disease_transition_count_measles']:
+        return get_transition_count_measure_data_special(data, measure, field_map)
+    # elif measure == 'disease_state_person_time':
+    #     return get_state_person_time_measure_data(data, measure, field_map)
+    # elif measure == 'disease_transition_count':
+    #     return get_transition_count_measure_data(data, measure, field_map)
+    raise ValueError(f'Unknown measure {measure}.')
+
 
-    )
-    return measure_data
+def get_measure_columns(measure, field_map) -> List[str]:
+    """Gets the simulation output columns a measure is made from."""
+    columns = results.RESULT_COLUMNS(field_map, measure)
+    if measure == 'population':
+        columns = [results.TOTAL_POPULATION_COLUMN] + columns
+    return columns
 
 
 class MeasureData(NamedTuple):
@@ -59,14 +92,66 @@ class MeasureData(NamedTuple):
     # disease_state_person_time: pd.DataFrame
     # disease_transition_count: pd.DataFrame
 
-    def dump(self, output_dir: Path):
+    def dump(self, output_dir: Path, append: bool = False):
         for key, df in self._asdict().items():
-            df.to_hdf(output_dir / f'{key}.hdf', key=key)
-            df.to_csv(output_dir / f'{key}.csv')
+            dump_measure(output_dir, key, df, append)
+
+
+def dump_measure(output_dir: Path, key: str, df: pd.DataFrame, append: bool = False):
+    """Writes the data of a measure to ``output_dir`` as HDF and csv.
+
+    Categorical columns and years are written as strings and draws as 64
+    bit integers in the fixed HDF format, as count data always has been.
+    Appended data is instead kept categorical in the table format, which
+    is the only one that can be appended to, until
+    :func:`finish_appended_measure_data` rewrites it.
+
+    """
+    hdf_path, csv_path = output_dir / f'{key}.hdf', output_dir / f'{key}.csv'
+    if append:
+        appending = hdf_path.exists()
+        if appending:
+            # Keep the row labels running on from the rows already written.
+            with pd.HDFStore(str(hdf_path), mode='r') as store:
+                df = df.set_axis(df.index + store.get_storer(key).nrows)
+        df.to_hdf(hdf_path, key=key, format='table', append=appending)
+        df.to_csv(csv_path, mode='a' if appending else 'w', header=not appending)
+    else:
+        df = to_count_data_schema(df)
+        df.to_hdf(hdf_path, key=key, mode='w')
+        df.to_csv(csv_path)
+
+
+def finish_appended_measure_data(output_dir: Path):
+    """Rewrites measure data appended to ``output_dir`` in the fixed format count data is written in."""
+    for key in MeasureData._fields:
+        hdf_path = output_dir / f'{key}.hdf'
+        if hdf_path.exists():
+            df = to_count_data_schema(pd.read_hdf(hdf_path, key=key).reset_index(drop=True))
+            df.to_hdf(hdf_path, key=key, mode='w')
+
+
+def to_count_data_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Converts the compact column types measure data is made with to those of the count data."""
+    dtypes = {}
+    for column, dtype in df.dtypes.items():
+        if column == 'year':
+            dtypes[column] = str
+        elif column == results.INPUT_DRAW_COLUMN:
+            dtypes[column] = np.int64
+        elif isinstance(dtype, pd.CategoricalDtype):
+            dtypes[column] = object
+    return df.astype(dtypes)
 
 
 def read_data(path: Path, single_run: bool) -> (pd.DataFrame, List[str], Tuple[int, int]):
-    data = pd.read_hdf(path)
+    data = clean_data(pd.read_hdf(path), single_run)
+    keyspace = read_keyspace(path, single_run)
+    years = read_model_spec_for_start_end(path.parent)
+    return data, keyspace, years
+
+
+def clean_data(data: pd.DataFrame, single_run: bool) -> pd.DataFrame:
     # noinspection PyUnresolvedReferences
     data = (data
             .drop(columns=data.columns.intersection(results.THROWAWAY_COLUMNS))
@@ -77,16 +162,127 @@ def read_data(path: Path, single_run: bool) -> (pd.DataFrame, List[str], Tuple[i
         data[results.INPUT_DRAW_COLUMN] = 0
         data[results.RANDOM_SEED_COLUMN] = 0
         data[SCENARIO_COLUMN] = 'baseline'
-        keyspace = {results.INPUT_DRAW_COLUMN: [0],
-                    results.RANDOM_SEED_COLUMN: [0],
-                    results.OUTPUT_SCENARIO_COLUMN: ['baseline']}
     else:
         data[results.INPUT_DRAW_COLUMN] = data[results.INPUT_DRAW_COLUMN].astype(int)
         data[results.RANDOM_SEED_COLUMN] = data[results.RANDOM_SEED_COLUMN].astype(int)
-        with (path.parent / 'keyspace.yaml').open() as f:
-            keyspace = yaml.full_load(f)
-    years = read_model_spec_for_start_end(path.parent)
-    return data, keyspace, years
+    return data
+
+
+class ResultsReader:
+    """Reads columns of a simulation output on demand.
+
+    The output file is opened on the first read and only the requested
+    columns and rows, along with the draw, seed and scenario of each row,
+    are loaded.  The draw, seed and scenario of every row are read once and
+    kept.  Rows are returned in the same order on every read.
+
+    """
+
+    def __init__(self, path: Path, single_run: bool):
+        self.path = path
+        self.single_run = single_run
+        self._store = None
+        self._runs = None
+
+    @property
+    def store(self) -> pd.HDFStore:
+        if self._store is None:
+            self._store = pd.HDFStore(str(self.path), mode='r')
+        return self._store
+
+    def read(self, columns: List[str], rows: np.ndarray = None) -> pd.DataFrame:
+        """Reads columns of the output along with the draw, seed and scenario of each row.
+
+        Parameters
+        ----------
+        columns
+            The output columns to read.
+        rows
+            The positions of the rows to read in increasing order, or
+            ``None`` to read every row.
+
+        """
+        runs = self.read_runs()
+        if rows is not None:
+            runs = runs.iloc[rows].reset_index(drop=True)
+        return pd.concat([runs, self._read_columns(columns, rows)], axis=1)
+
+    def read_runs(self) -> pd.DataFrame:
+        """Reads the draw, seed and scenario of every row."""
+        if self._runs is None:
+            run_columns = [] if self.single_run else [results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN,
+                                                      results.OUTPUT_SCENARIO_COLUMN]
+            self._runs = clean_data(self._read_columns(run_columns), self.single_run)
+        return self._runs
+
+    def _read_columns(self, columns: List[str], rows: np.ndarray = None) -> pd.DataFrame:
+        key = self.store.keys()[0]
+        storer = self.store.get_storer(key)
+        if not storer.is_table:
+            return read_fixed_format_columns(storer, columns, rows)
+        if not columns:
+            return pd.DataFrame(index=pd.RangeIndex(storer.nrows if rows is None else len(rows)))
+        return self.store.select(key, where=rows, columns=columns).reset_index(drop=True)
+
+    def close(self):
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    def __enter__(self) -> 'ResultsReader':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_fixed_format_columns(storer, columns: List[str], rows: np.ndarray = None) -> pd.DataFrame:
+    """Reads only the given columns and rows of a data frame stored in the fixed format.
+
+    Pandas can only read fixed format frames in full.  They are stored as
+    one array of rows by columns per dtype block along with the block's
+    column names, so the columns and rows are sliced from the block arrays
+    instead.
+
+    This relies on the private layout pandas writes fixed format frames
+    with, which the tests pin against ``pd.read_hdf``.  Object blocks are
+    pickled whole, so reading any column of one unpickles every row of
+    every column in the block.  :class:`ResultsReader` reads the object
+    run columns only once for this reason.
+
+    """
+    nrows = len(storer.read_index('axis1'))
+    frames = []
+    for i in range(storer.nblocks):
+        items = storer.read_index(f'block{i}_items')
+        positions = np.flatnonzero(items.isin(columns))
+        if not len(positions):
+            continue
+        node = getattr(storer.group, f'block{i}_values')
+        if isinstance(node, tables.VLArray):
+            values = np.asarray(node[0]).reshape(nrows, len(items))[:, positions]
+            if rows is not None:
+                values = values[rows]
+        elif rows is None:
+            values = node[:, positions.tolist()]
+        else:
+            # Only one dimension of a selection may be a list of positions.
+            values = node[rows.tolist(), :][:, positions]
+        frames.append(pd.DataFrame(values, columns=items[positions]))
+    data = pd.concat(frames, axis=1) if frames else pd.DataFrame(index=range(nrows if rows is None else len(rows)))
+    missing = pd.Index(columns).difference(data.columns)
+    if not missing.empty:
+        raise KeyError(f'Columns {list(missing)} are not in the simulation output.')
+    return data[columns]
+
+
+def read_keyspace(path: Path, single_run: bool) -> Dict[str, List]:
+    if single_run:
+        return {results.INPUT_DRAW_COLUMN: [0],
+                results.RANDOM_SEED_COLUMN: [0],
+                results.OUTPUT_SCENARIO_COLUMN: ['baseline']}
+    with (path.parent / 'keyspace.yaml').open() as f:
+        return yaml.full_load(f)
 
 
 def read_model_spec_for_start_end(path: Path) -> Tuple[int, int]:
@@ -96,41 +292,137 @@ def read_model_spec_for_start_end(path: Path) -> Tuple[int, int]:
     return (time_cfg['start']['year'], time_cfg['end']['year'])
 
 
+def get_complete_seeds(data: pd.DataFrame, keyspace: Dict[str, List]) -> pd.MultiIndex:
+    """Gets the (draw, seed) pairs of the keyspace that completed for every scenario."""
+    runs = data[[results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN, SCENARIO_COLUMN]]
+    runs = runs.loc[runs[results.INPUT_DRAW_COLUMN].isin(keyspace[results.INPUT_DRAW_COLUMN])
+                    & runs[results.RANDOM_SEED_COLUMN].isin(keyspace[results.RANDOM_SEED_COLUMN])
+                    & runs[SCENARIO_COLUMN].isin(keyspace[results.OUTPUT_SCENARIO_COLUMN])]
+    scenario_counts = (runs.drop_duplicates()
+                       .groupby([results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN], observed=True).size())
+    scenarios = len(set(keyspace[results.OUTPUT_SCENARIO_COLUMN]))
+    return scenario_counts.index[scenario_counts == scenarios]
+
+
+def get_dropped_seeds(data: pd.DataFrame, complete_seeds: pd.MultiIndex) -> pd.MultiIndex:
+    """Gets the (draw, seed) pairs in the data that are not complete."""
+    seeds = pd.MultiIndex.from_frame(data[[results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN]]).unique()
+    return seeds.difference(complete_seeds).sort_values()
+
+
+def is_complete(data: pd.DataFrame, complete_seeds: pd.MultiIndex) -> np.ndarray:
+    """Marks the rows of the data from a complete (draw, seed) pair."""
+    seeds = pd.MultiIndex.from_frame(data[[results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN]])
+    return seeds.isin(complete_seeds)
+
+
 def filter_out_incomplete(data, keyspace):
-    output = []
-    for draw in keyspace[results.INPUT_DRAW_COLUMN]:
-        # For each draw, gather all random seeds completed for all scenarios.
-        random_seeds = set(keyspace[results.RANDOM_SEED_COLUMN])
-        draw_data = data.loc[data[results.INPUT_DRAW_COLUMN] == draw]
-        for scenario in keyspace[results.OUTPUT_SCENARIO_COLUMN]:
-            seeds_in_data = draw_data.loc[data[SCENARIO_COLUMN] == scenario,
-                                          results.RANDOM_SEED_COLUMN].unique()
-            random_seeds = random_seeds.intersection(seeds_in_data)
-        draw_data = draw_data.loc[draw_data[results.RANDOM_SEED_COLUMN].isin(random_seeds)]
-        output.append(draw_data)
-    return pd.concat(output, ignore_index=True).reset_index(drop=True)
-
-
-def aggregate_over_seed(data, field_map):
+    complete = is_complete(data, get_complete_seeds(data, keyspace))
+    return data.loc[complete].reset_index(drop=True)
+
+
+def aggregate_over_seed(data, field_map, complete_seeds: pd.MultiIndex = None):
     non_count_columns = []
     for non_count_template in results.NON_COUNT_TEMPLATES:
         non_count_columns += results.RESULT_COLUMNS(field_map, non_count_template)
     count_columns = [c for c in data.columns if c not in non_count_columns + GROUPBY_COLUMNS]
 
+    draws = data[results.INPUT_DRAW_COLUMN]
+    if complete_seeds is not None:
+        # Rows of incomplete seeds fall in no group, so they are
+        # dropped by the same pass that sums the counts.
+        draws = draws.where(is_complete(data, complete_seeds))
     # non_count_data = data[non_count_columns + GROUPBY_COLUMNS].groupby(GROUPBY_COLUMNS).mean()
-    count_data = data[count_columns + GROUPBY_COLUMNS].groupby(GROUPBY_COLUMNS).sum()
-    return pd.concat([
+    count_data = data.groupby([draws, data[SCENARIO_COLUMN]], observed=True)[count_columns].sum()
+    count_data = pd.concat([
         count_data,
         # non_count_data
     ], axis=1).reset_index()
+    draw_dtype = data[results.INPUT_DRAW_COLUMN].dtype
+    count_data[results.INPUT_DRAW_COLUMN] = count_data[results.INPUT_DRAW_COLUMN].astype(draw_dtype)
+    return count_data
+
+
+def stream_measure_data(reader: ResultsReader, keyspace: Dict[str, List], field_map: Dict[str, Tuple],
+                        draws_per_chunk: int = DRAWS_PER_CHUNK) -> Iterator[MeasureData]:
+    """Processes the simulation output into measure data one draw at a time.
+
+    The draw, seed and scenario of every run are read first to find the
+    complete random seeds.  Then the rows of the complete runs of a single
+    draw are read, wherever the runs that wrote them sit in the output, and
+    aggregated over seed.  Only the aggregated draws are kept until they are
+    made into measure data, so memory use is bounded by the rows of one
+    draw rather than by the whole output or by the order runs completed in.
+
+    Parameters
+    ----------
+    reader
+        The reader of the simulation output.
+    keyspace
+        The draws, seeds and scenarios of the parallel run.
+    field_map
+        The values of each result column template field.
+    draws_per_chunk
+        The number of aggregated draws to make into measure data at once.
+
+    Yields
+    ------
+        The measure data of up to ``draws_per_chunk`` draws at a time, in
+        increasing draw order.
+
+    """
+    runs = reader.read_runs()
+    complete = is_complete(runs, get_complete_seeds(runs, keyspace))
+    rows_by_draw = pd.Series(np.flatnonzero(complete)).groupby(runs.loc[complete, results.INPUT_DRAW_COLUMN].values)
+    columns = list(dict.fromkeys(column for measure in MeasureData._fields
+                                 for column in get_measure_columns(measure, field_map)))
+
+    # Scenario categories are fixed up front so the draws can be appended to one another.
+    scenarios = pd.CategoricalDtype(sorted(keyspace[results.OUTPUT_SCENARIO_COLUMN]))
+    aggregated = []
+    for _, rows in rows_by_draw:
+        data = reader.read(columns, rows.values)
+        data[SCENARIO_COLUMN] = data[SCENARIO_COLUMN].astype(scenarios)
+        aggregated.append(aggregate_over_seed(data, field_map))
+        if len(aggregated) == draws_per_chunk:
+            yield make_measure_data(pd.concat(aggregated, ignore_index=True), field_map)
+            aggregated = []
+    if aggregated:
+        yield make_measure_data(pd.concat(aggregated, ignore_index=True), field_map)
+
+
+def make_measure_data_by_measure(reader: ResultsReader, keyspace: Dict[str, List],
+                                 field_map: Dict[str, Tuple]) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """Processes the simulation output into measure data one measure at a time.
+
+    Only the output columns a measure is made from are read for it, so the
+    working set is bounded by the widest measure rather than by the whole
+    output.
+
+    Yields
+    ------
+        The name of each entry of ``MeasureData`` and its data.
+
+    """
+    complete_seeds = get_complete_seeds(reader.read_runs(), keyspace)
+    for measure in MeasureData._fields:
+        data = reader.read(get_measure_columns(measure, field_map))
+        data = aggregate_over_seed(data, field_map, complete_seeds)
+        yield measure, make_measure(data, measure, field_map)
 
 
 def pivot_data(data):
-    return (data
-            .set_index(GROUPBY_COLUMNS)
-            .stack()
-            .reset_index()
-            .rename(columns={f'level_{len(GROUPBY_COLUMNS)}': 'process', 0: 'value'}))
+    """Stacks the wide result columns into a categorical ``process`` column and a ``value`` column."""
+    values = data.drop(columns=GROUPBY_COLUMNS)
+    rows, columns = values.shape
+    pivoted = pd.DataFrame({
+        results.INPUT_DRAW_COLUMN: np.repeat(data[results.INPUT_DRAW_COLUMN].to_numpy(dtype=np.int32), columns),
+        SCENARIO_COLUMN: pd.Categorical(data[SCENARIO_COLUMN]).take(np.repeat(np.arange(rows), columns)),
+        'process': pd.Categorical.from_codes(np.tile(np.arange(columns), rows), categories=values.columns),
+        'value': values.to_numpy(dtype=np.float64).ravel(),
+    })
+    # Missing values are dropped, as when stacking.
+    return pivoted.loc[pivoted['value'].notna()].reset_index(drop=True)
 
 
 def sort_data(data):
@@ -140,13 +432,63 @@ def sort_data(data):
     return data.reset_index(drop=True)
 
 
-def split_processing_column(data):
-    # TODO the required splitting here is dependant on what types of stratification exist in the model
-    data['process'], data['age'] = data.process.str.split('_in_age_group_').str
-    data['process'], data['sex'] = data.process.str.split('_among_').str
-    data['year'] = data.process.str.split('_in_').str[-1]
-    data['measure'] = data.process.str.split('_in_').str[:-1].apply(lambda x: '_in_'.join(x))
-    return data.drop(columns='process')
+def split_processing_column(data, measure, field_map):
+    """Replaces the wide result column names in ``process`` with their template fields."""
+    column_fields = get_column_fields(measure, field_map)
+    # Each distinct column name is parsed once, so rows only need a lookup
+    # of their process category.
+    process = data['process'].cat
+    positions = column_fields.index.get_indexer(process.categories)
+    if (positions < 0).any():
+        unknown = process.categories[positions < 0]
+        raise ValueError(f'Columns {list(unknown)} do not match the {measure} result column template.')
+    positions = positions[process.codes.to_numpy()]
+    data = data.drop(columns='process')
+    for column, field_values in column_fields.items():
+        data[column] = field_values.take(positions).to_numpy() if column == 'year' else field_values.array.take(positions)
+    return data
+
+
+def get_column_fields(measure: str, field_map: Dict[str, Tuple]) -> pd.DataFrame:
+    """Gets the long-format field values of every result column of a measure.
+
+    Parameters
+    ----------
+    measure
+        The key of the result column template in ``results.COLUMN_TEMPLATES``.
+    field_map
+        The values of each template field.
+
+    Returns
+    -------
+        A table indexed by result column name with a column for each
+        template field, named as in ``TEMPLATE_FIELD_COLUMNS``.  Years are
+        integers and all other fields categorical.
+
+    """
+    hashable_field_map = tuple((field, tuple(values)) for field, values in field_map.items())
+    return _get_column_fields(measure, hashable_field_map)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_column_fields(measure: str, field_map: Tuple[Tuple[str, Tuple], ...]) -> pd.DataFrame:
+    field_map = dict(field_map)
+    template = results.COLUMN_TEMPLATES[measure]
+    pattern = ''
+    for literal, field, _, _ in string.Formatter().parse(template):
+        pattern += re.escape(literal)
+        if field is not None:
+            # Longest first so field values that prefix one another match in full.
+            values = sorted((str(value) for value in field_map[field]), key=len, reverse=True)
+            pattern += f'(?P<{field}>{"|".join(re.escape(value) for value in values)})'
+    pattern = re.compile(pattern)
+
+    columns = results.RESULT_COLUMNS(field_map, measure)
+    column_fields = pd.DataFrame([pattern.fullmatch(column).groupdict() for column in columns],
+                                 index=pd.Index(columns, name='process'))
+    column_fields = column_fields.rename(columns=TEMPLATE_FIELD_COLUMNS)
+    return column_fields.astype({column: np.int16 if column == 'year' else 'category'
+                                 for column in column_fields})
 
 
 def get_population_data(data, field_map):
@@ -159,48 +501,37 @@ def get_population_data(data, field_map):
 
 def get_measure_data(data, measure, field_map):
     data = pivot_data(data[results.RESULT_COLUMNS(field_map, measure) + GROUPBY_COLUMNS])
-    data = split_processing_column(data)
-    return sort_data(data)
+    return split_processing_column(data, measure, field_map)
 
 
 def get_by_cause_measure_data(data, measure, field_map):
     data = get_measure_data(data, measure, field_map)
-    data['measure'], data['cause'] = data.measure.str.split('_due_to_').str
+    data['measure'] = get_constant_category(results.COLUMN_TEMPLATES[measure].split('_due_to_')[0], len(data))
     return sort_data(data)
 
 
 def get_state_person_time_measure_data(data, measure, field_map):
     data = get_measure_data(data, measure, field_map)
-    data['measure'], data['cause'] = 'state_person_time', data.measure.str.split('_person_time').str[0]
+    data['measure'] = get_constant_category('state_person_time', len(data))
     return sort_data(data)
 
 
 def get_transition_count_measure_data(data, measure, field_map):
     data = get_measure_data(data, measure, field_map)
-    data['cause'] = data['measure'].str.split('_event_count').str[0]
-    data['measure'] = 'transition_count'
+    data['measure'] = get_constant_category('transition_count', len(data))
     return sort_data(data)
 
 
+def get_constant_category(value: str, length: int) -> pd.Categorical:
+    return pd.Categorical.from_codes(np.zeros(length, dtype=np.int8), categories=[value])
+
+
 # Specific to zinc and vitamin a stratification
 def get_state_person_time_measure_data_special(data, measure, field_map):
-    data = get_measure_data(data, measure, field_map)
-    data = split_age_column(data, ('diarrhea' in measure))
-    data['measure'], data['cause'] = 'state_person_time', data.measure.str.split('_person_time').str[0]
-    return sort_data(data)
+    # The stratification fields are parsed along with the rest of the template.
+    return get_state_person_time_measure_data(data, measure, field_map)
 
 
 def get_transition_count_measure_data_special(data, measure, field_map):
-    data = get_measure_data(data, measure, field_map)
-    data = split_age_column(data, ('diarrhea' in measure))
-    data['cause'] = data['measure'].str.split('_event_count').str[0]
-    data['measure'] = 'transition_count'
-    return sort_data(data)
-
-
-def split_age_column(data, has_zinc):
-    data['age'], data['vitamin_a_category'] = data.age.str.split('_VA_').str
-    if has_zinc:
-        data['vitamin_a_category'], data['zinc_category'] = data.vitamin_a_category.str.split('_ZINC_').str
-    return data
+    return get_transition_count_measure_data(data, measure, field_map)
 
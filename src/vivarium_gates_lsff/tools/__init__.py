@@ -1,4 +1,5 @@
 from .app_logging import configure_logging_to_terminal
 from .make_specs import build_model_specifications
-from .make_artifacts import build_artifacts
+from .make_artifacts import build_artifacts, build_synthetic_artifacts
 from .make_results import build_results
+from .make_benchmarks import compare_benchmarks, run_benchmarks, run_results_benchmark
@@ -17,6 +17,8 @@ The application will look for the model spec based on the python environment
 that is active and these files don't need to be specified if the
 default names and location are used.
 """
+import sys
+
 import click
 from loguru import logger
 from vivarium.framework.utilities import handle_exceptions
@@ -26,7 +28,9 @@ from vivarium_gates_lsff.constants import metadata
 from vivarium_gates_lsff.tools import (build_artifacts,
                                                  build_model_specifications,
                                                  build_results,
-                                                 configure_logging_to_terminal)
+                                                 build_synthetic_artifacts,
+                                                 configure_logging_to_terminal,
+                                                 make_benchmarks)
 
 
 @click.command()
@@ -69,7 +73,7 @@ def make_specs(template: str, location: str, output_dir: str, verbose: int, with
               show_default=True,
               type=click.Choice(metadata.LOCATIONS + ('all',)),
               help=('Location for which to make an artifact. Note: prefer building archives on the cluster.\n'
-                    'If you specify location "all" you must be on a cluster node.'))
+                    'If you specify location "all" off the cluster, locations are built in local worker processes.'))
 @click.option('-o', '--output-dir',
               default=str(paths.ARTIFACT_ROOT),
               show_default=True,
@@ -78,16 +82,76 @@ def make_specs(template: str, location: str, output_dir: str, verbose: int, with
 @click.option('-a', '--append',
               is_flag=True,
               help='Append to the artifact instead of overwriting.')
+@click.option('-i', '--incremental',
+              is_flag=True,
+              help=('Append to the artifact, rebuilding only keys whose loader functions, '
+                    'inputs or data values have changed since they were written.'))
+@click.option('-w', '--workers',
+              type=click.IntRange(min=1),
+              help=('Number of locations to build at once in local worker processes when building '
+                    '"all" off the cluster. Defaults to one per location, up to the number of cores.'))
+@click.option('-k', '--key-workers',
+              default=metadata.MAKE_ARTIFACT_KEY_WORKERS,
+              show_default=True,
+              type=click.IntRange(min=1),
+              help=('Number of keys to load at once for each artifact, or across all local worker processes '
+                    'when building "all" off the cluster. Keys are loaded serially by default; loading them '
+                    'concurrently assumes GBD data access is thread safe.'))
+@click.option('--gbd-cache-dir',
+              envvar=metadata.GBD_CACHE_DIR_ENVIRONMENT_VARIABLE,
+              show_envvar=True,
+              type=click.Path(file_okay=False),
+              help=('Directory to cache raw GBD pulls in so later builds reuse them. It is kept under '
+                    f'{metadata.GBD_CACHE_MAX_BYTES // 2**30} GiB. Nothing is cached by default.'))
 @click.option('-v', 'verbose',
               count=True,
               help='Configure logging verbosity.')
 @click.option('--pdb', 'with_debugger',
               is_flag=True,
               help='Drop into python debugger if an error occurs.')
-def make_artifacts(location: str, output_dir: str, append: bool, verbose: int, with_debugger: bool) -> None:
+def make_artifacts(location: str, output_dir: str, append: bool, incremental: bool, workers: int,
+                   key_workers: int, gbd_cache_dir: str, verbose: int, with_debugger: bool) -> None:
     configure_logging_to_terminal(verbose)
     main = handle_exceptions(build_artifacts, logger, with_debugger=with_debugger)
-    main(location, output_dir, append, verbose)
+    main(location, output_dir, append, verbose, incremental, workers, key_workers, gbd_cache_dir)
+
+
+@click.command()
+@click.option('-l', '--location',
+              default='all',
+              show_default=True,
+              type=click.Choice(metadata.LOCATIONS + ('all',)),
+              help='Location for which to make a synthetic artifact.')
+@click.option('-o', '--output-dir',
+              required=True,
+              type=click.Path(),
+              help='Specify an output directory. It will be created if it does not exist.')
+@click.option('-d', '--draws',
+              default=1000,
+              show_default=True,
+              type=click.IntRange(min=1),
+              help='Number of draws to generate.')
+@click.option('-s', '--seed',
+              default=0,
+              show_default=True,
+              type=int,
+              help='Seed for the synthetic data.')
+@click.option('-v', 'verbose',
+              count=True,
+              help='Configure logging verbosity.')
+@click.option('--pdb', 'with_debugger',
+              is_flag=True,
+              help='Drop into python debugger if an error occurs.')
+def make_synthetic_artifacts(location: str, output_dir: str, draws: int, seed: int,
+                             verbose: int, with_debugger: bool) -> None:
+    """Build artifacts of synthetic data that do not need GBD data access.
+
+    The artifacts have the same keys, index structure and draw columns as
+    the real artifacts, so the model can be run and benchmarked anywhere.
+    """
+    configure_logging_to_terminal(verbose)
+    main = handle_exceptions(build_synthetic_artifacts, logger, with_debugger=with_debugger)
+    main(location, output_dir, draws, seed)
 
 
 @click.command()
@@ -102,7 +166,123 @@ def make_artifacts(location: str, output_dir: str, append: bool, verbose: int, w
               default=False,
               is_flag=True,
               help='Results are from a single, non-parallel run.')
-def make_results(output_file: str, verbose: int, with_debugger: bool, single_run: bool) -> None:
+@click.option('--streaming',
+              is_flag=True,
+              help='Process the outputs one draw at a time to bound memory use.')
+@click.option('--by-measure',
+              is_flag=True,
+              help='Process the outputs one measure at a time, reading only the columns each needs.')
+def make_results(output_file: str, verbose: int, with_debugger: bool, single_run: bool, streaming: bool,
+                 by_measure: bool) -> None:
+    if streaming and by_measure:
+        raise click.UsageError('Only one of --streaming and --by-measure may be used.')
     configure_logging_to_terminal(verbose)
     main = handle_exceptions(build_results, logger, with_debugger=with_debugger)
-    main(output_file, single_run)
+    main(output_file, single_run, streaming, by_measure)
+
+
+@click.command()
+@click.argument('output_file', type=click.Path(dir_okay=False))
+@click.option('-l', '--location',
+              default=metadata.LOCATIONS[0],
+              show_default=True,
+              type=click.Choice(metadata.LOCATIONS),
+              help='Location to benchmark.')
+@click.option('-n', '--population-size', 'population_sizes',
+              multiple=True,
+              type=click.IntRange(min=1),
+              help='Population size to benchmark. May be repeated. '
+                   'Defaults to 10,000, 100,000 and 1,000,000 simulants.')
+@click.option('-t', '--steps',
+              default=make_benchmarks.BENCHMARK_STEPS,
+              show_default=True,
+              type=click.IntRange(min=1),
+              help='Number of time steps to run at each population size.')
+@click.option('-s', '--seed',
+              default=0,
+              show_default=True,
+              type=int,
+              help='Seed for the synthetic artifact.')
+@click.option('-v', 'verbose',
+              count=True,
+              help='Configure logging verbosity.')
+@click.option('--pdb', 'with_debugger',
+              is_flag=True,
+              help='Drop into python debugger if an error occurs.')
+def run_benchmarks(output_file: str, location: str, population_sizes: tuple, steps: int, seed: int,
+                   verbose: int, with_debugger: bool) -> None:
+    """Benchmark simulation throughput and memory against a synthetic artifact.
+
+    Results are written as JSON to OUTPUT_FILE and can be used as a
+    baseline for ``compare_benchmarks``.
+    """
+    configure_logging_to_terminal(verbose)
+    main = handle_exceptions(make_benchmarks.run_benchmarks, logger, with_debugger=with_debugger)
+    main(output_file, location, population_sizes or make_benchmarks.BENCHMARK_POPULATION_SIZES, steps, seed)
+
+
+@click.command()
+@click.argument('output_file', type=click.Path(dir_okay=False))
+@click.option('-d', '--draws',
+              default=make_benchmarks.RESULTS_BENCHMARK_DRAWS,
+              show_default=True,
+              type=click.IntRange(min=1),
+              help='Number of input draws in the synthetic outputs.')
+@click.option('-r', '--random-seeds', 'seeds',
+              default=make_benchmarks.RESULTS_BENCHMARK_SEEDS,
+              show_default=True,
+              type=click.IntRange(min=1),
+              help='Number of random seeds per draw in the synthetic outputs.')
+@click.option('-c', '--scenario', 'scenarios',
+              multiple=True,
+              help='Scenario in the synthetic outputs. May be repeated. '
+                   'Defaults to a baseline and three fortification scale-up scenarios.')
+@click.option('-s', '--seed',
+              default=0,
+              show_default=True,
+              type=int,
+              help='Seed for the synthetic outputs.')
+@click.option('-v', 'verbose',
+              count=True,
+              help='Configure logging verbosity.')
+@click.option('--pdb', 'with_debugger',
+              is_flag=True,
+              help='Drop into python debugger if an error occurs.')
+def run_results_benchmark(output_file: str, draws: int, seeds: int, scenarios: tuple, seed: int,
+                          verbose: int, with_debugger: bool) -> None:
+    """Benchmark each stage of make_results against synthetic simulation outputs.
+
+    Results are written as JSON to OUTPUT_FILE and can be used as a
+    baseline for ``compare_benchmarks``.
+    """
+    configure_logging_to_terminal(verbose)
+    main = handle_exceptions(make_benchmarks.run_results_benchmark, logger, with_debugger=with_debugger)
+    main(output_file, draws, seeds, scenarios or make_benchmarks.RESULTS_BENCHMARK_SCENARIOS, seed)
+
+
+@click.command()
+@click.argument('baseline_file', type=click.Path(exists=True, dir_okay=False))
+@click.argument('candidate_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('-r', '--threshold',
+              default=make_benchmarks.REGRESSION_THRESHOLD,
+              show_default=True,
+              type=click.FloatRange(min=0),
+              help='Relative change in throughput or memory flagged as a regression.')
+@click.option('-v', 'verbose',
+              count=True,
+              help='Configure logging verbosity.')
+@click.option('--pdb', 'with_debugger',
+              is_flag=True,
+              help='Drop into python debugger if an error occurs.')
+def compare_benchmarks(baseline_file: str, candidate_file: str, threshold: float,
+                       verbose: int, with_debugger: bool) -> None:
+    """Compare benchmark results against a baseline.
+
+    Exits with a non-zero status if any metric regressed by more than the
+    threshold.
+    """
+    configure_logging_to_terminal(verbose)
+    main = handle_exceptions(make_benchmarks.compare_benchmarks, logger, with_debugger=with_debugger)
+    regressions = main(baseline_file, candidate_file, threshold)
+    if regressions:
+        sys.exit(1)
@@ -6,13 +6,16 @@
    Use your best judgement.
 
 """
+from concurrent import futures
+import multiprocessing
+import os
 import shutil
 import sys
 import time
 import click
 
 from pathlib import Path
-from typing import Union
+from typing import Dict, Optional, Union
 from loguru import logger
 
 import vivarium_cluster_tools as vct
@@ -48,12 +51,16 @@ def check_for_existing(output_dir: Path, location: str, append: bool):
             path.unlink()
 
 
-def build_single(location: str, output_dir: str, append: bool):
+def build_single(location: str, output_dir: str, append: bool, incremental: bool = False,
+                 key_workers: int = metadata.MAKE_ARTIFACT_KEY_WORKERS, gbd_cache_dir: Optional[str] = None):
     path = Path(output_dir) / f'{sanitize_location(location)}.hdf'
-    build_single_location_artifact(path, location)
+    build_single_location_artifact(path, location, key_workers=key_workers, incremental=incremental,
+                                   gbd_cache_dir=gbd_cache_dir)
 
 
-def build_artifacts(location: str, output_dir: str, append: bool, verbose: int):
+def build_artifacts(location: str, output_dir: str, append: bool, verbose: int, incremental: bool = False,
+                    workers: Optional[int] = None, key_workers: int = metadata.MAKE_ARTIFACT_KEY_WORKERS,
+                    gbd_cache_dir: Optional[str] = None):
     """Main application function for building artifacts.
     Parameters
     ----------
@@ -61,7 +68,8 @@ def build_artifacts(location: str, output_dir: str, append: bool, verbose: int):
         The location to build the artifact for.  Must be one of the
         locations specified in the project globals or the string 'all'.
         If the latter, this application will build all artifacts in
-        parallel.
+        parallel, on the cluster if run from it and in local worker
+        processes otherwise.
     output_dir
         The path where the artifact files will be built. The directory
         will be created if it doesn't exist
@@ -70,28 +78,49 @@ def build_artifacts(location: str, output_dir: str, append: bool, verbose: int):
         directory.  Has no effect if artifacts are not found.
     verbose
         How noisy the logger should be.
+    incremental
+        Whether to rebuild only the keys of existing artifacts whose loader
+        functions, inputs or data values have changed since they were
+        written.  Implies ``append``.
+    workers
+        The number of local worker processes to build all artifacts with
+        when not on the cluster.  Defaults to one per location, up to the
+        number of cores.
+    key_workers
+        The number of keys to load at once for each artifact.  Defaults
+        to one, which loads keys serially; loading them concurrently
+        assumes GBD data access is thread safe.  When building all
+        artifacts in local worker
+        processes, this is instead the number of keys loaded at once
+        across all of them, though every worker loads at least one.
+    gbd_cache_dir
+        The directory to cache raw GBD pulls in, so they are reused by
+        later builds.  Nothing is cached if not given.
     """
     output_dir = Path(output_dir)
     vct.mkdir(output_dir, parents=True, exists_ok=True)
 
-    check_for_existing(output_dir, location, append)
+    check_for_existing(output_dir, location, append or incremental)
 
     if location in metadata.LOCATIONS:
-        build_single(location, output_dir, append)
+        build_single(location, output_dir, append, incremental, key_workers, gbd_cache_dir)
     elif location == 'all':
         if running_from_cluster():
             # parallel build when on cluster
-            build_all_artifacts(output_dir, verbose)
+            build_all_artifacts(output_dir, verbose, incremental, key_workers, gbd_cache_dir)
         else:
-            # serial build when not on cluster
-            for loc in metadata.LOCATIONS:
-                build_single(loc, output_dir, append)
+            # parallel build in local worker processes when not on cluster
+            workers = workers if workers is not None else min(len(metadata.LOCATIONS), os.cpu_count() or 1)
+            # Workers share this machine and its connection to GBD, so they share the key workers.
+            build_all_artifacts_locally(output_dir, workers, incremental, max(1, key_workers // workers),
+                                        gbd_cache_dir)
     else:
         raise ValueError(f'Location must be one of {metadata.LOCATIONS} or the string "all". '
                          f'You specified {location}.')
 
 
-def build_all_artifacts(output_dir: Path, verbose: int):
+def build_all_artifacts(output_dir: Path, verbose: int, incremental: bool = False,
+                        key_workers: int = metadata.MAKE_ARTIFACT_KEY_WORKERS, gbd_cache_dir: Optional[str] = None):
     """Builds artifacts for all locations in parallel.
     Parameters
     ----------
@@ -99,6 +128,12 @@ def build_all_artifacts(output_dir: Path, verbose: int):
         The directory where the artifacts will be built.
     verbose
         How noisy the logger should be.
+    incremental
+        Whether to rebuild only the stale keys of existing artifacts.
+    key_workers
+        The number of keys to load at once for each artifact.
+    gbd_cache_dir
+        The directory to cache raw GBD pulls in, if any.
     Note
     ----
         This function should not be called directly.  It is intended to be
@@ -115,7 +150,9 @@ def build_all_artifacts(output_dir: Path, verbose: int):
 
             job_template = session.createJobTemplate()
             job_template.remoteCommand = shutil.which("python")
-            job_template.args = [__file__, str(path), f'"{location}"']
+            job_template.args = ([__file__, str(path), f'"{location}"', '--key-workers', str(key_workers)]
+                                 + (['--incremental'] if incremental else [])
+                                 + (['--gbd-cache-dir', str(gbd_cache_dir)] if gbd_cache_dir is not None else []))
             job_template.nativeSpecification = (f'-V '  # Export all environment variables
                                                 f'-b y '  # Command is a binary (python)
                                                 f'-P {metadata.CLUSTER_PROJECT} '
@@ -147,7 +184,87 @@ def build_all_artifacts(output_dir: Path, verbose: int):
     logger.info('**Done**')
 
 
-def build_single_location_artifact(path: Union[str, Path], location: str, log_to_file: bool = False):
+def build_all_artifacts_locally(output_dir: Path, workers: int, incremental: bool = False,
+                                key_workers: int = metadata.MAKE_ARTIFACT_KEY_WORKERS,
+                                gbd_cache_dir: Optional[str] = None):
+    """Builds artifacts for all locations in parallel in local worker processes.
+    Parameters
+    ----------
+    output_dir
+        The directory where the artifacts will be built.
+    workers
+        The number of locations to build at once.
+    incremental
+        Whether to rebuild only the stale keys of existing artifacts.
+    key_workers
+        The number of keys to load at once for each artifact.
+    gbd_cache_dir
+        The directory to cache raw GBD pulls in, if any.  It is shared by
+        all workers.
+    Note
+    ----
+        This function should not be called directly.  It is intended to be
+        called by the :func:`build_artifacts` function located in the same
+        module.
+    """
+    logger.info(f'Building artifacts for {len(metadata.LOCATIONS)} locations with {workers} workers, '
+                f'each loading {key_workers} keys at once. '
+                f'Logs are written to {str(output_dir / "logs")}.')
+    with multiprocessing.Manager() as manager, futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        # Workers record when they start, since the executor can't tell
+        # queued locations from running ones.
+        start_times = manager.dict()
+        jobs = {}
+        for location in metadata.LOCATIONS:
+            path = output_dir / f'{sanitize_location(location)}.hdf'
+            jobs[executor.submit(build_single_location_artifact_in_worker, path, location,
+                                 incremental, key_workers, gbd_cache_dir, start_times)] = location
+
+        pending = jobs
+        while pending:
+            _, pending = futures.wait(pending, timeout=metadata.MAKE_ARTIFACT_SLEEP)
+            finished = len(jobs) - len(pending)
+            logger.info(f'{finished} of {len(jobs)} artifacts done.')
+            for job, location in jobs.items():
+                logger.info(f'{location:<{len_longest_location()}}: {get_job_status(job, location, start_times):>20}')
+            logger.info('')
+
+    failed = []
+    for job, location in jobs.items():
+        if job.exception() is not None:
+            log_file = output_dir / 'logs' / f'{sanitize_location(location)}.log'
+            logger.error(f'Building artifact for {location} failed with {repr(job.exception())}. '
+                         f'See {str(log_file)}.')
+            failed.append(location)
+    if failed:
+        raise RuntimeError(f'Building artifacts failed for {failed}.')
+    logger.info('**Done**')
+
+
+def build_single_location_artifact_in_worker(path: Path, location: str, incremental: bool, key_workers: int,
+                                             gbd_cache_dir: Optional[str], start_times: Dict[str, float]):
+    # Worker logs only go to the location's log file.
+    logger.remove()
+    start_times[location] = time.time()
+    try:
+        build_single_location_artifact(path, location, log_to_file=True, key_workers=key_workers,
+                                       incremental=incremental, gbd_cache_dir=gbd_cache_dir)
+    except Exception:
+        logger.exception(f'Building artifact for {location} failed.')
+        raise
+
+
+def get_job_status(job: futures.Future, location: str, start_times: Dict[str, float]) -> str:
+    if job.done():
+        return 'failed' if job.exception() is not None else 'finished'
+    if location in start_times:
+        return f'running {time.time() - start_times[location]:.0f}s'
+    return 'queued'
+
+
+def build_single_location_artifact(path: Union[str, Path], location: str, log_to_file: bool = False,
+                                   key_workers: int = metadata.MAKE_ARTIFACT_KEY_WORKERS, incremental: bool = False,
+                                   gbd_cache_dir: Optional[str] = None):
     """Builds an artifact for a single location.
     Parameters
     ----------
@@ -158,6 +275,12 @@ def build_single_location_artifact(path: Union[str, Path], location: str, log_to
         specified in the project globals.
     log_to_file
         Whether we should write the application logs to a file.
+    key_workers
+        The number of keys to load at once.  One loads keys serially.
+    incremental
+        Whether to reload and replace the stale keys of an existing artifact.
+    gbd_cache_dir
+        The directory to cache raw GBD pulls in, if any.
     Note
     ----
         This function should not be called directly.  It is intended to be
@@ -173,20 +296,66 @@ def build_single_location_artifact(path: Union[str, Path], location: str, log_to
         add_logging_sink(log_file, verbose=2)
 
     # Local import to avoid data dependencies
-    from vivarium_gates_lsff.data import builder
+    from vivarium_gates_lsff.data import builder, cache
+
+    if gbd_cache_dir is not None:
+        logger.info(f'Caching raw GBD pulls in {gbd_cache_dir}.')
+        cache.set_cache(cache.DirectoryCache(Path(gbd_cache_dir), metadata.GBD_CACHE_MAX_BYTES))
 
     logger.info(f'Building artifact for {location} at {str(path)}.')
     artifact = builder.open_artifact(path, location)
 
-    for key_group in data_keys.MAKE_ARTIFACT_KEY_GROUPS:
-        logger.info(f'Loading and writing {key_group.log_name} data')
-        for key in key_group:
-            builder.load_and_write_data(artifact, key, location)
+    keys = [key for key_group in data_keys.MAKE_ARTIFACT_KEY_GROUPS for key in key_group]
+    logger.info(f'Loading and writing data for {len(keys)} keys with {key_workers} workers.')
+    start = time.perf_counter()
+    timings = builder.load_and_write_all_data(artifact, keys, location,
+                                              data_keys.MAKE_ARTIFACT_KEY_DEPENDENCIES, key_workers, incremental)
+    for timing in timings.sort_values('load_seconds', ascending=False).itertuples():
+        logger.info(f'{timing.key}: loaded in {timing.load_seconds:.1f}s, written in {timing.write_seconds:.1f}s.')
+    logger.info(f'Wrote {len(timings)} keys in {time.perf_counter() - start:.1f}s.')
 
     logger.info(f'**Done building -- {location}**')
 
 
+def build_synthetic_artifacts(location: str, output_dir: str, draws: int, seed: int):
+    """Main application function for building synthetic artifacts.
+
+    Parameters
+    ----------
+    location
+        The location to build the artifact for.  Must be one of the
+        locations specified in the project globals or the string 'all'.
+    output_dir
+        The path where the artifact files will be built. The directory
+        will be created if it doesn't exist
+    draws
+        The number of draws to generate.
+    seed
+        Seed for the synthetic data.
+
+    """
+    # Local import to avoid loading data dependencies in the cli.
+    from vivarium_gates_lsff.data import synthetic
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    locations = metadata.LOCATIONS if location == 'all' else [location]
+    for loc in locations:
+        path = output_dir / f'{sanitize_location(loc)}.hdf'
+        delete_if_exists(path, confirm=True)
+        logger.info(f'Building synthetic artifact for {loc} at {str(path)} with {draws} draws.')
+        synthetic.build_synthetic_artifact(path, loc, draws, seed)
+    logger.info('**Done**')
+
+
 if __name__ == "__main__":
     artifact_path = sys.argv[1]
     artifact_location = sys.argv[2]
-    build_single_location_artifact(artifact_path, artifact_location, log_to_file=True)
+    options = sys.argv[3:]
+    artifact_key_workers = (int(options[options.index('--key-workers') + 1]) if '--key-workers' in options
+                            else metadata.MAKE_ARTIFACT_KEY_WORKERS)
+    artifact_gbd_cache_dir = (options[options.index('--gbd-cache-dir') + 1] if '--gbd-cache-dir' in options
+                              else None)
+    build_single_location_artifact(artifact_path, artifact_location, log_to_file=True,
+                                   key_workers=artifact_key_workers, incremental='--incremental' in options,
+                                   gbd_cache_dir=artifact_gbd_cache_dir)
@@ -0,0 +1,439 @@
+"""Main application functions for benchmarking the simulation and results processing.
+
+The simulation benchmarks run the project model specification against a synthetic
+artifact (see :mod:`vivarium_gates_lsff.data.synthetic`) at several
+population sizes for a fixed number of time steps.  Per-component timings
+come from the :class:`~vivarium_gates_lsff.components.TimeStepProfiler`
+and per-component memory from the
+:class:`~vivarium_gates_lsff.components.MemoryProfiler`.  Each population
+size runs in a fresh process so its peak memory is measured on its own.
+
+The results processing benchmark synthesizes the outputs of a parallel
+run at full width and times
+:func:`~vivarium_gates_lsff.tools.make_results.build_results` on them in
+each of its modes, along with each stage of the default mode.
+
+.. admonition::
+
+   Logging in this module should typically be done at the ``info`` level.
+   Use your best judgement.
+
+"""
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+from jinja2 import Template
+from loguru import logger
+
+import vivarium_gates_lsff
+from vivarium_gates_lsff import paths
+from vivarium_gates_lsff.constants import models, results
+from vivarium_gates_lsff.results_processing import process_results
+from vivarium_gates_lsff.tools import make_results
+from vivarium_gates_lsff.utilities import sanitize_location
+
+BENCHMARK_POPULATION_SIZES = (10_000, 100_000, 1_000_000)
+BENCHMARK_STEPS = 10
+# Simulations only use a single draw, so a small synthetic artifact suffices.
+BENCHMARK_ARTIFACT_DRAWS = 10
+BENCHMARK_EVENTS = ['time_step__prepare', 'time_step', 'time_step__cleanup', 'collect_metrics']
+BENCHMARK_VALUES = [
+    f'{models.IRON_DEFICIENCY_MODEL_NAME}.exposure',
+    f'{models.IRON_DEFICIENCY_MODEL_NAME}.disability_weight',
+    'anemia_severity',
+    'zinc_deficiency.exposure',
+    'neural_tube_defects.birth_prevalence',
+]
+RESULTS_BENCHMARK_DRAWS = 1000
+RESULTS_BENCHMARK_SEEDS = 10
+RESULTS_BENCHMARK_SCENARIOS = (
+    'baseline',
+    'folic_acid_fortification_scale_up',
+    'vitamin_a_fortification_scale_up',
+    'iron_fortification_scale_up',
+)
+# Share of simulation runs missing from the synthetic outputs, as when
+# some jobs of a parallel run fail.
+RESULTS_BENCHMARK_INCOMPLETE_FRACTION = 0.01
+RESULTS_BENCHMARK_MODES = ('default', 'streaming', 'by_measure')
+REGRESSION_THRESHOLD = 0.1
+
+
+def run_benchmarks(output_file: str, location: str, population_sizes: Sequence[int] = BENCHMARK_POPULATION_SIZES,
+                   steps: int = BENCHMARK_STEPS, seed: int = 0) -> Dict:
+    """Runs the scaling benchmarks and writes the results as a JSON baseline.
+
+    Parameters
+    ----------
+    output_file
+        Path to the JSON file to write the results to.  A synthetic artifact
+        and model specification are built next to it if not already present.
+    location
+        The location to benchmark.
+    population_sizes
+        The population sizes to benchmark.
+    steps
+        The number of time steps to run at each population size.
+    seed
+        Seed for the synthetic artifact.
+
+    Returns
+    -------
+        The benchmark results.
+
+    """
+    output_file = Path(output_file)
+    work_dir = output_file.parent / 'benchmark_inputs'
+    model_specification = prepare_benchmark_inputs(work_dir, location, seed)
+
+    benchmark_results = {}
+    # Fresh processes keep peak memory of each population size independent.
+    context = multiprocessing.get_context('spawn')
+    for population_size in population_sizes:
+        logger.info(f'Benchmarking {population_size} simulants over {steps} steps.')
+        with context.Pool(1) as pool:
+            result = pool.apply(run_benchmark, (model_specification, population_size, steps, work_dir))
+        end_to_end = result['end_to_end']
+        logger.info(f'{population_size} simulants: {end_to_end["simulant_steps_per_second"]:,.0f} '
+                    f'simulant-steps/sec, peak memory {end_to_end["peak_memory_bytes"] / 2**30:.2f} GiB.')
+        benchmark_results[str(population_size)] = result
+
+    return write_benchmarks(output_file, benchmark_results, location=location, steps=steps, seed=seed)
+
+
+def prepare_benchmark_inputs(work_dir: Path, location: str, seed: int) -> Path:
+    """Builds the synthetic artifact and model specification for benchmarking."""
+    # Local import to avoid loading data dependencies in the cli.
+    from vivarium_gates_lsff.data import synthetic
+
+    work_dir.mkdir(parents=True, exist_ok=True)
+    sanitized_location = sanitize_location(location)
+    artifact_path = work_dir / f'{sanitized_location}.hdf'
+    if not artifact_path.exists():
+        logger.info(f'Building synthetic artifact at {str(artifact_path)}.')
+        synthetic.build_synthetic_artifact(artifact_path, location, BENCHMARK_ARTIFACT_DRAWS, seed)
+
+    with (paths.MODEL_SPEC_DIR / 'model_spec.in').open() as infile:
+        template = Template(infile.read())
+    model_specification = work_dir / f'{sanitized_location}.yaml'
+    with model_specification.open('w') as outfile:
+        outfile.write(template.render(
+            location_proper=location,
+            location_sanitized=sanitized_location,
+            artifact_directory=work_dir,
+        ))
+    return model_specification
+
+
+def run_benchmark(model_specification: Path, population_size: int, steps: int, output_dir: Path) -> Dict:
+    """Runs and profiles a single simulation.
+
+    Note
+    ----
+        This function is intended to be called in its own process by
+        :func:`run_benchmarks` so that the peak memory it reports belongs to
+        this simulation alone.
+
+    """
+    from vivarium import InteractiveContext
+    from vivarium_gates_lsff.components import MemoryProfiler, TimeStepProfiler
+
+    run_dir = output_dir / f'population_{population_size}'
+    configuration = {
+        'population': {'population_size': population_size},
+        'output_data': {'results_directory': str(run_dir)},
+        'time_step_profiler': {'events': BENCHMARK_EVENTS, 'values': BENCHMARK_VALUES},
+        'memory_profiler': {'steps': []},
+    }
+
+    start = time.perf_counter()
+    sim = InteractiveContext(str(model_specification), components=[TimeStepProfiler(), MemoryProfiler()],
+                             configuration=configuration)
+    setup_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sim.take_steps(steps, with_logging=False)
+    step_seconds = time.perf_counter() - start
+
+    ppf_seconds = time_ppf(sim, repeats=steps)
+    sim.finalize()
+
+    simulant_steps = population_size * steps
+    profile = sim.get_component('time_step_profiler').get_per_step_profile()
+    components = {}
+    for (kind, name), totals in profile.groupby(['kind', 'name'])[['calls', 'seconds']].sum().iterrows():
+        components[name] = {
+            'kind': kind,
+            'calls': int(totals['calls']),
+            'seconds': float(totals['seconds']),
+            'simulant_steps_per_second': simulant_steps / totals['seconds'] if totals['seconds'] else None,
+        }
+    components[f'{models.IRON_DEFICIENCY_MODEL_NAME}_exposure_distribution.ppf'] = {
+        'kind': 'function',
+        'calls': steps,
+        'seconds': ppf_seconds,
+        'simulant_steps_per_second': simulant_steps / ppf_seconds,
+    }
+
+    memory = pd.DataFrame(sim.get_component('memory_profiler').samples,
+                          columns=['sample', 'category', 'owner', 'item', 'bytes'])
+    memory = memory[memory['sample'] == 'simulation_end'].groupby('owner')['bytes'].sum()
+
+    return {
+        'end_to_end': {
+            'setup_seconds': setup_seconds,
+            'step_seconds': step_seconds,
+            'simulant_steps_per_second': simulant_steps / step_seconds,
+            'peak_memory_bytes': get_peak_memory(),
+        },
+        'components': components,
+        'memory_bytes': {owner: int(nbytes) for owner, nbytes in memory.items()},
+    }
+
+
+def time_ppf(sim, repeats: int) -> float:
+    """Times the hemoglobin quantile function over the whole population."""
+    distribution = sim.get_component(f'{models.IRON_DEFICIENCY_MODEL_NAME}_exposure_distribution')
+    pop = sim.get_population()
+    propensity = pop[f'{models.IRON_DEFICIENCY_MODEL_NAME}_propensity']
+    ensemble_propensity = pop[f'{models.IRON_DEFICIENCY_MODEL_NAME}_ensemble_propensity']
+    start = time.perf_counter()
+    for _ in range(repeats):
+        distribution.ppf(propensity, ensemble_propensity)
+    return time.perf_counter() - start
+
+
+def run_results_benchmark(output_file: str, draws: int = RESULTS_BENCHMARK_DRAWS,
+                          seeds: int = RESULTS_BENCHMARK_SEEDS,
+                          scenarios: Sequence[str] = RESULTS_BENCHMARK_SCENARIOS, seed: int = 0) -> Dict:
+    """Benchmarks results processing and writes the results as a JSON baseline.
+
+    Parameters
+    ----------
+    output_file
+        Path to the JSON file to write the results to.  The synthetic
+        simulation outputs are written next to it if not already present.
+    draws
+        The number of input draws in the synthetic outputs.
+    seeds
+        The number of random seeds per draw in the synthetic outputs.
+    scenarios
+        The scenarios in the synthetic outputs.
+    seed
+        Seed for the synthetic outputs.
+
+    Returns
+    -------
+        The benchmark results.
+
+    """
+    output_file = Path(output_file)
+    work_dir = output_file.parent / 'results_benchmark_inputs'
+    simulation_output = work_dir / 'output.hdf'
+    if not simulation_output.exists():
+        logger.info(f'Synthesizing simulation outputs at {str(simulation_output)}.')
+        build_synthetic_results(work_dir, draws, seeds, scenarios, seed)
+
+    logger.info(f'Benchmarking results processing for {draws} draws, {seeds} seeds '
+                f'and {len(scenarios)} scenarios.')
+    result = {}
+    for mode in RESULTS_BENCHMARK_MODES:
+        # A fresh process keeps the memory used to synthesize outputs and
+        # by the other modes out of the peak.
+        with multiprocessing.get_context('spawn').Pool(1) as pool:
+            result[mode] = pool.apply(run_results_processing, (simulation_output, mode))
+        for stage, metrics in [('end_to_end', result[mode]['end_to_end']), *result[mode]['stages'].items()]:
+            logger.info(f'{mode} {stage}: {metrics["seconds"]:.2f}s, '
+                        f'peak memory {metrics["peak_memory_bytes"] / 2**30:.2f} GiB.')
+
+    return write_benchmarks(output_file, {'results_processing': result},
+                            draws=draws, seeds=seeds, scenarios=list(scenarios), seed=seed)
+
+
+def build_synthetic_results(output_dir: Path, draws: int, seeds: int, scenarios: Sequence[str], seed: int):
+    """Writes the outputs of a parallel simulation run with synthetic counts.
+
+    The ``output.hdf`` has a row for every simulation run and a column for
+    every result column the observers produce, along with the
+    ``keyspace.yaml`` and ``model_specification.yaml`` results processing
+    reads from the same directory.  A small share of runs is left out so
+    incomplete draws have to be filtered.
+
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    random = np.random.RandomState(seed)
+
+    field_map = results.TEMPLATE_FIELD_MAP
+    columns = results.RESULT_COLUMNS(field_map)
+    runs = pd.MultiIndex.from_product([range(draws), range(seeds), scenarios],
+                                      names=[results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN,
+                                             results.OUTPUT_SCENARIO_COLUMN])
+    runs = runs[random.uniform(size=len(runs)) >= RESULTS_BENCHMARK_INCOMPLETE_FRACTION]
+    data = pd.DataFrame(random.gamma(2., 50., size=(len(runs), len(columns))), columns=columns)
+    data = pd.concat([runs.to_frame(index=False), data], axis=1)
+    data.to_hdf(output_dir / 'output.hdf', key='data')
+
+    keyspace = {
+        results.INPUT_DRAW_COLUMN: list(range(draws)),
+        results.RANDOM_SEED_COLUMN: list(range(seeds)),
+        results.OUTPUT_SCENARIO_COLUMN: list(scenarios),
+    }
+    with (output_dir / 'keyspace.yaml').open('w') as f:
+        yaml.dump(keyspace, f)
+
+    model_specification = {'configuration': {'time': {'start': {'year': results.YEARS[0]},
+                                                      'end': {'year': results.YEARS[-1]}}}}
+    with (output_dir / 'model_specification.yaml').open('w') as f:
+        yaml.dump(model_specification, f)
+
+
+def run_results_processing(simulation_output: Path, mode: str) -> Dict:
+    """Runs and times :func:`~vivarium_gates_lsff.tools.make_results.build_results`.
+
+    Note
+    ----
+        Stages are timed from the log messages that start them, which
+        :func:`~vivarium_gates_lsff.tools.make_results.build_results` names
+        with a ``stage`` in their extra record.  Only the default mode names
+        its stages; the streaming and by-measure modes are timed end to end.
+        This is intended to be called in its own process by
+        :func:`run_results_benchmark`.  Peak memory is the high water mark
+        of the process at the end of each stage.
+
+    """
+    stage_starts = []
+
+    def record_stage(message):
+        stage = message.record['extra'].get('stage')
+        if stage is not None:
+            stage_starts.append((stage, time.perf_counter(), get_peak_memory()))
+
+    sink = logger.add(record_stage, level='INFO')
+    start = time.perf_counter()
+    try:
+        make_results.build_results(str(simulation_output), single_run=False,
+                                   streaming=mode == 'streaming', by_measure=mode == 'by_measure')
+    finally:
+        logger.remove(sink)
+    end, peak_memory = time.perf_counter(), get_peak_memory()
+
+    with process_results.ResultsReader(simulation_output, single_run=False) as reader:
+        runs = len(reader.read_runs())
+
+    stages = {}
+    stage_ends = [(stage_start, peak) for _, stage_start, peak in stage_starts[1:]] + [(end, peak_memory)]
+    for (stage, stage_start, _), (stage_end, peak) in zip(stage_starts, stage_ends):
+        stages[stage] = get_stage_metrics(stage_end - stage_start, runs, peak)
+
+    return {
+        'end_to_end': get_stage_metrics(end - start, runs, peak_memory),
+        'stages': stages,
+    }
+
+
+def get_stage_metrics(seconds: float, runs: int, peak_memory: int) -> Dict:
+    """Summarizes a stage that processed ``runs`` simulation runs in ``seconds``."""
+    return {
+        'seconds': seconds,
+        'runs_per_second': runs / seconds,
+        'peak_memory_bytes': peak_memory,
+    }
+
+
+def write_benchmarks(output_file: Path, benchmark_results: Dict, **metadata) -> Dict:
+    """Writes benchmark results along with a record of the environment that produced them."""
+    benchmarks = {
+        'metadata': {
+            'created': datetime.now().isoformat(),
+            'version': vivarium_gates_lsff.__version__,
+            'python': sys.version,
+            'platform': platform.platform(),
+            **metadata,
+        },
+        'results': benchmark_results,
+    }
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with output_file.open('w') as f:
+        json.dump(benchmarks, f, indent=2)
+    logger.info(f'Wrote benchmark results to {str(output_file)}.')
+    return benchmarks
+
+
+def get_peak_memory() -> int:
+    """Gets the peak resident memory of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def compare_benchmarks(baseline_file: str, candidate_file: str,
+                       threshold: float = REGRESSION_THRESHOLD) -> List[Dict]:
+    """Compares benchmark results against a baseline and reports regressions.
+
+    Throughput metrics (``*_per_second``) regress when they drop by more
+    than ``threshold`` and memory metrics (``*bytes*``) when they grow by
+    more than ``threshold``, both relative to the baseline.  Results of
+    both the simulation and the results processing benchmarks can be
+    compared.
+
+    Parameters
+    ----------
+    baseline_file
+        Path to the baseline benchmark results.
+    candidate_file
+        Path to the benchmark results to check.
+    threshold
+        The relative change beyond which a metric is flagged.
+
+    Returns
+    -------
+        The flagged regressions.
+
+    """
+    with Path(baseline_file).open() as f:
+        baseline = json.load(f)['results']
+    with Path(candidate_file).open() as f:
+        candidate = json.load(f)['results']
+
+    regressions = []
+    for benchmark in [b for b in baseline if b in candidate]:
+        baseline_metrics = dict(get_metrics(baseline[benchmark]))
+        candidate_metrics = dict(get_metrics(candidate[benchmark]))
+        for metric in sorted(set(baseline_metrics).intersection(candidate_metrics)):
+            old, new = baseline_metrics[metric], candidate_metrics[metric]
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            higher_is_better = metric.endswith('_per_second')
+            regressed = change < -threshold if higher_is_better else change > threshold
+            logger.info(f'{benchmark:>18} {metric:<70} {old:>14.4g} -> {new:>14.4g} ({change:+.1%})'
+                        + ('  REGRESSION' if regressed else ''))
+            if regressed:
+                regressions.append({'benchmark': benchmark, 'metric': metric,
+                                    'baseline': old, 'candidate': new, 'change': change})
+
+    if regressions:
+        logger.warning(f'{len(regressions)} metrics regressed by more than {threshold:.0%}.')
+    else:
+        logger.info(f'No metrics regressed by more than {threshold:.0%}.')
+    return regressions
+
+
+def get_metrics(result: Dict, prefix: str = '') -> Iterator[Tuple[str, Any]]:
+    """Flattens the throughput and memory metrics of a single benchmark result."""
+    for key, value in result.items():
+        metric = f'{prefix}{key}'
+        if isinstance(value, dict):
+            yield from get_metrics(value, prefix=f'{metric}.')
+        elif metric.endswith('_per_second') or 'bytes' in metric:
+            yield metric, value
@@ -1,36 +1,86 @@
 from pathlib import Path
 import shutil
+from typing import Dict, Tuple
 
 from loguru import logger
+import pandas as pd
 
 from vivarium_gates_lsff.results_processing import process_results
+from vivarium_gates_lsff.constants import results
 from vivarium_gates_lsff.constants.results import TEMPLATE_FIELD_MAP
 
 
-def build_results(output_file: str, single_run: bool):
+def build_results(output_file: str, single_run: bool, streaming: bool = False, by_measure: bool = False):
     output_file = Path(output_file)
     measure_dir = output_file.parent / 'count_data'
     if measure_dir.exists():
         shutil.rmtree(measure_dir)
     measure_dir.mkdir(exist_ok=True, mode=0o775)
 
-    logger.info(f'Reading in output data from {str(output_file)}.')
+    if streaming or by_measure:
+        if streaming:
+            build_results_by_draw(output_file, measure_dir, single_run)
+        else:
+            build_results_by_measure(output_file, measure_dir, single_run)
+        logger.info('**DONE**')
+        return
+
+    # Each stage is named in the message that starts it so it can be timed.
+    logger.bind(stage='read').info(f'Reading in output data from {str(output_file)}.')
     data, keyspace, years = process_results.read_data(output_file, single_run)
+    field_map = get_field_map(years)
+
+    logger.bind(stage='filter').info(f'Filtering incomplete data from outputs.')
+    complete_seeds = process_results.get_complete_seeds(data, keyspace)
+    log_dropped_seeds(process_results.get_dropped_seeds(data, complete_seeds))
+    logger.bind(stage='aggregate').info(f'Aggregating outputs over random seeds.')
+    data = process_results.aggregate_over_seed(data, field_map, complete_seeds)
+    logger.bind(stage='make_measure_data').info(f'Computing raw count and proportion data.')
+    measure_data = process_results.make_measure_data(data, field_map)
+    logger.bind(stage='dump').info(f'Writing raw count and proportion data to {str(measure_dir)}')
+    measure_data.dump(measure_dir)
+    logger.info('**DONE**')
+
+
+def build_results_by_draw(output_file: Path, measure_dir: Path, single_run: bool):
+    """Processes the outputs one draw at a time, appending each draw to the measure data."""
+    logger.info(f'Streaming output data from {str(output_file)} one draw at a time.')
+    keyspace = process_results.read_keyspace(output_file, single_run)
+    field_map = get_field_map(process_results.read_model_spec_for_start_end(output_file.parent))
+
+    draws = 0
+    with process_results.ResultsReader(output_file, single_run) as reader:
+        for measure_data in process_results.stream_measure_data(reader, keyspace, field_map):
+            measure_data.dump(measure_dir, append=True)
+            draws += measure_data.population[results.INPUT_DRAW_COLUMN].nunique()
+            logger.info(f'Wrote raw count and proportion data for {draws} draws.')
+    process_results.finish_appended_measure_data(measure_dir)
+    logger.info(f'Wrote raw count and proportion data for {draws} draws to {str(measure_dir)}.')
+
 
+def build_results_by_measure(output_file: Path, measure_dir: Path, single_run: bool):
+    """Processes the outputs one measure at a time, reading only the columns each measure needs."""
+    logger.info(f'Reading output data from {str(output_file)} one measure at a time.')
+    keyspace = process_results.read_keyspace(output_file, single_run)
+    field_map = get_field_map(process_results.read_model_spec_for_start_end(output_file.parent))
+
+    with process_results.ResultsReader(output_file, single_run) as reader:
+        for measure, data in process_results.make_measure_data_by_measure(reader, keyspace, field_map):
+            process_results.dump_measure(measure_dir, measure, data)
+            logger.info(f'Wrote raw count and proportion data for {measure}.')
+    logger.info(f'Wrote raw count and proportion data to {str(measure_dir)}.')
+
+
+def log_dropped_seeds(dropped_seeds: pd.MultiIndex):
+    logger.info(f'Filtered {len(dropped_seeds)} (draw, seed) pairs from data due to incomplete information.')
+    for draw, seed in dropped_seeds:
+        logger.info(f'Dropped draw {draw}, seed {seed}.')
+
+
+def get_field_map(years: Tuple[int, int]) -> Dict[str, Tuple]:
     # Get the actual number of years the sim ran. It is sometimes helpful
     #  to run for less than the full duration and that will cause an error
     #  when using the default time period
     field_map = TEMPLATE_FIELD_MAP.copy()
     field_map['YEAR'] = tuple(range(years[0], years[1]+1))
-
-    logger.info(f'Filtering incomplete data from outputs.')
-    rows = len(data)
-    data = process_results.filter_out_incomplete(data, keyspace)
-    new_rows = len(data)
-    logger.info(f'Filtered {rows - new_rows} from data due to incomplete information.  {new_rows} remaining.')
-    data = process_results.aggregate_over_seed(data, field_map)
-    logger.info(f'Computing raw count and proportion data.')
-    measure_data = process_results.make_measure_data(data, field_map)
-    logger.info(f'Writing raw count and proportion data to {str(measure_dir)}')
-    measure_data.dump(measure_dir)
-    logger.info('**DONE**')
+    return field_map
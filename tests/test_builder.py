@@ -0,0 +1,100 @@
+import copy
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('gbd_mapping')
+pytest.importorskip('vivarium_inputs')
+
+from vivarium.framework.artifact import Artifact
+
+from vivarium_gates_lsff.constants import data_keys, data_values
+from vivarium_gates_lsff.data import builder, loader
+
+LOCATION = 'Nigeria'
+NO_ANEMIA_PROPORTION = data_keys.IRON_DEFICIENCY.IRON_DEFICIENCY_NO_ANEMIA_IRON_RESPONSIVE_PROPORTION
+MILD_PROPORTION = data_keys.IRON_DEFICIENCY.IRON_DEFICIENCY_MILD_ANEMIA_IRON_RESPONSIVE_PROPORTION
+MILD_DISABILITY_WEIGHT = data_keys.IRON_DEFICIENCY.IRON_DEFICIENCY_MILD_ANEMIA_DISABILITY_WEIGHT
+KEYS = [MILD_PROPORTION, NO_ANEMIA_PROPORTION, MILD_DISABILITY_WEIGHT]
+
+
+@pytest.fixture
+def loaded(monkeypatch):
+    """Replaces loading data from GBD with numbering each load, and records the keys loaded."""
+    loaded = []
+
+    def get_data(key, location):
+        loaded.append(key)
+        return pd.DataFrame({'value': [float(len(loaded))]})
+
+    monkeypatch.setattr(loader, 'get_data', get_data)
+    return loaded
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    return builder.open_artifact(tmp_path / 'artifact.hdf', LOCATION)
+
+
+def build(artifact, loaded, incremental, workers=1):
+    loaded.clear()
+    builder.load_and_write_all_data(artifact, KEYS, LOCATION, data_keys.MAKE_ARTIFACT_KEY_DEPENDENCIES,
+                                    workers, incremental)
+    return sorted(loaded)
+
+
+def test_load_and_write_all_data_dependencies(artifact, loaded):
+    timings = builder.load_and_write_all_data(artifact, KEYS, LOCATION, data_keys.MAKE_ARTIFACT_KEY_DEPENDENCIES,
+                                              workers=3)
+
+    assert loaded.index(NO_ANEMIA_PROPORTION) < loaded.index(MILD_PROPORTION)
+    assert sorted(timings['key']) == sorted(KEYS)
+    for key in KEYS:
+        assert key in artifact
+    assert set(artifact.load(data_keys.METADATA_PROVENANCE)) == set(KEYS)
+
+
+def test_load_and_write_all_data_circular_dependencies(artifact, loaded):
+    dependencies = {MILD_PROPORTION: [NO_ANEMIA_PROPORTION], NO_ANEMIA_PROPORTION: [MILD_PROPORTION]}
+    with pytest.raises(ValueError, match='circular'):
+        builder.load_and_write_all_data(artifact, KEYS, LOCATION, dependencies, workers=1)
+    assert loaded == [MILD_DISABILITY_WEIGHT]
+
+
+def test_incremental_build_unchanged(artifact, loaded):
+    build(artifact, loaded, incremental=False)
+
+    assert build(artifact, loaded, incremental=True) == []
+    assert build(artifact, loaded, incremental=False) == []
+
+
+def test_incremental_build_data_values_changed(artifact, loaded, monkeypatch):
+    build(artifact, loaded, incremental=False)
+    sequelae = copy.deepcopy(data_values.ANEMIA_SEQUELAE_ID_MAP)
+    sequelae['mild'][0].append(99999)
+    monkeypatch.setattr(data_values, 'ANEMIA_SEQUELAE_ID_MAP', sequelae)
+
+    # Only a full rebuild replaces stale keys.
+    assert build(artifact, loaded, incremental=False) == []
+    assert build(artifact, loaded, incremental=True) == sorted([MILD_PROPORTION, NO_ANEMIA_PROPORTION])
+    assert build(artifact, loaded, incremental=True) == []
+
+
+def test_incremental_build_loader_changed(artifact, loaded, monkeypatch):
+    build(artifact, loaded, incremental=False)
+    old_data = artifact.load(MILD_DISABILITY_WEIGHT)
+
+    def load_iron_deficiency_dw(key, location):
+        return loader.load_standard_data(key, location)
+
+    monkeypatch.setattr(loader, 'load_iron_deficiency_dw', load_iron_deficiency_dw)
+
+    assert build(artifact, loaded, incremental=True) == [MILD_DISABILITY_WEIGHT]
+    assert not artifact.load(MILD_DISABILITY_WEIGHT).equals(old_data)
+
+
+def test_incremental_build_without_provenance(tmp_path, loaded):
+    artifact = Artifact(tmp_path / 'artifact.hdf')
+    artifact.write(MILD_DISABILITY_WEIGHT, pd.DataFrame({'value': [0.]}))
+
+    assert build(artifact, loaded, incremental=True) == sorted(KEYS)
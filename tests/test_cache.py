@@ -0,0 +1,100 @@
+import os
+
+import pandas as pd
+import pytest
+
+from vivarium_gates_lsff.data import cache
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame({'location': ['Nigeria'] * 3, 'value': [0.1, 0.2, 0.3]})
+
+
+def test_directory_cache_put_get(data, tmp_path):
+    directory_cache = cache.DirectoryCache(tmp_path / 'cache')
+    assert directory_cache.get('key') is None
+
+    directory_cache.put('key', data)
+
+    pd.testing.assert_frame_equal(directory_cache.get('key'), data)
+    assert [path.name for path in (tmp_path / 'cache').iterdir()] == ['key.hdf']
+
+
+def test_directory_cache_evicts_least_recently_used(data, tmp_path):
+    directory_cache = cache.DirectoryCache(tmp_path)
+    for i, key in enumerate(['old', 'used', 'new']):
+        directory_cache.put(key, data)
+        os.utime(tmp_path / f'{key}.hdf', (i, i))
+    # Reading a pull marks it as the most recently used.
+    directory_cache.get('used')
+    file_size = (tmp_path / 'new.hdf').stat().st_size
+
+    directory_cache.evict(2 * file_size)
+
+    assert sorted(path.stem for path in tmp_path.glob('*.hdf')) == ['new', 'used']
+    assert directory_cache.get('old') is None
+
+
+def test_directory_cache_put_evicts_past_max_bytes(data, tmp_path):
+    directory_cache = cache.DirectoryCache(tmp_path)
+    directory_cache.put('first', data)
+    directory_cache.max_bytes = (tmp_path / 'first.hdf').stat().st_size
+    os.utime(tmp_path / 'first.hdf', (0, 0))
+
+    directory_cache.put('second', data)
+
+    assert [path.stem for path in tmp_path.glob('*.hdf')] == ['second']
+
+
+def test_directory_cache_read_only(data, tmp_path):
+    cache.DirectoryCache(tmp_path).put('key', data)
+    os.utime(tmp_path / 'key.hdf', (0, 0))
+    read_only_cache = cache.DirectoryCache(tmp_path, read_only=True)
+
+    read_only_cache.put('other', data)
+    pd.testing.assert_frame_equal(read_only_cache.get('key'), data)
+
+    assert [path.name for path in tmp_path.iterdir()] == ['key.hdf']
+    assert (tmp_path / 'key.hdf').stat().st_mtime == 0
+    with pytest.raises(KeyError):
+        read_only_cache.get('other')
+
+
+def test_cached_pull(data, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, '_cache', cache.DirectoryCache(tmp_path))
+    calls = []
+
+    def pull(value):
+        calls.append(value)
+        if value is None:
+            raise ValueError('No data.')
+        return data
+
+    for _ in range(2):
+        pd.testing.assert_frame_equal(cache.cached_pull(pull, 'measles', 'incidence_rate', 'Nigeria', 1), data)
+        with pytest.raises(ValueError, match='No data.'):
+            cache.cached_pull(pull, 'measles', 'remission_rate', 'Nigeria', None, errors=(ValueError,))
+
+    assert calls == [1, None]
+
+
+def test_nothing_cached_by_default(data):
+    assert type(cache.get_cache()) is cache.DataCache
+    calls = []
+
+    def pull():
+        calls.append(None)
+        return data
+
+    for _ in range(2):
+        pd.testing.assert_frame_equal(cache.cached_pull(pull, 'measles', 'incidence_rate', 'Nigeria'), data)
+
+    assert len(calls) == 2
+
+
+def test_package_versions():
+    versions = cache.get_package_versions()
+
+    assert set(versions) == set(cache.VERSIONED_PACKAGES)
+    assert all(version is None or isinstance(version, str) for version in versions.values())
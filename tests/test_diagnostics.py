@@ -0,0 +1,122 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from vivarium import InteractiveContext
+
+from vivarium_gates_lsff.components import diagnostics
+from vivarium_gates_lsff.components.diagnostics import get_nbytes, MemoryProfiler, TimeStepProfiler
+from vivarium_gates_lsff.components.disease.iron_deficiency import StepMemo
+
+SLEEP = 0.01
+
+
+class Slow:
+    """Calls its own slow pipeline twice in each time step prepare listener."""
+
+    name = 'slow'
+
+    def setup(self, builder):
+        self.value = builder.value.register_value_producer('slow.value', source=self.source)
+        builder.event.register_listener('time_step__prepare', self.on_time_step_prepare)
+
+    def source(self, index):
+        time.sleep(SLEEP)
+        return pd.Series(1., index=index)
+
+    def on_time_step_prepare(self, event):
+        self.value(event.index)
+        self.value(event.index)
+
+
+class Holder:
+    """Holds array-backed data for the memory profiler to find."""
+
+    name = 'holder'
+
+    def setup(self, builder):
+        self.data = np.zeros(1000)
+        self.label = 'not counted on its own'
+
+
+@pytest.fixture
+def profiler():
+    sim = InteractiveContext(components=[Slow(), TimeStepProfiler()], configuration={
+        'population': {'population_size': 10},
+        'time': {'start': {'year': 2020}, 'end': {'year': 2021}, 'step_size': 5},
+        'time_step_profiler': {'events': ['time_step__prepare'], 'values': ['slow.value']},
+    })
+    sim.take_steps(3)
+    return sim.get_component('time_step_profiler')
+
+
+def test_per_step_profile(profiler):
+    per_step = profiler.get_per_step_profile()
+
+    assert per_step.step.nunique() == 3
+    values = per_step[per_step.kind == 'value']
+    listeners = per_step[per_step.kind == 'listener']
+    assert (values.name == 'slow.value').all()
+    assert (listeners.name == 'time_step__prepare.slow.on_time_step_prepare').all()
+    assert (values.calls == 2).all()
+    assert (listeners.calls == 1).all()
+    assert (values.seconds >= 2 * SLEEP).all()
+    # The listener's own time includes the two pipeline calls it makes.
+    assert (listeners.seconds.values >= values.seconds.values).all()
+
+
+def test_cumulative_profile(profiler):
+    per_step = profiler.get_per_step_profile()
+    cumulative = TimeStepProfiler.get_cumulative_profile(per_step)
+
+    value = cumulative[cumulative.name == 'slow.value'].iloc[0]
+    assert value.calls == 6
+    assert value.seconds == pytest.approx(per_step.loc[per_step.kind == 'value', 'seconds'].sum())
+
+
+def test_get_nbytes():
+    array = np.zeros(100)
+    frame = pd.DataFrame({'x': np.zeros(10), 'y': ['a'] * 10})
+    series = pd.Series(np.zeros(10))
+
+    assert get_nbytes(array) == array.nbytes
+    assert get_nbytes(frame) == frame.memory_usage(deep=True).sum()
+    assert get_nbytes(series) == series.memory_usage(deep=True)
+    assert get_nbytes([array, (array, series)]) == 2 * array.nbytes + series.memory_usage(deep=True)
+    assert get_nbytes({'key': array}) == sys.getsizeof({'key': array}) + sys.getsizeof('key') + array.nbytes
+    # Objects from outside the package and nesting past the depth limit are not searched.
+    assert get_nbytes(Holder()) == 0
+    assert get_nbytes([[[[array]]]]) == 0
+
+    memo = StepMemo(clock=lambda: None)
+    memo._values['value'] = series
+    assert get_nbytes(memo) == (sys.getsizeof(memo.hits) + sys.getsizeof(memo.misses)
+                                + sys.getsizeof(memo._values) + sys.getsizeof('value')
+                                + series.memory_usage(deep=True))
+
+
+def test_memory_profiler_samples():
+    sim = InteractiveContext(components=[Holder(), MemoryProfiler()], configuration={
+        'population': {'population_size': 10},
+        'time': {'start': {'year': 2020}, 'end': {'year': 2021}, 'step_size': 5},
+    })
+    sim.take_steps(2)
+    profiler = sim.get_component('memory_profiler')
+    samples = pd.DataFrame(profiler.samples, columns=['sample', 'category', 'owner', 'item', 'bytes'])
+
+    assert list(samples['sample'].unique()) == ['setup', 'step_1']
+    assert not (samples.loc[samples['sample'] == 'setup', 'category'] == 'state_table').any()
+
+    step = samples[samples['sample'] == 'step_1'].set_index(['category', 'owner', 'item'])['bytes'].sort_index()
+    expected = sim.get_population(untracked=True).memory_usage(deep=True, index=False)
+    assert step.loc['state_table', 'population'].sort_index().equals(expected.sort_index())
+    assert step.loc['component', 'holder', 'data'] == 1000 * 8
+    assert ('component', 'holder', 'label') not in step.index
+
+
+def test_unsupported_vivarium_version(monkeypatch):
+    monkeypatch.setattr(diagnostics.vivarium, '__version__', '0.11.0')
+    with pytest.raises(RuntimeError, match='0.11.0'):
+        diagnostics.VivariumInternals(builder=None)
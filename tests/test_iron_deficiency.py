@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.stats
+from vivarium.framework.lookup import InterpolatedTable
+from vivarium_public_health.risks.distributions import clip
+from vivarium_public_health.utilities import to_years
+
+from vivarium_gates_lsff.constants import data_values, models
+from vivarium_gates_lsff.components.disease import iron_deficiency
+
+
+def gamma_ppf(q, mean, sd):
+    return scipy.stats.gamma(a=(mean / sd)**2, scale=sd**2 / mean).ppf(q)
+
+
+def mirrored_gumbel_ppf(q, mean, sd):
+    x_max = data_values.HEMOGLOBIN_DISTRIBUTION.EXPOSURE_MAX
+    _alpha = x_max - mean - (sd * np.euler_gamma * np.sqrt(6) / np.pi)
+    scale = sd * np.sqrt(6) / np.pi
+    alpha = _alpha + x_max - 2 * (_alpha + scale * np.euler_gamma)
+    return scipy.stats.gumbel_r(alpha, scale=scale).ppf(q)
+
+
+@pytest.fixture
+def exposure_inputs():
+    size = 1000
+    random_state = np.random.RandomState(1234)
+    index = pd.Index(random_state.permutation(np.arange(2 * size))[:size])
+    propensity = random_state.uniform(size=size)
+    propensity[:4] = [0., 1., 0.5, 1e-12]
+    groups = np.array([[120., 15.], [135., 12.], [110., 20.], [135., 15.], [np.nan, np.nan]])
+    parameters = groups[random_state.randint(len(groups), size=size)]
+    return (pd.Series(propensity, index=index),
+            pd.Series(random_state.uniform(size=size), index=index),
+            pd.Series(parameters[:, 0], index=index),
+            pd.Series(parameters[:, 1], index=index))
+
+
+def test_compute_exposure(exposure_inputs):
+    propensity, ensemble_propensity, mean, sd = exposure_inputs
+
+    exposure = iron_deficiency.IronDeficiencyDistribution().compute_exposure(propensity, ensemble_propensity,
+                                                                              mean, sd)
+
+    q = clip(propensity.values.copy())
+    gamma = ensemble_propensity.values < data_values.HEMOGLOBIN_DISTRIBUTION.WEIGHT_GAMMA
+    expected = np.where(gamma, gamma_ppf(q, mean.values, sd.values), mirrored_gumbel_ppf(q, mean.values, sd.values))
+    assert exposure.index.equals(propensity.index)
+    assert exposure.name == 'value'
+    assert np.isnan(exposure.values).sum() == mean.isnull().sum() > 0
+    np.testing.assert_allclose(exposure.values, expected, rtol=1e-10)
+
+
+def baseline_ppf(propensity, ensemble_propensity, mean, sd):
+    """The per-simulant quantile function exposure was evaluated with before parameter grouping."""
+    propensity = clip(propensity.copy())
+    gamma = ensemble_propensity < data_values.HEMOGLOBIN_DISTRIBUTION.WEIGHT_GAMMA
+    gumbel = ~gamma
+    exposure = pd.Series(np.nan, index=propensity.index, name='value')
+    exposure.loc[gamma] = gamma_ppf(propensity.loc[gamma], mean.loc[gamma], sd.loc[gamma])
+    exposure.loc[gumbel] = mirrored_gumbel_ppf(propensity.loc[gumbel], mean.loc[gumbel], sd.loc[gumbel])
+    return exposure
+
+
+def test_ppf_matches_baseline(exposure_inputs):
+    propensity, _, mean, sd = exposure_inputs
+    distribution = iron_deficiency.IronDeficiencyDistribution()
+    distribution.exposure_parameters = lambda index: pd.DataFrame({'mean': mean, 'sd': sd}).loc[index]
+
+    # Exposure draws the quantile and the ensemble component from the same propensity.
+    exposure = distribution.ppf(propensity, propensity)
+
+    pd.testing.assert_series_equal(exposure, baseline_ppf(propensity, propensity, mean, sd), rtol=1e-10)
+
+
+def test_hemoglobin_exposure_cache():
+    cache = iron_deficiency.HemoglobinExposureCache()
+    index = pd.Index([4, 0, 2])
+    mean = pd.Series([120., 130., 120.], index=index)
+    sd = pd.Series([15., 15., 12.], index=index)
+
+    assert cache.is_stale(index, mean, sd).all()
+    cache.update(pd.Series([1., 2., 3.], index=index), mean, sd)
+    assert not cache.is_stale(index, mean, sd).any()
+    pd.testing.assert_series_equal(cache.get(index[::-1]), pd.Series([3., 2., 1.], index=index[::-1], name='value'))
+
+    # Simulants crossed into bins with new parameters, and new simulants entered.
+    mean[4] = 125.
+    sd[2] = 13.
+    new_index = pd.Index([0, 2, 4, 1, 40])
+    new_mean = mean.reindex(new_index).fillna(110.)
+    new_sd = sd.reindex(new_index).fillna(10.)
+    np.testing.assert_array_equal(cache.is_stale(new_index, new_mean, new_sd), [False, True, True, True, True])
+
+    stale = new_index[[1, 2, 3, 4]]
+    cache.update(pd.Series([5., 6., 7., 8.], index=stale), new_mean[stale], new_sd[stale])
+    assert not cache.is_stale(new_index, new_mean, new_sd).any()
+    np.testing.assert_array_equal(cache.get(new_index).values, [2., 5., 6., 7., 8.])
+
+
+def test_hemoglobin_exposure_cache_missing_parameters():
+    cache = iron_deficiency.HemoglobinExposureCache()
+    index = pd.Index([0, 1])
+    mean = pd.Series([np.nan, 120.], index=index)
+    sd = pd.Series([np.nan, 15.], index=index)
+    cache.update(pd.Series([np.nan, 1.], index=index), mean, sd)
+
+    # Exposures computed from missing parameters are recomputed rather than trusted.
+    np.testing.assert_array_equal(cache.is_stale(index, mean, sd), [True, False])
+
+
+class Clock:
+    def __init__(self):
+        self.time = pd.Timestamp('2021-01-01')
+
+    def __call__(self):
+        return self.time
+
+
+def test_step_memo():
+    clock = Clock()
+    memo = iron_deficiency.StepMemo(clock)
+    calls = []
+
+    def source(index):
+        calls.append(index)
+        return pd.Series(float(len(calls)), index=index)
+
+    memoized = memo.memoize('exposure', source)
+    index = pd.Index([0, 1, 2])
+
+    first = memoized(index)
+    # Modifiers may update the value in place.
+    first[:] = -1.
+    pd.testing.assert_series_equal(memoized(pd.Index([0, 1, 2])), pd.Series(1., index=index))
+    assert len(calls) == 1
+
+    assert memoized(index[:2]).iloc[0] == 2.
+    clock.time += pd.Timedelta(days=1)
+    assert memoized(index[:2]).iloc[0] == 3.
+    memo.clear()
+    assert memoized(index[:2]).iloc[0] == 4.
+    assert memoized(index[:2]).iloc[0] == 4.
+
+    assert memo.hits == {'exposure': 2}
+    assert memo.misses == {'exposure': 4}
+
+
+def test_step_memo_sources_are_independent():
+    memo = iron_deficiency.StepMemo(Clock())
+    index = pd.Index([0, 1])
+    exposure = memo.memoize('exposure', lambda idx: pd.Series(1., index=idx))
+    severity = memo.memoize('severity', lambda idx: pd.Series(2., index=idx))
+
+    assert exposure(index).iloc[0] == 1.
+    assert severity(index).iloc[0] == 2.
+    assert exposure(index).iloc[0] == 1.
+
+    assert memo.hits == {'exposure': 1}
+    assert memo.misses == {'exposure': 1, 'severity': 1}
+
+
+@pytest.fixture
+def anemia_parameter_data():
+    age_edges = [0., 7 / 365, 28 / 365, 1., 5.]
+    year_edges = [2019, 2020, 2021, 2022]
+    rows = [(sex, age_start, age_end, year_start, year_end)
+            for sex in ['Female', 'Male']
+            for age_start, age_end in zip(age_edges[:-1], age_edges[1:])
+            for year_start, year_end in zip(year_edges[:-1], year_edges[1:])]
+    data = pd.DataFrame(rows, columns=['sex', 'age_start', 'age_end', 'year_start', 'year_end'])
+    values = np.random.RandomState(5).uniform(size=(len(data), len(models.ANEMIA_SEVERITY_GROUPS)))
+    data[models.ANEMIA_SEVERITY_GROUPS] = values
+    # Shuffled so the tensor does not rely on the order of the data.
+    return data.sample(frac=1, random_state=3).reset_index(drop=True), age_edges
+
+
+class PopulationView:
+    def __init__(self, pop: pd.DataFrame):
+        self.pop = pop
+
+    def get(self, index: pd.Index) -> pd.DataFrame:
+        return self.pop.loc[index].assign(tracked=True)
+
+
+@pytest.mark.parametrize('time', ['2018-06-01', '2019-01-01', '2019-12-31', '2020-01-01', '2021-12-31', '2023-06-01'])
+def test_anemia_parameter_tensor(anemia_parameter_data, time):
+    data, age_edges = anemia_parameter_data
+    ages = np.array(age_edges + [1e-6, 7 / 365 - 1e-9, 4.999, 10.])
+    pop = pd.DataFrame({
+        'age': np.repeat(ages, 2 * len(models.ANEMIA_SEVERITY_GROUPS)),
+        'sex': np.tile(np.repeat(['Female', 'Male'], len(models.ANEMIA_SEVERITY_GROUPS)), len(ages)),
+    })
+    severity_codes = np.tile(np.arange(len(models.ANEMIA_SEVERITY_GROUPS)), 2 * len(ages))
+    clock = Clock()
+    clock.time = pd.Timestamp(time)
+
+    tensor = iron_deficiency.AnemiaParameterTensor(data, clock)
+    table = InterpolatedTable(data, PopulationView(pop), key_columns=['sex'], parameter_columns=['age', 'year'],
+                              value_columns=models.ANEMIA_SEVERITY_GROUPS, interpolation_order=0, clock=clock,
+                              extrapolate=True, validate=True)
+
+    expected = table(pop.index)[models.ANEMIA_SEVERITY_GROUPS].values[np.arange(len(pop)), severity_codes]
+    np.testing.assert_array_equal(tensor(pop, severity_codes), expected)
+
+
+@pytest.mark.parametrize('sex', ['Other', np.nan])
+def test_anemia_parameter_tensor_unknown_sex(anemia_parameter_data, sex):
+    data, _ = anemia_parameter_data
+    pop = pd.DataFrame({'age': [1., 1.], 'sex': ['Female', sex]})
+    clock = Clock()
+    clock.time = pd.Timestamp('2019-06-01')
+
+    tensor = iron_deficiency.AnemiaParameterTensor(data, clock)
+    with pytest.raises(ValueError, match='Sexes'):
+        tensor(pop, np.zeros(len(pop), dtype=int))
+
+
+def test_anemia_parameter_tensor_missing_sex(anemia_parameter_data):
+    data, _ = anemia_parameter_data
+    data.loc[0, 'sex'] = np.nan
+    with pytest.raises(ValueError, match='Sexes'):
+        iron_deficiency.AnemiaParameterTensor(data, Clock())
+
+
+@pytest.mark.parametrize('neonatal', [True, False])
+def test_get_severity_thresholds(neonatal):
+    neonatal_age_end = to_years(pd.Timedelta(days=data_values.ANEMIA_THRESHOLDS.NEONATAL_AGE_END_DAYS))
+    if neonatal:
+        severe, moderate, mild = data_values.ANEMIA_THRESHOLDS.NEONATAL
+        age = np.nextafter(neonatal_age_end, 0)
+    else:
+        severe, moderate, mild = data_values.ANEMIA_THRESHOLDS.NON_NEONATAL
+        age = neonatal_age_end
+    exposure_values = [severe - 1e-9, severe, moderate - 1e-9, moderate, mild - 1e-9, mild, mild + 50., np.nan, 0.]
+    expected = ['severe', 'moderate', 'moderate', 'mild', 'mild', 'none', 'none', 'none', 'severe']
+    exposure = pd.Series(exposure_values, index=pd.Index([8, 3, 5, 0, 1, 2, 4, 7, 6]))
+
+    class AgeView:
+        def subview(self, columns):
+            assert columns == ['age']
+            return PopulationView(pd.DataFrame({'age': age}, index=pd.RangeIndex(10)))
+
+    iron = iron_deficiency.IronDeficiency()
+    iron.population_view = AgeView()
+    severity = iron._get_severity(exposure)
+
+    assert severity.name == 'anemia_severity'
+    assert list(severity.cat.categories) == models.ANEMIA_SEVERITY_GROUPS
+    pd.testing.assert_series_equal(severity.astype(object), pd.Series(expected, index=exposure.index,
+                                                                      name='anemia_severity', dtype=object))
+
+
+def test_get_exposure_uses_ensemble_propensity(exposure_inputs):
+    propensity, ensemble_propensity, mean, sd = exposure_inputs
+    pop = pd.DataFrame({'iron_deficiency_propensity': propensity,
+                        'iron_deficiency_ensemble_propensity': ensemble_propensity})
+
+    class PropensityView:
+        def subview(self, columns):
+            assert columns == list(pop.columns)
+            return PopulationView(pop[columns])
+
+    iron = iron_deficiency.IronDeficiency()
+    iron.population_view = PropensityView()
+    iron._exposure_cache = iron_deficiency.HemoglobinExposureCache()
+    iron._distribution.exposure_parameters = lambda index: pd.DataFrame({'mean': mean, 'sd': sd}).loc[index]
+    exposure = iron.get_exposure(propensity.index)
+
+    # The quantile and the ensemble component are drawn independently.
+    expected = iron._distribution.compute_exposure(propensity, ensemble_propensity, mean, sd)
+    pd.testing.assert_series_equal(exposure, expected)
@@ -0,0 +1,94 @@
+from collections import Counter
+from concurrent import futures
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vivarium_gates_lsff.constants import data_keys, data_values
+
+loader = pytest.importorskip('vivarium_gates_lsff.data.loader')
+
+LOCATION = 'Ethiopia'
+
+
+@pytest.fixture
+def pulls(monkeypatch):
+    """Counts sequela prevalence pulls, returning data indexed by the sequela id."""
+    pulls = Counter()
+    lock = threading.Lock()
+
+    def pull_sequela_prevalence(sequela_id, location):
+        with lock:
+            pulls[(sequela_id, location)] += 1
+        time.sleep(0.01)
+        index = pd.Index(np.arange(3), name='age_group_id')
+        return pd.DataFrame({'draw_0': float(sequela_id)}, index=index)
+
+    monkeypatch.setattr(loader, 'pull_sequela_prevalence', pull_sequela_prevalence)
+    loader.clear_sequela_prevalence()
+    yield pulls
+    loader.clear_sequela_prevalence()
+
+
+def test_iron_responsive_proportions_pull_once(pulls):
+    keys = [data_keys.IRON_DEFICIENCY.IRON_DEFICIENCY_MILD_ANEMIA_IRON_RESPONSIVE_PROPORTION,
+            data_keys.IRON_DEFICIENCY.IRON_DEFICIENCY_MODERATE_ANEMIA_IRON_RESPONSIVE_PROPORTION,
+            data_keys.IRON_DEFICIENCY.IRON_DEFICIENCY_SEVERE_ANEMIA_IRON_RESPONSIVE_PROPORTION]
+    for key in keys + keys:
+        loader.load_iron_responsive_proportion(key, LOCATION)
+
+    sequela_ids = {sequela_id for ids in data_values.ANEMIA_SEQUELAE_ID_MAP.values()
+                   for sequela_id in ids[0] + ids[1]}
+    assert pulls == Counter({(sequela_id, LOCATION): 1 for sequela_id in sequela_ids})
+
+    loader.clear_sequela_prevalence()
+    loader.load_iron_responsive_proportion(keys[0], LOCATION)
+    assert pulls[(data_values.ANEMIA_SEQUELAE_ID_MAP['mild'][0][0], LOCATION)] == 2
+
+
+def test_concurrent_misses_pull_once(pulls):
+    with futures.ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: loader.get_sequela_prevalence(144, LOCATION), range(8)))
+
+    assert pulls == Counter({(144, LOCATION): 1})
+    assert all(result is results[0] for result in results)
+
+
+def test_different_sequelae_pull_concurrently(monkeypatch):
+    # Each pull waits for the other, which only succeeds if they are not behind one lock.
+    barrier = threading.Barrier(2, timeout=5)
+
+    def pull_sequela_prevalence(sequela_id, location):
+        barrier.wait()
+        return pd.DataFrame({'draw_0': [float(sequela_id)]})
+
+    monkeypatch.setattr(loader, 'pull_sequela_prevalence', pull_sequela_prevalence)
+    loader.clear_sequela_prevalence()
+    with futures.ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(lambda sequela_id: loader.get_sequela_prevalence(sequela_id, LOCATION),
+                                    [144, 172]))
+    loader.clear_sequela_prevalence()
+
+    assert [result.draw_0.iloc[0] for result in results] == [144., 172.]
+
+
+def test_total_sequela_prevalence(monkeypatch):
+    prevalence = {
+        1: pd.DataFrame({'draw_0': [1., 2.]}, index=[0, 1]),
+        2: pd.DataFrame({'draw_0': [10., 20.]}, index=[0, 1]),
+        3: pd.DataFrame({'draw_0': [100., 200.]}, index=[1, 2]),
+        4: None,
+    }
+    monkeypatch.setattr(loader, 'pull_sequela_prevalence', lambda sequela_id, location: prevalence[sequela_id])
+    loader.clear_sequela_prevalence()
+
+    pd.testing.assert_frame_equal(loader.get_total_sequela_prevalence([1, 2, 4], LOCATION),
+                                  pd.DataFrame({'draw_0': [11., 22.]}, index=[0, 1]))
+    # Rows missing from some sequelae are aligned on the union of rows.
+    pd.testing.assert_frame_equal(loader.get_total_sequela_prevalence([1, 3], LOCATION),
+                                  pd.DataFrame({'draw_0': [np.nan, 102., np.nan]}, index=[0, 1, 2]))
+    assert loader.get_total_sequela_prevalence([4], LOCATION) == 0
+    loader.clear_sequela_prevalence()
@@ -0,0 +1,78 @@
+from concurrent import futures
+
+import pytest
+
+pytest.importorskip('vivarium_cluster_tools')
+
+from vivarium_gates_lsff.constants import metadata
+from vivarium_gates_lsff.tools import cli, make_artifacts
+
+
+@pytest.fixture
+def local_builds(monkeypatch):
+    """Runs local builds in threads, recording the key workers each location is built with."""
+    builds = {}
+
+    def build_single_location_artifact_in_worker(path, location, incremental, key_workers, gbd_cache_dir,
+                                                 start_times):
+        builds[location] = key_workers
+        if location == metadata.LOCATIONS[0]:
+            raise ValueError('No data.')
+
+    monkeypatch.setattr(make_artifacts, 'build_single_location_artifact_in_worker',
+                        build_single_location_artifact_in_worker)
+    monkeypatch.setattr(make_artifacts.futures, 'ProcessPoolExecutor', futures.ThreadPoolExecutor)
+    monkeypatch.setattr(metadata, 'MAKE_ARTIFACT_SLEEP', 0.01)
+    return builds
+
+
+@pytest.fixture
+def local_build_calls(monkeypatch):
+    """Records the arguments local builds of all locations are started with."""
+    calls = []
+    monkeypatch.setattr(make_artifacts, 'running_from_cluster', lambda: False)
+    monkeypatch.setattr(make_artifacts.vct, 'mkdir', lambda path, parents, exists_ok: path.mkdir(exist_ok=True),
+                        raising=False)
+    monkeypatch.setattr(make_artifacts, 'build_all_artifacts_locally', lambda *args: calls.append(args))
+    return calls
+
+
+@pytest.mark.parametrize('workers, key_workers, expected', [(1, 4, 4), (2, 4, 2), (3, 4, 1), (8, 4, 1), (2, 1, 1)])
+def test_local_workers_split_key_workers(tmp_path, local_build_calls, workers, key_workers, expected):
+    make_artifacts.build_artifacts('all', str(tmp_path), append=True, verbose=0, workers=workers,
+                                   key_workers=key_workers)
+
+    assert local_build_calls == [(tmp_path, workers, False, expected, None)]
+
+
+def test_keys_load_serially_by_default(tmp_path, local_build_calls):
+    make_artifacts.build_artifacts('all', str(tmp_path), append=True, verbose=0, workers=1)
+
+    assert local_build_calls == [(tmp_path, 1, False, 1, None)]
+    key_workers = next(option for option in cli.make_artifacts.params if option.name == 'key_workers')
+    assert key_workers.default == 1
+
+
+def test_default_local_workers_without_cpu_count(tmp_path, local_build_calls, monkeypatch):
+    monkeypatch.setattr(make_artifacts.os, 'cpu_count', lambda: None)
+
+    make_artifacts.build_artifacts('all', str(tmp_path), append=True, verbose=0, key_workers=4)
+
+    assert local_build_calls == [(tmp_path, 1, False, 4, None)]
+
+
+def test_local_build_failures_propagate(tmp_path, local_builds):
+    with pytest.raises(RuntimeError, match=metadata.LOCATIONS[0]) as error:
+        make_artifacts.build_all_artifacts_locally(tmp_path, workers=2, key_workers=3)
+
+    # Every location is still built when one fails.
+    assert local_builds == {location: 3 for location in metadata.LOCATIONS}
+    for location in metadata.LOCATIONS[1:]:
+        assert location not in str(error.value)
+
+
+def test_gbd_cache_dir_reaches_local_workers(tmp_path, local_build_calls):
+    make_artifacts.build_artifacts('all', str(tmp_path), append=True, verbose=0, workers=2,
+                                   gbd_cache_dir=str(tmp_path / 'gbd'))
+
+    assert local_build_calls == [(tmp_path, 2, False, 1, str(tmp_path / 'gbd'))]
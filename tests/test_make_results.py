@@ -0,0 +1,97 @@
+import functools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vivarium_gates_lsff.constants import results
+from vivarium_gates_lsff.results_processing import process_results
+from vivarium_gates_lsff.tools import make_benchmarks, make_results
+
+
+@pytest.fixture(scope='module')
+def simulation_output(tmp_path_factory):
+    """Outputs of a small parallel run with one run missing, so a seed is incomplete."""
+    output_dir = tmp_path_factory.mktemp('simulation_output')
+    make_benchmarks.build_synthetic_results(output_dir, draws=5, seeds=3, scenarios=['baseline', 'alternative'],
+                                            seed=4)
+    data = pd.read_hdf(output_dir / 'output.hdf')
+    data.drop(index=data.index[7]).to_hdf(output_dir / 'output.hdf', key='data')
+    return output_dir
+
+
+def assert_count_data_schema(path, measure):
+    """Checks a dumped measure against the schema count data has always been written with."""
+    with pd.HDFStore(str(path), mode='r') as store:
+        assert store.get_storer(measure).format_type == 'fixed', measure
+    data = pd.read_hdf(path)
+    pd.testing.assert_index_equal(data.index, pd.RangeIndex(len(data)), exact=False, obj=measure)
+    for column, dtype in data.dtypes.items():
+        if column == results.INPUT_DRAW_COLUMN:
+            assert dtype == np.int64, (measure, column)
+        elif column == 'value':
+            assert dtype == np.float64, (measure, column)
+        else:
+            assert not isinstance(dtype, pd.CategoricalDtype), (measure, column)
+            assert pd.api.types.is_string_dtype(dtype), (measure, column)
+    if 'year' in data:
+        assert set(data['year']) == {str(year) for year in results.YEARS}, measure
+
+
+def read_measure_data(output_dir):
+    measure_data = {}
+    for measure in process_results.MeasureData._fields:
+        assert_count_data_schema(output_dir / 'count_data' / f'{measure}.hdf', measure)
+        data = pd.read_hdf(output_dir / 'count_data' / f'{measure}.hdf')
+        assert (output_dir / 'count_data' / f'{measure}.csv').exists()
+        columns = [column for column in data.columns if column != 'value']
+        measure_data[measure] = data.sort_values(columns).reset_index(drop=True)
+    return measure_data
+
+
+def build_results(simulation_output, output_dir, **mode):
+    output_dir.mkdir()
+    for file_name in ['output.hdf', 'keyspace.yaml', 'model_specification.yaml']:
+        (output_dir / file_name).symlink_to(simulation_output / file_name)
+    make_results.build_results(str(output_dir / 'output.hdf'), single_run=False, **mode)
+    return read_measure_data(output_dir)
+
+
+@pytest.fixture(scope='module')
+def expected(simulation_output, tmp_path_factory):
+    return build_results(simulation_output, tmp_path_factory.mktemp('default') / 'results')
+
+
+def assert_measure_data_equal(measure_data, expected):
+    assert list(measure_data) == list(expected)
+    for measure, data in measure_data.items():
+        assert not data.empty, measure
+        pd.testing.assert_frame_equal(data, expected[measure], obj=measure)
+
+
+@pytest.mark.parametrize('draws_per_chunk', [1, 2, process_results.DRAWS_PER_CHUNK])
+def test_build_results_streaming(simulation_output, expected, tmp_path, monkeypatch, draws_per_chunk):
+    monkeypatch.setattr(process_results, 'stream_measure_data',
+                        functools.partial(process_results.stream_measure_data, draws_per_chunk=draws_per_chunk))
+    measure_data = build_results(simulation_output, tmp_path / 'results', streaming=True)
+    assert_measure_data_equal(measure_data, expected)
+
+
+def test_build_results_by_measure(simulation_output, expected, tmp_path):
+    measure_data = build_results(simulation_output, tmp_path / 'results', by_measure=True)
+    assert_measure_data_equal(measure_data, expected)
+
+
+@pytest.mark.parametrize('mode', make_benchmarks.RESULTS_BENCHMARK_MODES)
+def test_run_results_processing(simulation_output, expected, tmp_path, mode):
+    output_dir = tmp_path / 'results'
+    output_dir.mkdir()
+    for file_name in ['output.hdf', 'keyspace.yaml', 'model_specification.yaml']:
+        (output_dir / file_name).symlink_to(simulation_output / file_name)
+    result = make_benchmarks.run_results_processing(output_dir / 'output.hdf', mode)
+
+    assert_measure_data_equal(read_measure_data(output_dir), expected)
+    assert result['end_to_end']['seconds'] > 0
+    expected_stages = ['read', 'filter', 'aggregate', 'make_measure_data', 'dump'] if mode == 'default' else []
+    assert list(result['stages']) == expected_stages
+    assert sum(stage['seconds'] for stage in result['stages'].values()) <= result['end_to_end']['seconds']
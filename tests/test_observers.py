@@ -0,0 +1,315 @@
+from collections import Counter
+import itertools
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from vivarium_public_health.metrics.utilities import (get_output_template, get_group_counts, get_state_person_time,
+                                                      get_transition_count, QueryString, to_years)
+
+from vivarium_gates_lsff.components import observers
+from vivarium_gates_lsff.constants import models
+
+STEP_SIZE = pd.Timedelta(days=4)
+CONFIGS = [{'by_age': by_age, 'by_sex': by_sex, 'by_year': by_year}
+           for by_age, by_sex, by_year in itertools.product([True, False], repeat=3)]
+
+
+@pytest.fixture
+def age_bins():
+    return pd.DataFrame({
+        'age_group_name': ['early_neonatal', 'late_neonatal', 'post_neonatal', '1_to_4'],
+        'age_start': [0., 7 / 365, 28 / 365, 1.],
+        'age_end': [7 / 365, 28 / 365, 1., 5.],
+    })
+
+
+@pytest.fixture
+def pop(age_bins):
+    size = 500
+    random_state = np.random.RandomState(11)
+    ages = random_state.uniform(0, 5.5, size=size)
+    # Simulants exactly on every bin edge.
+    ages[:5] = np.append(age_bins.age_start.values, age_bins.age_end.values[-1])
+    return pd.DataFrame({
+        'age': ages,
+        'sex': random_state.choice(['Male', 'Female'], size=size),
+        'alive': random_state.choice(['alive', 'dead'], p=[0.9, 0.1], size=size),
+        'anemia': random_state.choice(models.ANEMIA_SEVERITY_GROUPS, size=size),
+        models.DIARRHEA_MODEL_NAME: random_state.choice(models.DIARRHEA_MODEL_STATES, size=size),
+        models.VITAMIN_A_MODEL_NAME: random_state.choice(models.VITAMIN_A_MODEL_STATES, size=size),
+        'zinc': random_state.choice(models.ZINC_DEFICIENCY_RISK_STATES, size=size),
+    }, index=pd.Index(random_state.permutation(2 * size)[:size]))
+
+
+class PopulationView:
+    def __init__(self, state_table: pd.DataFrame, columns):
+        self.state_table = state_table
+        self.columns = [column for column in columns if column != 'tracked']
+        self.requests = []
+
+    def subview(self, columns):
+        return PopulationView(self.state_table, columns)
+
+    def get(self, index: pd.Index) -> pd.DataFrame:
+        self.requests.append(index)
+        return self.state_table.loc[index, self.columns].copy()
+
+    def update(self, update):
+        update = update.to_frame() if isinstance(update, pd.Series) else update
+        for column in update:
+            self.state_table.loc[update.index, column] = update[column]
+
+
+class Builder:
+    """Just enough of the simulation builder to set up an observer component."""
+
+    def __init__(self, state_table: pd.DataFrame, config=None, values=None, components=None):
+        self.views = []
+        self.listeners = {}
+        self.initializers = []
+        self.population = SimpleNamespace(get_view=self.get_view,
+                                          initializes_simulants=lambda f, **_: self.initializers.append(f))
+        self.value = SimpleNamespace(get_value=lambda name: values[name],
+                                     register_value_modifier=lambda name, modifier: None)
+        self.event = SimpleNamespace(register_listener=self.register_listener)
+        self.configuration = {'metrics': {name: SimpleNamespace(to_dict=lambda c=c: dict(c))
+                                          for name, c in (config or {}).items()}}
+        self.time = SimpleNamespace(clock=lambda: lambda: pd.Timestamp('2021-06-01'))
+        self.components = SimpleNamespace(get_component=lambda name: components[name])
+        self.state_table = state_table
+
+    def get_view(self, columns):
+        view = PopulationView(self.state_table, columns)
+        self.views.append(view)
+        return view
+
+    def register_listener(self, event_name, listener, priority=5):
+        self.listeners.setdefault(event_name, []).append((priority, listener))
+
+
+def get_stratification_codes(pop: pd.DataFrame, config, age_bins: pd.DataFrame):
+    no_stratification = np.zeros(len(pop), dtype=np.int8)
+    sex = pd.Index(observers.SEXES).get_indexer(pop['sex']) if config['by_sex'] else no_stratification
+    age_group = np.full(len(pop), -1)
+    for code, (age_start, age_end) in enumerate(zip(age_bins.age_start, age_bins.age_end)):
+        age_group[(age_start <= pop['age']) & (pop['age'] < age_end)] = code
+    return sex, age_group if config['by_age'] else no_stratification
+
+
+def assert_metrics_equal(metrics, expected):
+    assert sorted(metrics) == sorted(expected)
+    for key, value in expected.items():
+        assert metrics[key] == pytest.approx(value), key
+
+
+@pytest.mark.parametrize('config', CONFIGS)
+def test_measure_accumulator(pop, age_bins, config):
+    accumulator = observers.MeasureAccumulator([f'anemia_{state}_person_time'
+                                                for state in models.ANEMIA_SEVERITY_GROUPS], config, age_bins)
+    expected = Counter()
+    for year, step_pop in [(2021, pop), (2022, pop.iloc[::3]), (2021, pop.iloc[1::2])]:
+        alive = step_pop.loc[step_pop['alive'] == 'alive']
+        accumulator.update(year, pd.Index(models.ANEMIA_SEVERITY_GROUPS).get_indexer(alive['anemia']),
+                           get_stratification_codes(alive, config, age_bins), weight=to_years(STEP_SIZE))
+        for state in models.ANEMIA_SEVERITY_GROUPS:
+            base_key = get_output_template(**config).substitute(measure=f'anemia_{state}_person_time', year=year)
+            base_filter = QueryString(f'alive == "alive" and anemia == "{state}"')
+            expected.update(get_group_counts(step_pop, base_filter, base_key, config, age_bins,
+                                             aggregate=lambda x: len(x) * to_years(STEP_SIZE)))
+
+    assert_metrics_equal(accumulator.to_dict(), expected)
+
+
+@pytest.mark.parametrize('config', CONFIGS)
+def test_measure_accumulator_strata(pop, age_bins, config):
+    disease = models.DIARRHEA_MODEL_NAME
+    states = models.DIARRHEA_MODEL_STATES
+    strata = [('VA', models.VITAMIN_A_MODEL_STATES), ('ZINC', models.ZINC_DEFICIENCY_RISK_STATES)]
+    accumulator = observers.MeasureAccumulator([f'{state}_person_time' for state in states],
+                                               config, age_bins, strata)
+    alive = pop.loc[pop['alive'] == 'alive']
+    strata_codes = (pd.Index(models.VITAMIN_A_MODEL_STATES).get_indexer(alive[models.VITAMIN_A_MODEL_NAME]),
+                    pd.Index(models.ZINC_DEFICIENCY_RISK_STATES).get_indexer(alive['zinc']))
+
+    accumulator.update(2021, pd.Index(states).get_indexer(alive[disease]),
+                       get_stratification_codes(alive, config, age_bins) + strata_codes, weight=to_years(STEP_SIZE))
+
+    # Person time as it was observed group by group and state by state.
+    expected = {}
+    for vitamin_a, zinc in itertools.product(models.VITAMIN_A_MODEL_STATES, models.ZINC_DEFICIENCY_RISK_STATES):
+        pop_in_group = pop.loc[(pop[models.VITAMIN_A_MODEL_NAME] == vitamin_a) & (pop['zinc'] == zinc)]
+        for state in states:
+            person_time = get_state_person_time(pop_in_group, config, disease, state, 2021, STEP_SIZE, age_bins)
+            expected.update({f'{key}_VA_{vitamin_a}_ZINC_{zinc}': value for key, value in person_time.items()})
+
+    assert_metrics_equal(accumulator.to_dict(), expected)
+
+
+@pytest.fixture
+def stratifier(pop, age_bins, monkeypatch):
+    monkeypatch.setattr(observers, 'get_age_bins', lambda builder: age_bins)
+    state_table = pop.copy()
+    state_table['age_group'] = get_stratification_codes(pop, {'by_sex': True, 'by_age': True}, age_bins)[1]
+    zinc_exposure = lambda index: pd.Series(np.where(state_table.loc[index, 'zinc']
+                                                     == models.ZINC_DEFICIENCY_SUSCEPTIBLE_STATE_NAME,
+                                                     'cat2', 'cat1'), index=index)
+    builder = Builder(state_table, values={'zinc_deficiency.exposure': zinc_exposure})
+    stratifier = observers.ResultsStratifier()
+    stratifier.setup(builder)
+    return stratifier, builder
+
+
+def get_expected_codes(state_table: pd.DataFrame, index: pd.Index, config):
+    pop = state_table.loc[index]
+    return (pd.Index(observers.SEXES).get_indexer(pop['sex']) if config['by_sex'] else np.zeros(len(pop)),
+            pop['age_group'].values if config['by_age'] else np.zeros(len(pop)),
+            pd.Index(models.VITAMIN_A_MODEL_STATES).get_indexer(pop[models.VITAMIN_A_MODEL_NAME]),
+            pd.Index(models.ZINC_DEFICIENCY_RISK_STATES).get_indexer(pop['zinc']))
+
+
+def assert_codes_equal(codes, expected):
+    assert len(codes) == len(expected)
+    for axis_codes, expected_axis_codes in zip(codes, expected):
+        np.testing.assert_array_equal(axis_codes, expected_axis_codes)
+
+
+@pytest.mark.parametrize('config', CONFIGS)
+def test_results_stratifier(stratifier, config):
+    stratifier, builder = stratifier
+    config = {**config, 'strata': ['vitamin_a', 'zinc']}
+    state_table = builder.state_table
+    view = builder.views[0]
+    assert [priority for priority, _ in builder.listeners['time_step__prepare']] == [0]
+    assert [priority for priority, _ in builder.listeners['collect_metrics']] == [0]
+
+    stratifier.on_observation(SimpleNamespace(index=state_table.index))
+    for index in [state_table.index, state_table.index[::7], state_table.index[:0]]:
+        assert_codes_equal(stratifier.stratify(index, config), get_expected_codes(state_table, index, config))
+    # The population is read once per observation phase, however many observers stratify.
+    assert len(view.requests) == 1
+
+    # Coded from the state table at the start of the phase.
+    changed = state_table.index[:10]
+    state_table.loc[changed, models.VITAMIN_A_MODEL_NAME] = models.VITAMIN_A_MODEL_STATES[0]
+    stale_codes = stratifier.stratify(changed, config)
+    stratifier.on_observation(SimpleNamespace(index=state_table.index))
+    codes = stratifier.stratify(changed, config)
+    assert_codes_equal(codes, get_expected_codes(state_table, changed, config))
+    assert (codes[2] == 0).all() and not (stale_codes[2] == 0).all()
+
+
+def test_results_stratifier_new_simulants(stratifier):
+    stratifier, builder = stratifier
+    config = {'by_sex': True, 'by_age': True, 'by_year': False, 'strata': ['vitamin_a', 'zinc']}
+    state_table = builder.state_table
+    view = builder.views[0]
+    stratifier.on_observation(SimpleNamespace(index=state_table.index[:100]))
+    stratifier.stratify(state_table.index[:100], config)
+
+    # Simulants added during the step, some beyond every simulant coded so far.
+    new = state_table.index[100:120].append(pd.Index([state_table.index.max() + 5]))
+    state_table.loc[new[-1]] = state_table.loc[new[0]]
+    index = state_table.index[90:110].append(new[-1:])
+
+    assert_codes_equal(stratifier.stratify(index, config), get_expected_codes(state_table, index, config))
+    # Only the new simulants are read, once for each stratification.
+    assert len(view.requests) == 5
+    assert all(request.equals(index[10:]) for request in view.requests[1:])
+    # Once coded, the new simulants are served from the cache.
+    stratifier.stratify(index, config)
+    assert len(view.requests) == 5
+
+
+def test_results_stratifier_unknown_strata(stratifier):
+    stratifier, _ = stratifier
+    assert stratifier.get_strata(['zinc', 'vitamin_a']) == [observers.ResultsStratifier.STRATIFICATIONS['zinc'],
+                                                           observers.ResultsStratifier.STRATIFICATIONS['vitamin_a']]
+    with pytest.raises(ValueError, match='lbwsg'):
+        stratifier.get_strata(['lbwsg'])
+
+
+def test_age_group(age_bins, monkeypatch):
+    monkeypatch.setattr(observers, 'get_age_bins', lambda builder: age_bins)
+    edges = np.append(age_bins.age_start.values, age_bins.age_end.values[-1])
+    random_state = np.random.RandomState(2)
+    ages = np.concatenate([edges, edges - 1e-9, edges - to_years(pd.Timedelta(days=1)),
+                           random_state.uniform(0, 5.5, size=200)])
+    state_table = pd.DataFrame({'age': ages, 'age_group': -1}, index=pd.RangeIndex(len(ages)))
+    builder = Builder(state_table)
+    age_group = observers.AgeGroup()
+    age_group.setup(builder)
+    [initialize] = builder.initializers
+    [(priority, on_time_step)] = builder.listeners['time_step']
+    view = builder.views[0]
+    assert priority > 8
+
+    def check_age_groups():
+        expected = get_stratification_codes(state_table, {'by_sex': False, 'by_age': True}, age_bins)[1]
+        np.testing.assert_array_equal(state_table['age_group'].values, expected)
+
+    initialize(SimpleNamespace(index=state_table.index[:100]))
+    initialize(SimpleNamespace(index=state_table.index[100:]))
+    check_age_groups()
+    for step in range(300):
+        step_size = pd.Timedelta(days=[0.5, 1, 3][step % 3])
+        # Simulants are aged by the base population before age groups are updated.
+        state_table['age'] += to_years(step_size)
+        view.requests.clear()
+        on_time_step(SimpleNamespace(step_size=step_size))
+        check_age_groups()
+        # Only simulants due to cross a bin edge are re-binned.
+        assert sum(len(request) for request in view.requests) < len(state_table) / 2
+
+
+@pytest.mark.parametrize('disease, strata', [
+    (models.DIARRHEA_MODEL_NAME, [('VA', models.VITAMIN_A_MODEL_STATES),
+                                  ('ZINC', models.ZINC_DEFICIENCY_RISK_STATES)]),
+    (models.MEASLES_MODEL_NAME, [('VA', models.VITAMIN_A_MODEL_STATES)]),
+])
+@pytest.mark.parametrize('by_age', [True, False])
+def test_state_observer(stratifier, age_bins, monkeypatch, disease, strata, by_age):
+    monkeypatch.setattr(observers, 'get_age_bins', lambda builder: age_bins)
+    stratifier, stratifier_builder = stratifier
+    state_table = stratifier_builder.state_table
+    observer = observers.StateObserver(disease)
+    config = {**observer.configuration_defaults['metrics'][f'{disease}_observer'], 'by_age': by_age, 'by_sex': True}
+    builder = Builder(state_table, config={f'{disease}_observer': config},
+                      components={'results_stratifier': stratifier})
+    observer.setup(builder)
+    # Diseases reach states with no person time observed, e.g. recovered from measles.
+    transitions = models.STATE_MACHINE_MAP[disease]['transitions']
+    states = list(dict.fromkeys([state for transition in transitions
+                                 for state in [transition.from_state, transition.to_state]]))
+    random_state = np.random.RandomState(7)
+    state_table[disease] = random_state.choice(states, size=len(state_table))
+    prepare = SimpleNamespace(index=state_table.index, step_size=STEP_SIZE)
+    collect = SimpleNamespace(index=state_table.index, time=pd.Timestamp('2021-06-05'))
+
+    [initialize] = builder.initializers
+    initialize(SimpleNamespace(index=state_table.index))
+    stratifier.on_observation(prepare)
+    observer.on_time_step_prepare(prepare)
+    previous_state_table = state_table.copy()
+    state_table[disease] = random_state.choice(states, size=len(state_table))
+    stratifier.on_observation(collect)
+    observer.on_collect_metrics(collect)
+
+    # Counts and person time as they were observed group by group.
+    state_table[f'previous_{disease}'] = previous_state_table[disease]
+    expected = {}
+    for categories in itertools.product(*[categories for _, categories in strata]):
+        in_group = np.logical_and.reduce([state_table[column] == category for column, category
+                                          in zip([models.VITAMIN_A_MODEL_NAME, 'zinc'], categories)])
+        labels = ''.join(f'_{label}_{category}' for (label, _), category in zip(strata, categories))
+        for state in observer.states:
+            person_time = get_state_person_time(previous_state_table.loc[in_group], config, disease, state,
+                                                2021, STEP_SIZE, age_bins)
+            expected.update({f'{key}{labels}': value for key, value in person_time.items()})
+        for transition in transitions:
+            counts = get_transition_count(state_table.loc[in_group], config, disease, transition,
+                                          collect.time, age_bins)
+            expected.update({f'{key}{labels}': value for key, value in counts.items()})
+
+    assert_metrics_equal(observer.metrics(state_table.index, {}), expected)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from vivarium_gates_lsff.constants import results
+from vivarium_gates_lsff.results_processing import process_results
+
+
+@pytest.fixture
+def output():
+    """A small frame shaped like a psimulate output, with a block of each dtype."""
+    rows = 12
+    random_state = np.random.RandomState(0)
+    return pd.DataFrame({
+        results.INPUT_DRAW_COLUMN: np.repeat([3, 1, 2], 4).astype(float),
+        results.RANDOM_SEED_COLUMN: np.tile([0, 1], 6),
+        results.OUTPUT_SCENARIO_COLUMN: np.tile(['baseline', 'baseline', 'fortified', 'fortified'], 3).astype(object),
+        'ylls_due_to_measles': random_state.uniform(size=rows),
+        'ylds_due_to_measles': random_state.uniform(size=rows),
+        'deaths_due_to_measles': random_state.randint(0, 10, size=rows),
+        'run_note': np.array([f'note_{i}' for i in range(rows)], dtype=object),
+    })
+
+
+def write_output(data: pd.DataFrame, path, format_: str):
+    data.to_hdf(path, key='data', format=format_)
+    return path
+
+
+@pytest.mark.parametrize('columns', [
+    ['ylls_due_to_measles'],
+    ['deaths_due_to_measles', 'ylls_due_to_measles'],
+    ['run_note', 'ylds_due_to_measles', results.INPUT_DRAW_COLUMN],
+    [],
+])
+@pytest.mark.parametrize('rows', [None, [0], [1, 4, 5, 11]])
+def test_read_fixed_format_columns(output, tmp_path, columns, rows):
+    path = write_output(output, tmp_path / 'output.hdf', 'fixed')
+    expected = pd.read_hdf(path)[columns].reset_index(drop=True)
+    if rows is not None:
+        expected = expected.iloc[rows].reset_index(drop=True)
+        rows = np.array(rows)
+
+    with pd.HDFStore(str(path), mode='r') as store:
+        data = process_results.read_fixed_format_columns(store.get_storer('data'), columns, rows)
+
+    pd.testing.assert_frame_equal(data, expected, check_index_type=False, check_column_type=False)
+
+
+def test_read_fixed_format_columns_missing(output, tmp_path):
+    path = write_output(output, tmp_path / 'output.hdf', 'fixed')
+    with pd.HDFStore(str(path), mode='r') as store:
+        with pytest.raises(KeyError):
+            process_results.read_fixed_format_columns(store.get_storer('data'), ['not_a_column'])
+
+
+@pytest.mark.parametrize('rows', [None, [2, 3, 7]])
+def test_results_reader_formats_agree(output, tmp_path, rows):
+    columns = ['ylls_due_to_measles', 'deaths_due_to_measles']
+    rows = rows if rows is None else np.array(rows)
+    data = {}
+    for format_ in ['fixed', 'table']:
+        path = write_output(output, tmp_path / f'{format_}.hdf', format_)
+        with process_results.ResultsReader(path, single_run=False) as reader:
+            data[format_] = reader.read(columns, rows)
+
+    expected = process_results.clean_data(output, single_run=False)
+    expected = expected[[results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN,
+                         process_results.SCENARIO_COLUMN] + columns]
+    if rows is not None:
+        expected = expected.iloc[rows].reset_index(drop=True)
+    for format_data in data.values():
+        pd.testing.assert_frame_equal(format_data, expected, check_dtype=False, check_index_type=False,
+                                      check_column_type=False)
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from vivarium_gates_lsff.constants import data_keys, models
+from vivarium_gates_lsff.data import synthetic
+
+LOCATION = 'Nigeria'
+DRAWS = 3
+
+
+@pytest.mark.parametrize('key', [data_keys.DIARRHEA.DIARRHEA_PREVALENCE, data_keys.LBWSG.LBWSG_EXPOSURE,
+                                 data_keys.IRON_DEFICIENCY.IRON_DEFICIENCY_EXPOSURE])
+def test_get_data_is_deterministic(key):
+    data = synthetic.get_data(key, LOCATION, DRAWS, seed=1)
+
+    pd.testing.assert_frame_equal(data, synthetic.get_data(key, LOCATION, DRAWS, seed=1))
+    assert not data.equals(synthetic.get_data(key, LOCATION, DRAWS, seed=2))
+
+
+def test_keys_have_independent_streams():
+    first = synthetic.get_data(data_keys.DIARRHEA.DIARRHEA_PREVALENCE, LOCATION, DRAWS, seed=1)
+    other = synthetic.get_data(data_keys.DIARRHEA.DIARRHEA_INCIDENCE_RATE, LOCATION, DRAWS, seed=1)
+    again = synthetic.get_data(data_keys.DIARRHEA.DIARRHEA_PREVALENCE, LOCATION, DRAWS, seed=1)
+
+    pd.testing.assert_frame_equal(first, again)
+    assert not (first.values == other.values).any()
+
+
+def test_lbwsg_categories():
+    categories = synthetic.get_data(data_keys.LBWSG.LBWSG_CATEGORIES, LOCATION, DRAWS, seed=1)
+    exposure = synthetic.get_data(data_keys.LBWSG.LBWSG_EXPOSURE, LOCATION, DRAWS, seed=1)
+    relative_risk = synthetic.get_data(data_keys.LBWSG.LBWSG_RELATIVE_RISK, LOCATION, DRAWS, seed=1)
+
+    assert list(categories) == models.LBWSG_RISK_CATEGORIES
+    assert synthetic.get_data(data_keys.LBWSG.LBWSG_DISTRIBUTION, LOCATION, DRAWS, seed=1) == 'polytomous'
+    assert list(exposure.index.unique('parameter')) == models.LBWSG_RISK_CATEGORIES
+    assert list(relative_risk.index.unique('parameter')) == models.LBWSG_RISK_CATEGORIES
+
+    exposure_total = exposure.groupby(level=synthetic.DEMOGRAPHIC_COLUMNS).sum()
+    assert exposure_total.values == pytest.approx(1.)
+    reference = relative_risk.index.get_level_values('parameter') == models.LBWSG_RISK_CATEGORIES[-1]
+    assert (relative_risk[reference] == 1.).all().all()
+    assert (relative_risk >= 1.).all().all()